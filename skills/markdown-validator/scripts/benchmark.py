@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the markdown validator scripts.
+Generates a seeded synthetic corpus and measures throughput, per-check time
+and peak memory of the validator, extension checker and formatter.
+"""
+
+import sys
+import json
+import time
+import hashlib
+import random
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from pathlib import Path
+from typing import List, Dict, Any, Callable
+
+from validate_markdown import MarkdownValidator
+from check_extensions import ExtensionChecker
+from format_markdown import MarkdownFormatter
+from check_profiler import summarize
+
+
+WORDS = ('alpha', 'beta', 'gamma', 'delta', 'markdown', 'validator', 'extension',
+         'container', 'footnote', 'heading', 'list', 'fence', 'link', 'review',
+         'format', 'syntax', 'content', 'example', 'spec', 'parser')
+ADMONITIONS = ('note', 'tip', 'warning', 'danger', 'info', 'caution', 'sidebar')
+LANGUAGES = ('python', 'bash', 'json', 'markdown', '')
+
+
+class CorpusGenerator:
+    """Generates reproducible markdown documents for benchmarking."""
+
+    def __init__(self, seed: int = 0):
+        """
+        Initialize generator.
+
+        Args:
+            seed: Random seed; the same seed always produces the same corpus
+        """
+        self.rng = random.Random(seed)
+        self._footnotes = 0
+        self._references = 0
+
+    def document(self, target_lines: int) -> str:
+        """
+        Generate one document of roughly ``target_lines`` lines.
+
+        Mixes headings, paragraphs with links, bare URLs, emphasis and
+        footnotes, deep lists, large fences, nested containers, task lists,
+        attributes and definitions, plus the occasional syntax error.
+        """
+        self._footnotes = 0
+        self._references = 0
+        blocks = (self._heading, self._paragraph, self._paragraph, self._deep_list,
+                  self._fence, self._containers, self._task_list, self._misc)
+
+        lines = [f'# {self._words(3, 6).title()}', '']
+        while len(lines) < target_lines:
+            lines.extend(self.rng.choice(blocks)())
+            lines.append('')
+
+        # Definitions for the footnotes and reference links used above
+        for n in range(1, self._footnotes + 1):
+            lines.append(f'[^{n}]: {self._words(4, 10)}')
+        for n in range(1, self._references + 1):
+            lines.append(f'[ref{n}]: https://example.com/ref/{n}')
+        return '\n'.join(lines) + '\n'
+
+    def _words(self, low: int, high: int) -> str:
+        """A run of filler words."""
+        return ' '.join(self.rng.choice(WORDS) for _ in range(self.rng.randint(low, high)))
+
+    def _inline(self) -> str:
+        """A filler line with a random inline construct."""
+        rng = self.rng
+        text = self._words(4, 12)
+        choice = rng.random()
+        if choice < 0.15:
+            text += f' [{self._words(1, 3)}](https://example.com/{rng.randint(1, 999)})'
+        elif choice < 0.25:
+            text += f' see https://example.org/page/{rng.randint(1, 999)} for more'
+        elif choice < 0.35:
+            self._footnotes += 1
+            text += f' with a note[^{self._footnotes}]'
+        elif choice < 0.45:
+            self._references += 1
+            text += f' [{self._words(1, 2)}][ref{self._references}]'
+        elif choice < 0.6:
+            text += f' *{self._words(1, 3)}* and **{self._words(1, 2)}**'
+        elif choice < 0.62:
+            text += f' *{self._words(1, 2)}_ mismatched'
+        elif choice < 0.65:
+            text += '   '
+        return text
+
+    def _heading(self) -> List[str]:
+        level = self.rng.randint(1, 6)
+        if self.rng.random() < 0.05:
+            return ['#' * level + self._words(1, 4)]
+        return ['#' * level + ' ' + self._words(1, 5).title()]
+
+    def _paragraph(self) -> List[str]:
+        return [self._inline() for _ in range(self.rng.randint(1, 6))]
+
+    def _deep_list(self) -> List[str]:
+        lines = []
+        depth = 0
+        ordered = self.rng.random() < 0.3
+        for n in range(self.rng.randint(3, 30)):
+            depth = max(0, min(8, depth + self.rng.choice((-1, 0, 0, 1))))
+            marker = f'{n + 1}.' if ordered else self.rng.choice('-*+')
+            spacing = '  ' if self.rng.random() < 0.03 else ' '
+            lines.append('  ' * depth + marker + spacing + self._inline())
+        return lines
+
+    def _fence(self) -> List[str]:
+        fence = self.rng.choice(('```', '```', '~~~'))
+        lines = [fence + self.rng.choice(LANGUAGES)]
+        for _ in range(self.rng.randint(5, 200)):
+            # Code that looks like markdown must not be checked
+            lines.append(self.rng.choice((
+                f'    value = "{self._words(1, 3)}"',
+                f'# not a heading {self._words(1, 2)}',
+                f'- [{self._words(1, 1)}] [^x] :::note',
+            )))
+        lines.append(fence)
+        return lines
+
+    def _containers(self) -> List[str]:
+        depth = self.rng.randint(1, 4)
+        colons = 3 + depth
+        lines = []
+        for level in range(depth):
+            lines.append(':' * (colons - level) + ' ' + self.rng.choice(ADMONITIONS))
+            lines.append(self._inline())
+        for level in reversed(range(depth)):
+            lines.append(':' * (colons - level))
+        return lines
+
+    def _task_list(self) -> List[str]:
+        return [f'- [{self.rng.choice(" xX")}] {self._words(2, 6)}'
+                for _ in range(self.rng.randint(2, 8))]
+
+    def _misc(self) -> List[str]:
+        return self.rng.choice((
+            [f'{self._words(1, 3)} {{.note #id{self.rng.randint(1, 99)} data-x=1}}'],
+            [self._words(1, 3).title(), f': {self._words(3, 8)}'],
+            [self._words(2, 4).title(), '======'],
+            ['---'],
+            ['--'],
+            [f'    indented {self._words(2, 4)}'],
+            ['<div>', self._words(3, 6), '</div>'],
+        ))
+
+
+def corpus_digest(paths: List[Path]) -> str:
+    """Hash the names and contents of corpus files, to identify a reused corpus."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.name.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(path.read_bytes())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def generate_corpus(directory: Path, files: int, lines: int, seed: int = 0) -> List[Path]:
+    """
+    Write a seeded synthetic corpus.
+
+    Args:
+        directory: Directory to write the documents into
+        files: Number of documents
+        lines: Approximate number of lines per document
+        seed: Random seed
+
+    Returns:
+        Paths of the generated documents, in sorted order
+    """
+    generator = CorpusGenerator(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for n in range(files):
+        path = directory / f'doc{n:05d}.md'
+        path.write_text(generator.document(lines), encoding='utf-8')
+        paths.append(path)
+    return paths
+
+
+def _tools(review_file: Path) -> Dict[str, Dict[str, Any]]:
+    """The benchmarked scripts and how to run them on one file."""
+    return {
+        'validate_markdown': {
+            'create': lambda profile=False: MarkdownValidator(profile=profile),
+            'run': lambda tool, path: tool.validate_file(path),
+        },
+        'check_extensions': {
+            'create': lambda profile=False: ExtensionChecker(profile=profile),
+            'run': lambda tool, path: tool.check_file(path),
+        },
+        'format_markdown': {
+            'create': lambda profile=False: MarkdownFormatter(review_file, profile=profile),
+            'run': lambda tool, path: tool.format_file(path),
+        },
+    }
+
+
+def _cleanup(paths: List[Path]):
+    """Remove formatter output so every run starts from the same corpus."""
+    for path in paths:
+        output = path.with_suffix('.formatted.md')
+        if output.exists():
+            output.unlink()
+
+
+def benchmark_tool(spec: Dict[str, Any], paths: List[Path], total_bytes: int,
+                   total_lines: int, repeat: int) -> Dict[str, Any]:
+    """
+    Measure one script over the corpus.
+
+    Throughput is the best of ``repeat`` plain runs; per-check timings
+    and peak memory come from separate instrumented and traced runs so
+    their overhead does not distort throughput.
+    """
+    run: Callable = spec['run']
+
+    best = None
+    for _ in range(repeat):
+        tool = spec['create']()
+        start = time.perf_counter()
+        for path in paths:
+            run(tool, path)
+        elapsed = time.perf_counter() - start
+        _cleanup(paths)
+        best = elapsed if best is None else min(best, elapsed)
+
+    tool = spec['create'](profile=True)
+    summary = summarize([run(tool, path) for path in paths], top=None)
+    _cleanup(paths)
+
+    tool = spec['create']()
+    tracemalloc.start()
+    for path in paths:
+        run(tool, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    _cleanup(paths)
+
+    return {
+        'seconds': round(best, 6),
+        'mb_per_s': round(total_bytes / (1024 * 1024) / best, 3) if best else None,
+        'lines_per_s': round(total_lines / best) if best else None,
+        'peak_memory_mb': round(peak / (1024 * 1024), 3),
+        'checks': {entry['check']: entry['seconds']
+                   for entry in summary['slowest_checks']},
+    }
+
+
+def _git_commit() -> str:
+    """Commit of the scripts being measured, if they are in a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              cwd=Path(__file__).parent, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(paths: List[Path], repeat: int = 3,
+                  tools: List[str] = None) -> Dict[str, Any]:
+    """
+    Benchmark the scripts over a corpus.
+
+    Args:
+        paths: Markdown files to process
+        repeat: Number of timed runs per script (the best is kept)
+        tools: Names of the scripts to run (default: all)
+
+    Returns:
+        Dictionary with corpus statistics and per-script results
+    """
+    total_bytes = sum(path.stat().st_size for path in paths)
+    total_lines = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            total_lines += sum(1 for _ in f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        specs = _tools(Path(tmp) / 'review.md')
+        results = {}
+        for name in tools or specs:
+            results[name] = benchmark_tool(specs[name], paths, total_bytes,
+                                           total_lines, repeat)
+
+    return {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'corpus': {
+            'files': len(paths),
+            'bytes': total_bytes,
+            'lines': total_lines,
+        },
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]):
+    """Print per-script and per-check time ratios against a saved run."""
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} "
+          f"(ratio < 1.0 is faster)")
+    for name, result in current['results'].items():
+        old = baseline.get('results', {}).get(name)
+        if not old:
+            continue
+        print(f"  {name}: {result['seconds'] / old['seconds']:.2f}x time, "
+              f"{result['peak_memory_mb'] / old['peak_memory_mb']:.2f}x memory"
+              if old['seconds'] and old['peak_memory_mb'] else f"  {name}: no baseline timing")
+        for check, seconds in result['checks'].items():
+            old_seconds = old.get('checks', {}).get(check)
+            if old_seconds:
+                print(f"    {check}: {seconds / old_seconds:.2f}x")
+
+
+def main():
+    """Main entry point for the benchmark."""
+    if '--help' in sys.argv or '-h' in sys.argv:
+        print("Usage: python benchmark.py [--files N] [--lines N] [--seed S] [--repeat R]")
+        print("                           [--corpus DIR] [--tools a,b] [--output results.json]")
+        print("                           [--compare baseline.json]")
+        print("\nOptions:")
+        print("  --files N         Number of generated documents (default: 20)")
+        print("  --lines N         Approximate lines per document (default: 2000)")
+        print("  --seed S          Random seed for the corpus (default: 0)")
+        print("  --repeat R        Timed runs per script, best is kept (default: 3)")
+        print("  --corpus DIR      Keep the generated corpus in DIR; existing .md files")
+        print("                    in DIR are benchmarked instead of generating new ones")
+        print("  --tools a,b       Only run these scripts")
+        print("  --output FILE     Results file (default: benchmark_results.json)")
+        print("  --compare FILE    Print ratios against an earlier results file")
+        sys.exit(1)
+
+    options = {'--files': '20', '--lines': '2000', '--seed': '0', '--repeat': '3',
+               '--corpus': None, '--tools': None,
+               '--output': 'benchmark_results.json', '--compare': None}
+
+    # Parse optional arguments
+    i = 1
+    while i < len(sys.argv):
+        if sys.argv[i] in options and i + 1 < len(sys.argv):
+            options[sys.argv[i]] = sys.argv[i + 1]
+            i += 2
+        else:
+            i += 1
+
+    try:
+        files, lines, seed, repeat = (int(options[name]) for name in
+                                      ('--files', '--lines', '--seed', '--repeat'))
+    except ValueError:
+        print("Error: --files, --lines, --seed and --repeat expect integers")
+        sys.exit(1)
+
+    tools = options['--tools'].split(',') if options['--tools'] else None
+    unknown = [name for name in tools or [] if name not in _tools(None)]
+    if unknown:
+        print(f"Error: unknown tool(s): {', '.join(unknown)}")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = Path(options['--corpus']) if options['--corpus'] else Path(tmp)
+        paths = sorted(path for path in corpus_dir.glob('*.md')
+                       if not path.name.endswith('.formatted.md'))
+        # The seed only describes a corpus generated by this run; a reused
+        # corpus is identified by its location and content instead
+        if paths:
+            print(f"Using {len(paths)} existing files in {corpus_dir}")
+            provenance = {'path': str(corpus_dir.resolve()),
+                          'sha256': corpus_digest(paths)}
+        else:
+            print(f"Generating {files} files of ~{lines} lines (seed {seed})")
+            paths = generate_corpus(corpus_dir, files, lines, seed)
+            provenance = {'seed': seed}
+
+        report = run_benchmark(paths, repeat, tools)
+    report['corpus'].update(provenance)
+
+    for name, result in report['results'].items():
+        print(f"\n{name}: {result['seconds']:.3f}s, {result['mb_per_s']} MB/s, "
+              f"{result['lines_per_s']} lines/s, peak {result['peak_memory_mb']} MB")
+        for check, seconds in result['checks'].items():
+            print(f"  {check}: {seconds:.3f}s")
+
+    if options['--compare']:
+        with open(options['--compare'], 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+    output = Path(options['--output'])
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to: {output}")
+
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
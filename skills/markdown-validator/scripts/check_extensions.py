@@ -8,32 +8,93 @@ import sys
 import json
 import re
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+import markdown_patterns as patterns
+from markdown_lines import Document, iter_text_lines, iter_regions, PROSE
+from result_cache import ResultCache
+from check_profiler import CheckProfiler, summarize, print_summary
+from git_changes import changed_files, staged_content, GitError
+from report_writer import ReportWriter, report_path, REPORT_SUFFIXES, JSON, NDJSON
+from example_index import ExampleIndex, CONTAINER, ATTRIBUTE
+from symbol_index import (
+    SymbolIndex, normalize_reference_label, FOOTNOTE, REFERENCE,
+    UNDEFINED, UNREFERENCED, AMBIGUOUS
+)
+
+
+# Admonition container types that need no confirmation
+_ADMONITION_TYPES = {'note', 'tip', 'warning', 'danger', 'info', 'caution'}
+_PLAIN_CONTAINER_TYPES = {'container', 'details'}
+
+# Check that reports each extension; reports list issues grouped by check
+_CHECK_ORDER = {
+    'container': 0,
+    'admonition': 1,
+    'definition_list': 2,
+    'footnote': 3,
+    'reference_link': 4,
+    'task_list': 5,
+    'custom_attributes': 6,
+}
+
+# Per-line checks timed by --profile
+_PROFILED_CHECKS = (
+    '_check_containers',
+    '_check_definition_lists',
+    '_check_footnotes',
+    '_check_reference_links',
+    '_check_task_lists',
+    '_check_custom_attributes',
+    '_check_against_spec',
+)
+
+# Parsed and compiled spec rules by spec digest, shared by every checker
+# in the process whether or not a result cache is used
+_compiled_specs = {}
 
 
 class ExtensionChecker:
     """Checks custom markdown-it extension usage against specification."""
     
-    def __init__(self, spec_file: Path = None, examples_dir: Path = None):
+    def __init__(self, spec_file: Path = None, examples_dir: Path = None,
+                 cache: ResultCache = None, cross_file: bool = False,
+                 profile: bool = False):
         """
         Initialize extension checker.
         
         Args:
             spec_file: Path to markdown specification document
             examples_dir: Path to directory containing example markdown files
+            cache: Optional result cache for unchanged files
+            cross_file: If True, leave footnotes and reference links
+                unresolved and return each file's symbols instead, so
+                resolve_symbols() can match them across a document set
+            profile: If True, add per-check timings to each check_file() result
         """
         self.spec_file = spec_file
         self.examples_dir = examples_dir
+        self.cache = cache
+        self.cross_file = cross_file
         self.spec_rules = []
-        self.example_patterns = []
+        self.spec_digest = None
+        self.spec_usage = {}
+        self.examples = None
+        self._spec_matcher = None
+        self._spec_patterns = []
         self.issues = []
         self.uncertain_changes = []
         
         if spec_file and spec_file.exists():
             self._load_spec()
         
+        # Examples are indexed lazily, the first time a check needs them
         if examples_dir and examples_dir.exists():
-            self._load_examples()
+            self.examples = ExampleIndex(examples_dir, cache)
+        
+        self.profiler = None
+        if profile:
+            self.profiler = CheckProfiler(self, 'check_file', _PROFILED_CHECKS)
     
     def _load_spec(self):
         """Load and parse the specification document."""
@@ -41,51 +102,61 @@ class ExtensionChecker:
             with open(self.spec_file, 'r', encoding='utf-8') as f:
                 spec_content = f.read()
             
-            # Extract extension rules from spec
-            # Look for patterns like:
-            # - Extension name: container
-            # - Syntax: :::name ... :::
-            
-            # This is a simplified parser - can be extended based on actual spec format
-            sections = re.split(r'\n#{1,3}\s+', spec_content)
+            self.spec_digest = ResultCache.make_key(spec_content, 'spec_rules')
+            compiled = _compiled_specs.get(self.spec_digest)
+            if compiled is None:
+                # Parsed rules are also cached across runs by the hash of the spec text
+                cached = self.cache.get(self.spec_digest) if self.cache else None
+                if cached is not None:
+                    spec_rules = cached['spec_rules']
+                else:
+                    spec_rules = self._parse_spec(spec_content)
+                    if self.cache:
+                        self.cache.put(self.spec_digest, {'spec_rules': spec_rules})
+                compiled = _compiled_specs[self.spec_digest] = _compile_spec(spec_rules)
             
-            for section in sections:
-                # Look for extension definitions
-                ext_name_match = re.search(r'Extension[:\s]+`?([a-zA-Z0-9_-]+)`?', section, re.IGNORECASE)
-                syntax_match = re.search(r'Syntax[:\s]+`([^`]+)`', section, re.IGNORECASE)
-                
-                if ext_name_match and syntax_match:
-                    self.spec_rules.append({
-                        'name': ext_name_match.group(1),
-                        'syntax': syntax_match.group(1),
-                        'description': section[:200]  # First 200 chars as description
-                    })
+            self.spec_rules, self._spec_patterns, self._spec_matcher = compiled
             
         except Exception as e:
             print(f"Warning: Failed to load spec file: {e}", file=sys.stderr)
     
-    def _load_examples(self):
-        """Load example files to learn valid patterns."""
-        try:
-            example_files = list(self.examples_dir.glob('*.md'))
+    def _parse_spec(self, spec_content: str) -> List[Dict[str, str]]:
+        """Extract the extension rules from the specification text."""
+        spec_rules = []
+        
+        # Extract extension rules from spec
+        # Look for patterns like:
+        # - Extension name: container
+        # - Syntax: :::name ... :::
+        
+        # This is a simplified parser - can be extended based on actual spec format
+        sections = patterns.SPEC_SECTION_SPLIT.split(spec_content)
+        
+        for section in sections:
+            # Look for extension definitions
+            ext_name_match = patterns.SPEC_EXTENSION_NAME.search(section)
+            syntax_match = patterns.SPEC_SYNTAX.search(section)
             
-            for example_file in example_files:
-                with open(example_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    self.example_patterns.append({
-                        'file': example_file.name,
-                        'content': content
-                    })
+            if ext_name_match and syntax_match:
+                spec_rules.append({
+                    'name': ext_name_match.group(1),
+                    'syntax': syntax_match.group(1),
+                    'description': section[:200]  # First 200 chars as description
+                })
         
-        except Exception as e:
-            print(f"Warning: Failed to load examples: {e}", file=sys.stderr)
+        return spec_rules
     
-    def check_file(self, filepath: Path) -> Dict[str, Any]:
+    def check_file(self, filepath: Path, stream: bool = False,
+                   staged: bool = False) -> Dict[str, Any]:
         """
         Check a markdown file for custom extension usage.
         
         Args:
             filepath: Path to markdown file
+            stream: If True, check line by line from the open file so
+                memory stays bounded regardless of file size
+            staged: If True, check the copy staged in the git index
+                instead of the work-tree file (read whole, not streamed)
             
         Returns:
             Dictionary containing check results
@@ -93,33 +164,180 @@ class ExtensionChecker:
         self.issues = []
         self.uncertain_changes = []
         
+        if stream and not staged:
+            return self._check_stream(filepath)
+        
         try:
+            if staged:
+                content = staged_content(filepath)
+            else:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    content = f.read()
+        except Exception as e:
+            return self._read_error(filepath, e)
+        
+        return {'filepath': str(filepath), **self.check_content(content)}
+    
+    def check_content(self, content: str) -> Dict[str, Any]:
+        """
+        Check markdown text that is already in memory.
+        
+        Args:
+            content: Markdown document text, e.g. an unsaved editor buffer
+            
+        Returns:
+            Dictionary containing check results (without a filepath)
+        """
+        return self.check_document(Document(content))
+    
+    def check_document(self, document: Document) -> Dict[str, Any]:
+        """
+        Check a document whose lines may be shared with other tools.
+        
+        Args:
+            document: Document read once; its lines and regions are reused
+            
+        Returns:
+            Dictionary containing check results (without a filepath)
+        """
+        self.issues = []
+        self.uncertain_changes = []
+        
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.make_key(document.content, 'check_extensions',
+                                            self._cache_options())
+            cached = self._from_cache(cache_key)
+            if cached is not None:
+                return cached
+        
+        self._check_lines(document.texts, document.regions)
+        
+        return self._result(cache_key)
+    
+    def _check_stream(self, filepath: Path) -> Dict[str, Any]:
+        """Check a file from its line iterator without loading it whole."""
+        try:
+            cache_key = None
+            if self.cache:
+                cache_key = self.cache.make_file_key(filepath, 'check_extensions',
+                                                     self._cache_options())
+                cached = self._from_cache(cache_key)
+                if cached is not None:
+                    return {'filepath': str(filepath), **cached}
+            
             with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
+                self._check_lines(iter_text_lines(f))
         except Exception as e:
-            return {
-                'filepath': str(filepath),
-                'valid': False,
-                'error': f'Failed to read file: {str(e)}',
-                'issues': [],
-                'uncertain_changes': []
-            }
-        
-        # Check for common markdown-it extensions
-        self._check_containers(content)
-        self._check_admonitions(content)
-        self._check_definition_lists(content)
-        self._check_footnotes(content)
-        self._check_task_lists(content)
-        self._check_custom_attributes(content)
-        self._check_against_spec(content)
+            self.issues = []
+            self.uncertain_changes = []
+            return self._read_error(filepath, e)
         
+        return {'filepath': str(filepath), **self._result(cache_key)}
+    
+    def _read_error(self, filepath: Path, error: Exception) -> Dict[str, Any]:
+        """Build the result for a file that could not be read."""
         return {
             'filepath': str(filepath),
+            'valid': False,
+            'error': f'Failed to read file: {str(error)}',
+            'issues': [],
+            'uncertain_changes': []
+        }
+    
+    def _cache_options(self) -> Dict[str, Any]:
+        """Options that take part in the cache key."""
+        return {
+            'spec': self.spec_digest,
+            'examples': self.examples.files() if self.examples else [],
+            'cross_file': self.cross_file,
+        }
+    
+    def _from_cache(self, cache_key: str) -> Dict[str, Any]:
+        """Load a cached result into the checker, or return None."""
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.issues = cached['issues']
+            self.uncertain_changes = cached['uncertain_changes']
+            self.spec_usage = cached.get('spec_usage', {})
+        return cached
+    
+    def _result(self, cache_key: str = None) -> Dict[str, Any]:
+        """Build the result for the checked document and cache it."""
+        result = {
             'valid': len(self.issues) == 0,
             'issues': self.issues,
-            'uncertain_changes': self.uncertain_changes
+            'uncertain_changes': self.uncertain_changes,
+            'max_container_depth': self.max_container_depth
         }
+        if self.spec_rules:
+            result['spec_usage'] = self.spec_usage
+        if self.cross_file:
+            result['symbols'] = self.symbols.to_records(None)
+        if cache_key:
+            self.cache.put(cache_key, result)
+        return result
+    
+    def _check_lines(self, lines: Iterable[str], regions: Iterable[str] = None):
+        """
+        Run every extension check over the lines in a single pass.
+        
+        Only one line of lookahead is held (for definition lists); the
+        symbol index (one entry per distinct footnote or reference label)
+        is the only state that grows with the document.
+        
+        Args:
+            lines: Document lines without newlines
+            regions: Region of each line, if already known; otherwise
+                regions are tracked while the lines are read
+        """
+        # Open containers as (line, type, marker length), innermost last,
+        # with the shortest marker at or above each depth alongside
+        self._container_stack = []
+        self._container_shortest = []
+        self.max_container_depth = 0
+        self.symbols = SymbolIndex()
+        self.spec_usage = {}
+        
+        # Extensions inside code, front matter and HTML blocks are not
+        # markdown, so only prose lines are checked
+        if regions is None:
+            lines = iter_regions(lines)
+        else:
+            lines = zip(lines, regions)
+        
+        i = 0
+        line = None
+        prose = False
+        for next_line, region in lines:
+            next_prose = region == PROSE
+            if prose:
+                self._check_line(i, line, next_line if next_prose else None)
+            i += 1
+            line = next_line
+            prose = next_prose
+        if prose:
+            self._check_line(i, line, None)
+        
+        self._finish_containers()
+        if not self.cross_file:
+            for finding in self.symbols.resolve():
+                kind, entry = _symbol_entry(*finding)
+                getattr(self, kind).append(entry)
+        
+        # Report issues grouped by check, in the order the checks run
+        self.issues.sort(key=lambda issue: _CHECK_ORDER[issue['extension']])
+        self.uncertain_changes.sort(key=lambda change: _CHECK_ORDER[change['extension']])
+    
+    def _check_line(self, i: int, line: str, next_line: Optional[str]):
+        """Run every extension check on a single line."""
+        self._check_containers(i, line)
+        self._check_definition_lists(i, line, next_line)
+        self._check_footnotes(i, line)
+        self._check_reference_links(i, line)
+        self._check_task_lists(i, line)
+        self._check_custom_attributes(i, line)
+        self._check_against_spec(i, line)
     
     def _add_issue(self, line_num: int, extension: str, description: str,
                    severity: str = 'error'):
@@ -142,180 +360,344 @@ class ExtensionChecker:
             'reason': reason
         })
     
-    def _check_containers(self, content: str):
-        """Check container syntax (:::type ... :::)."""
-        lines = content.split('\n')
-        container_stack = []
-        
-        for i, line in enumerate(lines, 1):
-            # Opening container
-            opening = re.match(r'^::{3,}\s*(\w+)?', line)
-            if opening:
-                container_type = opening.group(1) if opening.group(1) else 'unknown'
-                container_stack.append({
-                    'line': i,
-                    'type': container_type,
-                    'marker': opening.group(0)
-                })
+    def _check_containers(self, i: int, line: str):
+        """
+        Check container and admonition syntax (:::type ... :::).
+        
+        Follows markdown-it-container: a container ends at the first bare
+        marker at least as long as its opening marker, so nested
+        containers must use fewer colons than the containers around them.
+        Each line costs O(1) apart from popping the containers it closes.
+        """
+        if not line.startswith(':::'):
+            return
+        
+        marker = patterns.CONTAINER_MARKER.match(line)
+        colons, container_type, rest = marker.groups()
+        length = len(colons)
+        stack = self._container_stack
+        shortest = self._container_shortest
+        
+        # Closing marker
+        if container_type is None and not rest.strip():
+            if not stack:
+                self._add_issue(i, 'container',
+                              'Closing container marker without opening')
+                return
             
-            # Closing container
-            elif re.match(r'^::{3,}\s*$', line):
-                if not container_stack:
-                    self._add_issue(i, 'container',
-                                  'Closing container marker without opening')
-                else:
-                    container_stack.pop()
-        
-        # Check for unclosed containers
-        for container in container_stack:
-            self._add_issue(container['line'], 'container',
-                          f'Unclosed container of type "{container["type"]}"')
-    
-    def _check_admonitions(self, content: str):
-        """Check admonition syntax (specific type of container)."""
-        lines = content.split('\n')
-        valid_admonition_types = ['note', 'tip', 'warning', 'danger', 'info', 'caution']
-        
-        for i, line in enumerate(lines, 1):
-            admonition = re.match(r'^::{3,}\s*(\w+)', line)
-            if admonition:
-                admon_type = admonition.group(1).lower()
-                if admon_type in valid_admonition_types:
-                    # Valid admonition
-                    pass
-                elif admon_type not in ['', 'container', 'details']:
-                    # Might be a typo or unknown type
-                    self._add_uncertain_change(
-                        i, 'admonition',
-                        line,
-                        line,
-                        f'Unknown admonition type "{admon_type}" - verify this is correct'
-                    )
+            if shortest[-1][0] > length:
+                open_line, open_type, open_length = stack[-1]
+                self._add_issue(i, 'container',
+                              f'Closing marker {colons} is shorter than the opening marker of '
+                              f'"{open_type}" on line {open_line}')
+                return
+            
+            # The outermost container with a marker no longer than this
+            # one ends here; usually that is simply the innermost one
+            if len(stack) == 1 or shortest[-2][0] > length:
+                depth = len(stack) - 1
+            else:
+                depth = self._outermost_closed_by(length)
+            
+            outer_type = stack[depth][1]
+            for open_line, open_type, _ in stack[depth + 1:]:
+                self._add_issue(open_line, 'container',
+                              f'Container of type "{open_type}" is not closed before the end of '
+                              f'"{outer_type}" on line {i}')
+            del stack[depth:]
+            del shortest[depth:]
+            return
+        
+        # Opening marker
+        container_type = container_type or 'unknown'
+        if stack and shortest[-1][0] <= length:
+            enclosing_line, enclosing_type, _ = stack[shortest[-1][1]]
+            self._add_issue(i, 'container',
+                          f'Nested container "{container_type}" must use fewer colons than '
+                          f'"{enclosing_type}" on line {enclosing_line}')
+        
+        if not shortest or length < shortest[-1][0]:
+            shortest.append((length, len(stack)))
+        else:
+            shortest.append(shortest[-1])
+        stack.append((i, container_type, length))
+        self.max_container_depth = max(self.max_container_depth, len(stack))
+        
+        admon_type = container_type.lower()
+        if admon_type in _ADMONITION_TYPES or admon_type in _PLAIN_CONTAINER_TYPES:
+            # Valid admonition
+            pass
+        elif self.examples and self.examples.knows(CONTAINER, admon_type):
+            # Used in the known-good examples
+            pass
+        elif container_type != 'unknown':
+            # Might be a typo or unknown type
+            self._add_uncertain_change(
+                i, 'admonition',
+                line,
+                line,
+                f'Unknown admonition type "{admon_type}" - verify this is correct'
+            )
+    
+    def _outermost_closed_by(self, length: int) -> int:
+        """Find the outermost open container whose marker is at most length."""
+        # The shortest marker per depth never grows with depth, so the
+        # first depth where it fits is found by binary search
+        shortest = self._container_shortest
+        low, high = 0, len(shortest) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if shortest[middle][0] <= length:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+    
+    def _finish_containers(self):
+        """Check for unclosed containers at the end of the document."""
+        for open_line, open_type, _ in self._container_stack:
+            self._add_issue(open_line, 'container',
+                          f'Unclosed container of type "{open_type}"')
     
-    def _check_definition_lists(self, content: str):
+    def _check_definition_lists(self, i: int, line: str, next_line: Optional[str]):
         """Check definition list syntax."""
-        lines = content.split('\n')
+        # Definition list item (term followed by : definition)
+        if next_line is None:
+            return
         
-        for i, line in enumerate(lines, 1):
-            # Definition list item (term followed by : definition)
-            if i < len(lines):
-                next_line = lines[i] if i < len(lines) else ''
-                
-                # Check for definition pattern
-                if re.match(r'^:\s+', next_line):
-                    # This is a definition, previous line should be the term
-                    if not lines[i-1].strip():
-                        self._add_issue(i, 'definition_list',
-                                      'Definition without term')
-    
-    def _check_footnotes(self, content: str):
-        """Check footnote syntax."""
-        lines = content.split('\n')
-        footnote_refs = set()
-        footnote_defs = set()
-        
-        for i, line in enumerate(lines, 1):
-            # Footnote references [^1]
-            refs = re.finditer(r'\[\^([^\]]+)\](?!:)', line)
-            for ref in refs:
-                footnote_refs.add(ref.group(1))
-            
-            # Footnote definitions [^1]:
-            defs = re.finditer(r'^\[\^([^\]]+)\]:\s*', line)
-            for def_match in defs:
-                footnote_id = def_match.group(1)
-                if footnote_id in footnote_defs:
-                    self._add_issue(i, 'footnote',
-                                  f'Duplicate footnote definition: [{footnote_id}]')
-                footnote_defs.add(footnote_id)
-        
-        # Check for references without definitions
-        for ref in footnote_refs:
-            if ref not in footnote_defs:
-                self._add_issue(0, 'footnote',
-                              f'Footnote reference [^{ref}] without definition',
-                              severity='warning')
-        
-        # Check for definitions without references
-        for def_id in footnote_defs:
-            if def_id not in footnote_refs:
-                self._add_uncertain_change(
-                    0, 'footnote',
-                    f'[^{def_id}]',
-                    '',
-                    f'Footnote definition [^{def_id}] never referenced'
-                )
+        # Check for definition pattern
+        if next_line.startswith(':') and patterns.DEFINITION.match(next_line):
+            # This is a definition, previous line should be the term
+            if not line.strip():
+                self._add_issue(i, 'definition_list',
+                              'Definition without term')
     
-    def _check_task_lists(self, content: str):
-        """Check GitHub-style task list syntax."""
-        lines = content.split('\n')
+    def _check_footnotes(self, i: int, line: str):
+        """Record footnote references and definitions in the symbol index."""
+        if '[^' not in line:
+            return
+        line = _without_code_spans(line)
         
-        for i, line in enumerate(lines, 1):
-            # Task list items
-            task = re.match(r'^(\s*[-*+])\s+\[([ xX])\]', line)
-            if task:
-                marker, check = task.groups()
-                
-                # Normalize checkbox
-                if check == 'X':
+        # Footnote references [^1]
+        refs = patterns.FOOTNOTE_REF.finditer(line)
+        for ref in refs:
+            self.symbols.use(FOOTNOTE, ref.group(1), None, i)
+        
+        # Footnote definitions [^1]:
+        defs = patterns.FOOTNOTE_DEF.finditer(line)
+        for def_match in defs:
+            footnote_id = def_match.group(1)
+            if self.symbols.define(FOOTNOTE, footnote_id, None, i) is not None:
+                self._add_issue(i, 'footnote',
+                              f'Duplicate footnote definition: [{footnote_id}]')
+    
+    def _check_reference_links(self, i: int, line: str):
+        """Record reference-link definitions and uses in the symbol index."""
+        if '[' not in line or ']' not in line:
+            return
+        line = _without_code_spans(line)
+        
+        # Definitions [label]: url
+        if ']:' in line:
+            definition = patterns.REFERENCE_DEF.match(line)
+            if definition:
+                label = normalize_reference_label(definition.group(1))
+                first = self.symbols.define(REFERENCE, label, None, i)
+                if first is not None:
                     self._add_uncertain_change(
-                        i, 'task_list',
+                        i, 'reference_link',
                         line,
-                        line.replace('[X]', '[x]'),
-                        'Task list checkbox should use lowercase "x"'
+                        '',
+                        f'Duplicate reference definition [{label}] - the one on line {first} is used'
                     )
-                
-                # Check for space after checkbox
-                if not re.match(r'^(\s*[-*+])\s+\[([ xX])\]\s+', line):
-                    self._add_issue(i, 'task_list',
-                                  'Task list checkbox should be followed by space')
+                return
+        
+        # Full and collapsed references [text][label] and [label][]
+        if '][' in line:
+            for match in patterns.REFERENCE_FULL.finditer(line):
+                label = normalize_reference_label(match.group(2) or match.group(1))
+                if label:
+                    self.symbols.use(REFERENCE, label, None, i)
+        
+        # Shortcut references [label] may just be bracketed text, so they
+        # only count as uses of existing definitions
+        for match in patterns.REFERENCE_SHORTCUT.finditer(line):
+            label = normalize_reference_label(match.group(1))
+            if label:
+                self.symbols.use(REFERENCE, label, None, i, explicit=False)
     
-    def _check_custom_attributes(self, content: str):
+    def _check_task_lists(self, i: int, line: str):
+        """Check GitHub-style task list syntax."""
+        if '[' not in line:
+            return
+        
+        # Task list items
+        task = patterns.TASK_ITEM.match(line)
+        if task:
+            marker, check = task.groups()
+            
+            # Normalize checkbox
+            if check == 'X':
+                self._add_uncertain_change(
+                    i, 'task_list',
+                    line,
+                    line.replace('[X]', '[x]'),
+                    'Task list checkbox should use lowercase "x"'
+                )
+            
+            # Check for space after checkbox
+            if not patterns.TASK_ITEM_SPACED.match(line):
+                self._add_issue(i, 'task_list',
+                              'Task list checkbox should be followed by space')
+    
+    def _check_custom_attributes(self, i: int, line: str):
         """Check custom attribute syntax {.class #id key=value}."""
-        lines = content.split('\n')
+        if '{' not in line:
+            return
         
-        for i, line in enumerate(lines, 1):
-            # Look for attribute blocks
-            attrs = re.finditer(r'\{([^}]+)\}', line)
-            for attr in attrs:
-                attr_content = attr.group(1)
+        # Look for attribute blocks
+        attrs = patterns.ATTRIBUTE_BLOCK.finditer(line)
+        for attr in attrs:
+            attr_content = attr.group(1)
+            
+            # Check if it looks like custom attributes
+            if patterns.ATTRIBUTE_SYNTAX.search(attr_content):
+                # Validate syntax
+                # Classes should start with .
+                # IDs should start with #
+                # Attributes should be key=value
                 
-                # Check if it looks like custom attributes
-                if re.search(r'\.([\w-]+)|\#([\w-]+)|(\w+)=', attr_content):
-                    # Validate syntax
-                    # Classes should start with .
-                    # IDs should start with #
-                    # Attributes should be key=value
-                    
-                    parts = attr_content.split()
-                    for part in parts:
-                        if not (part.startswith('.') or part.startswith('#') or '=' in part):
-                            self._add_uncertain_change(
-                                i, 'custom_attributes',
-                                attr.group(0),
-                                attr.group(0),
-                                f'Possibly malformed custom attribute: {part}'
-                            )
-    
-    def _check_against_spec(self, content: str):
-        """Check content against loaded specification rules."""
-        if not self.spec_rules:
+                parts = attr_content.split()
+                for part in parts:
+                    if not (part.startswith('.') or part.startswith('#') or '=' in part
+                            or (self.examples and self.examples.knows(ATTRIBUTE, part))):
+                        self._add_uncertain_change(
+                            i, 'custom_attributes',
+                            attr.group(0),
+                            attr.group(0),
+                            f'Possibly malformed custom attribute: {part}'
+                        )
+    
+    def _check_against_spec(self, i: int, line: str):
+        """Count the spec extensions used on a line in a single scan."""
+        if self._spec_matcher is None:
             return
         
-        lines = content.split('\n')
-        
-        for rule in self.spec_rules:
-            pattern = rule['syntax']
-            
-            # Convert spec syntax to regex (simplified)
-            # This would need to be more sophisticated for real specs
-            regex_pattern = re.escape(pattern).replace(r'\.\.\.', '.*')
+        for match in self._spec_matcher.finditer(line):
+            # Rules are ordered most specific first, so the first rule
+            # matching at this position is the most specific one
+            for rule, regex in self._spec_patterns:
+                if regex.match(line, match.start()):
+                    break
             
-            for i, line in enumerate(lines, 1):
-                if re.search(regex_pattern, line):
-                    # Found usage of this extension
-                    # Could do more detailed validation here
-                    pass
+            # Found usage of this extension
+            # Could do more detailed validation here
+            self.spec_usage[rule['name']] = self.spec_usage.get(rule['name'], 0) + 1
+
+
+def _compile_spec(spec_rules: List[Dict[str, str]]) -> Tuple:
+    """
+    Compile all spec rules into one matcher.
+    
+    The rules are joined into a single alternation so each line is
+    scanned once for every extension. The alternation has no capture
+    groups, which lets the regex engine skip ahead to the possible
+    first characters; the rule behind a hit is found afterwards.
+    Rules with more literal syntax come first, so where rules overlap
+    the most specific one is used.
+    
+    Returns:
+        The rules, (rule, pattern) pairs from most to least specific and
+        the combined matcher (None if there are no rules)
+    """
+    ordered = sorted(spec_rules, key=lambda rule: -len(rule['syntax'].replace('...', '')))
+    # Convert spec syntax to regex (simplified); '...' stands for a
+    # non-empty value, so a missing argument does not conform
+    # This would need to be more sophisticated for real specs
+    sources = [re.escape(rule['syntax']).replace(r'\.\.\.', r'.*\S.*')
+               for rule in ordered]
+    spec_patterns = [(rule, re.compile(source)) for rule, source in zip(ordered, sources)]
+    spec_matcher = re.compile('|'.join(sources)) if sources else None
+    return spec_rules, spec_patterns, spec_matcher
+
+
+def _without_code_spans(line: str) -> str:
+    """Remove inline code spans, whose brackets are not markdown syntax."""
+    if '`' not in line:
+        return line
+    return patterns.INLINE_CODE.sub('', line)
+
+
+def _symbol_entry(finding: str, kind: str, label: str, filepath: Optional[str],
+                  line: int, other_files: List[str]):
+    """
+    Describe a symbol resolution finding as an issue or uncertain change.
+    
+    Returns:
+        Tuple of the result list name ('issues' or 'uncertain_changes')
+        and the entry to add to it
+    """
+    if kind == FOOTNOTE:
+        extension, symbol = 'footnote', f'[^{label}]'
+        name = f'Footnote reference {symbol}'
+    else:
+        extension, symbol = 'reference_link', f'[{label}]'
+        name = f'Reference link {symbol}'
+    
+    if finding == UNDEFINED:
+        return 'issues', {
+            'line': line,
+            'extension': extension,
+            'description': f'{name} without definition',
+            'severity': 'warning'
+        }
+    
+    if finding == AMBIGUOUS:
+        reason = f'{name} is defined in several files: {", ".join(other_files)}'
+    elif finding == UNREFERENCED:
+        kind_name = 'Footnote definition' if kind == FOOTNOTE else 'Reference definition'
+        reason = f'{kind_name} {symbol} never referenced'
+    else:
+        raise ValueError(f'Unknown symbol finding: {finding}')
+    return 'uncertain_changes', {
+        'line': line,
+        'extension': extension,
+        'current': symbol,
+        'suggested': '',
+        'reason': reason
+    }
+
+
+def resolve_symbols(results: List[Dict[str, Any]]):
+    """
+    Resolve footnotes and reference links across a set of checked files.
+    
+    A use resolves to a definition in its own file first and otherwise to
+    a definition in any other file. The findings are added to the results
+    in place, and the ``symbols`` entries from cross-file checking are
+    removed.
+    
+    Args:
+        results: check_file() results from a checker with cross_file=True
+    """
+    index = SymbolIndex()
+    by_file = {}
+    for result in results:
+        by_file[result['filepath']] = result
+        symbols = result.pop('symbols', None)
+        if symbols:
+            index.add_records(result['filepath'], symbols)
+    
+    for finding in index.resolve():
+        kind, entry = _symbol_entry(*finding)
+        by_file[finding[3]][kind].append(entry)
+    
+    # Keep each report grouped by check, as the checker leaves it
+    for result in results:
+        result['issues'].sort(key=lambda issue: _CHECK_ORDER[issue['extension']])
+        result['uncertain_changes'].sort(key=lambda change: _CHECK_ORDER[change['extension']])
+        if not result.get('error'):
+            result['valid'] = len(result['issues']) == 0
 
 
 def main():
@@ -323,11 +705,31 @@ def main():
     if len(sys.argv) < 2:
         print("Usage: python check_extensions.py <file.md> [--spec spec.md] [--examples examples/]")
         print("       python check_extensions.py <directory/> [--spec spec.md] [--examples examples/]")
+        print("\nOptions:")
+        print("  --cache DIR       Reuse results for unchanged files from a cache in DIR")
+        print("  --cache-size MB   Maximum cache size before eviction (default: 256)")
+        print("  --stream          Check line by line for very large files")
+        print("  --cross-file      Resolve footnotes and reference links across all files")
+        print("  --profile         Record per-check timings and regex calls in the report")
+        print("  --profile-top N   Slowest files and checks to summarize (default: 10)")
+        print("  --format FORMAT   Report format: json (default), ndjson, sarif or columnar")
+        print("  --ndjson          Stream the report as NDJSON, one line per file")
+        print("  --changed-since REF  Only check files changed since the merge base with REF")
+        print("  --staged          Only check files staged in the git index, as staged")
         sys.exit(1)
     
     target = Path(sys.argv[1])
     spec_file = None
     examples_dir = None
+    cache_dir = None
+    cache_size = 256
+    stream = False
+    cross_file = False
+    profile = False
+    profile_top = 10
+    report_format = JSON
+    changed_since = None
+    staged = False
     
     # Parse optional arguments
     i = 2
@@ -338,53 +740,143 @@ def main():
         elif sys.argv[i] == '--examples' and i + 1 < len(sys.argv):
             examples_dir = Path(sys.argv[i + 1])
             i += 2
+        elif sys.argv[i] == '--cache' and i + 1 < len(sys.argv):
+            cache_dir = Path(sys.argv[i + 1])
+            i += 2
+        elif sys.argv[i] == '--cache-size' and i + 1 < len(sys.argv):
+            try:
+                cache_size = int(sys.argv[i + 1])
+            except ValueError:
+                print(f"Error: --cache-size expects an integer, got {sys.argv[i + 1]}")
+                sys.exit(1)
+            i += 2
+        elif sys.argv[i] == '--stream':
+            stream = True
+            i += 1
+        elif sys.argv[i] == '--cross-file':
+            cross_file = True
+            i += 1
+        elif sys.argv[i] == '--profile':
+            profile = True
+            i += 1
+        elif sys.argv[i] == '--profile-top' and i + 1 < len(sys.argv):
+            try:
+                profile_top = int(sys.argv[i + 1])
+            except ValueError:
+                print(f"Error: --profile-top expects an integer, got {sys.argv[i + 1]}")
+                sys.exit(1)
+            i += 2
+        elif sys.argv[i] == '--format' and i + 1 < len(sys.argv):
+            report_format = sys.argv[i + 1]
+            if report_format not in REPORT_SUFFIXES:
+                print(f"Error: --format expects one of {', '.join(REPORT_SUFFIXES)}, got {report_format}")
+                sys.exit(1)
+            i += 2
+        elif sys.argv[i] == '--ndjson':
+            report_format = NDJSON
+            i += 1
+        elif sys.argv[i] == '--changed-since' and i + 1 < len(sys.argv):
+            changed_since = sys.argv[i + 1]
+            i += 2
+        elif sys.argv[i] == '--staged':
+            staged = True
+            i += 1
         else:
             i += 1
     
-    checker = ExtensionChecker(spec_file, examples_dir)
+    cache = ResultCache(cache_dir, cache_size * 1024 * 1024) if cache_dir else None
+    checker = ExtensionChecker(spec_file, examples_dir, cache, cross_file, profile)
     
     # Collect files to check
     if target.is_file():
         files = [target]
     elif target.is_dir():
-        files = list(target.rglob('*.md'))
+        files = sorted(target.rglob('*.md'))
     else:
         print(f"Error: {target} is not a valid file or directory")
         sys.exit(1)
     
-    # Check all files
-    results = []
-    for filepath in files:
-        result = checker.check_file(filepath)
-        results.append(result)
-        
-        print(f"\n{'='*60}")
-        print(f"File: {result['filepath']}")
-        print(f"Valid: {result['valid']}")
-        
-        if result.get('error'):
-            print(f"Error: {result['error']}")
-        
-        if result['issues']:
-            print(f"\nExtension issues found: {len(result['issues'])}")
-            for issue in result['issues']:
-                print(f"  Line {issue['line']} [{issue['severity'].upper()}] {issue['extension']}: {issue['description']}")
-        
-        if result['uncertain_changes']:
-            print(f"\nUncertain changes: {len(result['uncertain_changes'])}")
-            for change in result['uncertain_changes']:
-                print(f"  Line {change['line']} [{change['extension']}]: {change['reason']}")
+    # Only check files changed relative to a git ref or staged in the index.
+    # Cross-file resolution still needs the symbols of every file; with
+    # --cache, unchanged files are answered from the cache
+    changed = None
+    if changed_since or staged:
+        try:
+            changed = changed_files(target, changed_since, staged)
+        except GitError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        if not cross_file:
+            files = changed
+    
+    # Staged files are checked as staged; the other files --cross-file
+    # reads for their symbols come from the work tree
+    from_index = set(changed) if staged else set()
+    
+    # Check all files. Results are reported as soon as each file is
+    # checked, except with --cross-file, where every file's symbols are
+    # needed before any file's footnotes and references can be resolved
+    results = (checker.check_file(filepath, stream, filepath in from_index)
+               for filepath in files)
+    if cross_file:
+        results = list(results)
+        resolve_symbols(results)
+        if changed is not None:
+            reported = {str(filepath) for filepath in changed}
+            results = [result for result in results if result['filepath'] in reported]
+    
+    report_file = report_path('extension_check_report', report_format)
+    all_valid = True
+    profiles = []
+    with ReportWriter(report_file, report_format, 'check_extensions', 'extension') as report:
+        for result in results:
+            report.write(result)
+            all_valid = all_valid and result['valid']
+            if profile:
+                profiles.append({'filepath': result['filepath'],
+                                 'profile': result['profile']})
+            
+            print(f"\n{'='*60}")
+            print(f"File: {result['filepath']}")
+            print(f"Valid: {result['valid']}")
+            
+            if result.get('error'):
+                print(f"Error: {result['error']}")
+            
+            if result.get('max_container_depth', 0) > 1:
+                print(f"Containers nested {result['max_container_depth']} deep")
+            
+            if result.get('spec_usage'):
+                used = ', '.join(f"{name} ({count})"
+                                 for name, count in sorted(result['spec_usage'].items()))
+                print(f"Spec extensions used: {used}")
+            
+            if result['issues']:
+                print(f"\nExtension issues found: {len(result['issues'])}")
+                for issue in result['issues']:
+                    print(f"  Line {issue['line']} [{issue['severity'].upper()}] {issue['extension']}: {issue['description']}")
+            
+            if result['uncertain_changes']:
+                print(f"\nUncertain changes: {len(result['uncertain_changes'])}")
+                for change in result['uncertain_changes']:
+                    print(f"  Line {change['line']} [{change['extension']}]: {change['reason']}")
+    
+    if cache:
+        cache.close()
     
-    # Write detailed report
-    report_file = Path('extension_check_report.json')
-    with open(report_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2)
+    if profile:
+        summary = summarize(profiles, profile_top)
+        print_summary(summary)
+        with open('extension_check_profile.json', 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
     
     print(f"\n{'='*60}")
     print(f"Detailed report written to: {report_file}")
+    if profile:
+        print("Profile summary written to: extension_check_profile.json")
     
     # Return exit code based on check results
-    if any(not result['valid'] for result in results):
+    if not all_valid:
         sys.exit(1)
     else:
         sys.exit(0)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Opt-in per-check profiling shared by the markdown validator scripts.
+Wraps a tool's check methods to record wall time, lines visited and regular
+expression calls for every check, and adds them to each file's result.
+Nothing is wrapped unless profiling is requested, so normal runs pay nothing.
+"""
+
+import re
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import markdown_patterns as patterns
+
+
+# Pattern methods that run the regex engine
+_REGEX_METHODS = ('match', 'fullmatch', 'search', 'finditer', 'findall',
+                  'sub', 'subn', 'split')
+
+
+class _CountingPattern:
+    """Stand-in for a compiled pattern that counts calls per active check."""
+
+    def __init__(self, pattern: re.Pattern, profiler: 'CheckProfiler'):
+        self._pattern = pattern
+        self._profiler = profiler
+
+    def __getattr__(self, name: str) -> Any:
+        # Attributes such as .pattern and .groups
+        return getattr(self._pattern, name)
+
+
+def _counted(name: str) -> Callable:
+    """Build a _CountingPattern method that counts, then delegates."""
+    def method(self, *args, **kwargs):
+        regex_calls = self._profiler._regex_calls
+        active = self._profiler._active
+        regex_calls[active] = regex_calls.get(active, 0) + 1
+        return getattr(self._pattern, name)(*args, **kwargs)
+    method.__name__ = name
+    return method
+
+
+for _name in _REGEX_METHODS:
+    setattr(_CountingPattern, _name, _counted(_name))
+
+
+class CheckProfiler:
+    """
+    Per-file profile of a tool's checks.
+
+    The per-file entry method (e.g. ``validate_file``) and every check
+    method are replaced on the tool instance. A check is called once per
+    line it is given, so its call count is the number of lines it visited.
+    While a file is processed, the shared compiled patterns and any
+    patterns held by the tool are swapped for counting stand-ins; regex
+    calls made outside the checks (line classification, region tracking)
+    are reported separately. Profiling is not thread-safe.
+    """
+
+    def __init__(self, tool: Any, entry: str, checks: Iterable[str]):
+        """
+        Instrument a tool.
+
+        Args:
+            tool: Validator, checker or formatter instance
+            entry: Name of the method that processes one file and returns
+                its result dictionary
+            checks: Names of the per-line check methods to time
+        """
+        self.tool = tool
+        self.checks = list(checks)
+        self._active = None
+        self._stats = {}
+        self._regex_calls = {}
+
+        for name in self.checks:
+            setattr(tool, name, self._timed(name, getattr(tool, name)))
+        setattr(tool, entry, self._profiled(getattr(tool, entry)))
+
+    def _timed(self, name: str, method: Callable) -> Callable:
+        """Wrap a check to accumulate its time and call count."""
+        def timed(*args):
+            stats = self._stats[name]
+            outer = self._active
+            self._active = name
+            start = time.perf_counter()
+            try:
+                return method(*args)
+            finally:
+                stats[0] += time.perf_counter() - start
+                stats[1] += 1
+                self._active = outer
+        return timed
+
+    def _profiled(self, entry: Callable) -> Callable:
+        """Wrap the per-file method to add a profile to each result."""
+        def profiled(*args, **kwargs):
+            self._stats = {name: [0.0, 0] for name in self.checks}
+            self._regex_calls = {}
+            swapped = self._swap_patterns()
+            start = time.perf_counter()
+            try:
+                result = entry(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                for target, name, original in swapped:
+                    setattr(target, name, original)
+            result['profile'] = self._file_profile(elapsed)
+            return result
+        return profiled
+
+    def _swap_patterns(self) -> List[tuple]:
+        """Replace compiled patterns with counting stand-ins."""
+        swapped = []
+        for target in (patterns, self.tool):
+            for name, value in list(vars(target).items()):
+                if isinstance(value, re.Pattern):
+                    counting = _CountingPattern(value, self)
+                elif (isinstance(value, list) and value
+                      and all(isinstance(item, re.Pattern) for item in value)):
+                    counting = [_CountingPattern(item, self) for item in value]
+                else:
+                    continue
+                swapped.append((target, name, value))
+                setattr(target, name, counting)
+        return swapped
+
+    def _file_profile(self, elapsed: float) -> Dict[str, Any]:
+        """Build the profile of the file just processed."""
+        regex_calls = self._regex_calls
+        return {
+            'seconds': round(elapsed, 6),
+            'regex_calls': sum(regex_calls.values()),
+            'other_regex_calls': regex_calls.get(None, 0),
+            'checks': {
+                name: {
+                    'seconds': round(seconds, 6),
+                    'lines': lines,
+                    'regex_calls': regex_calls.get(name, 0),
+                }
+                for name, (seconds, lines) in self._stats.items()
+            },
+        }
+
+
+def summarize(results: List[Dict[str, Any]], top: Optional[int] = 10) -> Dict[str, Any]:
+    """
+    Aggregate the per-file profiles of a run.
+
+    Args:
+        results: File results carrying a ``profile`` entry
+        top: Number of files and checks to list (None lists all)
+
+    Returns:
+        Dictionary with run totals and the slowest files and checks
+    """
+    profiled = [result for result in results if 'profile' in result]
+    checks = {}
+    for result in profiled:
+        for name, stats in result['profile']['checks'].items():
+            total = checks.setdefault(name, {'seconds': 0.0, 'lines': 0, 'regex_calls': 0})
+            for key in total:
+                total[key] += stats[key]
+
+    seconds = sum(result['profile']['seconds'] for result in profiled)
+    slowest_files = sorted(profiled, key=lambda result: -result['profile']['seconds'])[:top]
+    slowest_checks = sorted(checks.items(), key=lambda item: -item[1]['seconds'])[:top]
+    return {
+        'files': len(profiled),
+        'seconds': round(seconds, 6),
+        'regex_calls': sum(result['profile']['regex_calls'] for result in profiled),
+        'outside_checks_seconds': round(
+            seconds - sum(stats['seconds'] for stats in checks.values()), 6),
+        'slowest_files': [{'filepath': result['filepath'],
+                           'seconds': result['profile']['seconds'],
+                           'regex_calls': result['profile']['regex_calls']}
+                          for result in slowest_files],
+        'slowest_checks': [{'check': name, **{key: round(value, 6)
+                                              for key, value in stats.items()}}
+                           for name, stats in slowest_checks],
+    }
+
+
+def print_summary(summary: Dict[str, Any]):
+    """Print a profile summary produced by summarize()."""
+    print(f"\n{'='*60}")
+    print(f"Profile: {summary['files']} files in {summary['seconds']:.3f}s, "
+          f"{summary['regex_calls']} regex calls "
+          f"({summary['outside_checks_seconds']:.3f}s outside checks)")
+
+    print("\nSlowest files:")
+    for entry in summary['slowest_files']:
+        print(f"  {entry['seconds']:.4f}s  {entry['regex_calls']:>8} regex  {entry['filepath']}")
+
+    print("\nSlowest checks:")
+    for entry in summary['slowest_checks']:
+        print(f"  {entry['seconds']:.4f}s  {entry['lines']:>8} lines  "
+              f"{entry['regex_calls']:>8} regex  {entry['check']}")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Index of extension usage in the example documents passed with --examples.
+Example files are only listed when the index is first needed and only read
+when their entry is not already in the result cache, so large examples
+directories cost nothing until a check asks about them.
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import markdown_patterns as patterns
+from markdown_lines import iter_regions, PROSE
+from result_cache import ResultCache
+
+
+# Index categories
+CONTAINER = 'container'
+ATTRIBUTE = 'attribute'
+
+
+def index_lines(lines: Iterable[str]) -> Dict[str, Dict[str, int]]:
+    """
+    Count the container types and custom attributes used in a document.
+
+    Args:
+        lines: Document lines without newlines
+
+    Returns:
+        Mapping of category to {value: number of uses}. Container types
+        are lowercased; attributes are keyed by their name (``key`` of
+        ``key=value``, or the whole ``.class``/``#id``/bare word).
+    """
+    index = {CONTAINER: {}, ATTRIBUTE: {}}
+    containers = index[CONTAINER]
+    attributes = index[ATTRIBUTE]
+
+    for line, region in iter_regions(lines):
+        if region != PROSE:
+            continue
+
+        if line.startswith(':::'):
+            marker = patterns.CONTAINER_MARKER.match(line)
+            if marker and marker.group(2):
+                container_type = marker.group(2).lower()
+                containers[container_type] = containers.get(container_type, 0) + 1
+
+        if '{' in line:
+            for attr in patterns.ATTRIBUTE_BLOCK.finditer(line):
+                if not patterns.ATTRIBUTE_SYNTAX.search(attr.group(1)):
+                    continue
+                for part in attr.group(1).split():
+                    name = part.split('=', 1)[0]
+                    attributes[name] = attributes.get(name, 0) + 1
+
+    return index
+
+
+class ExampleIndex:
+    """
+    Lazily built index of extension usage across an examples directory.
+
+    Nothing is read at construction. The directory is listed on first use,
+    and each file's index is persisted in the result cache (when one is
+    given), keyed by its path, size and modification time.
+    """
+
+    def __init__(self, examples_dir: Path, cache: ResultCache = None):
+        """
+        Initialize the index.
+
+        Args:
+            examples_dir: Path to directory containing example markdown files
+            cache: Optional result cache that persists per-file indexes
+        """
+        self.examples_dir = examples_dir
+        self.cache = cache
+        self._files = None
+        self._index = None
+
+    def files(self) -> List[List]:
+        """List the example files as [name, size, mtime_ns] entries."""
+        if self._files is None:
+            self._files = []
+            try:
+                for example_file in sorted(self.examples_dir.glob('*.md')):
+                    stat = example_file.stat()
+                    self._files.append([example_file.name, stat.st_size,
+                                        stat.st_mtime_ns])
+            except OSError as e:
+                print(f"Warning: Failed to list examples: {e}", file=sys.stderr)
+        return self._files
+
+    def known(self, category: str) -> Dict[str, int]:
+        """Return {value: uses} for a category, building the index if needed."""
+        if self._index is None:
+            self._index = self._build()
+        return self._index[category]
+
+    def knows(self, category: str, value: str) -> bool:
+        """Return True if the examples use this value in the category."""
+        return value in self.known(category)
+
+    def _build(self) -> Dict[str, Dict[str, int]]:
+        """Merge the per-file indexes of every example file."""
+        merged = {CONTAINER: {}, ATTRIBUTE: {}}
+        for name, size, mtime_ns in self.files():
+            file_index = self._file_index(self.examples_dir / name, size, mtime_ns)
+            if file_index is None:
+                continue
+            for category, values in file_index.items():
+                counts = merged[category]
+                for value, uses in values.items():
+                    counts[value] = counts.get(value, 0) + uses
+        return merged
+
+    def _file_index(self, path: Path, size: int,
+                    mtime_ns: int) -> Optional[Dict[str, Dict[str, int]]]:
+        """Index one example file, reusing the cached index if unchanged."""
+        cache_key = None
+        if self.cache:
+            cache_key = ResultCache.make_key(
+                f'{path.resolve()}\n{size}\n{mtime_ns}', 'example_index')
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                file_index = index_lines(line.rstrip('\n') for line in f)
+        except Exception as e:
+            print(f"Warning: Failed to load example {path.name}: {e}", file=sys.stderr)
+            return None
+
+        if cache_key:
+            self.cache.put(cache_key, file_index)
+        return file_index
@@ -5,26 +5,60 @@ Only applies changes that are certain to be correct.
 Logs uncertain changes for manual review.
 """
 
+import os
 import sys
 import json
-import re
+import stat
+import tempfile
 from pathlib import Path
 from typing import List, Dict, Any, Tuple
 
+import markdown_patterns as patterns
+from markdown_lines import Document
+from result_cache import ResultCache
+from check_profiler import CheckProfiler, summarize, print_summary
+from git_changes import changed_files, GitError
+from report_writer import ReportWriter, report_path, JSON, NDJSON
+
+
+# Position of each line-level fix; the change log is grouped by fix
+_FIX_ORDER = {
+    'heading_spacing': 0,
+    'list_spacing': 1,
+    'code_fence': 2,
+    'emphasis': 3,
+}
+
+# Per-line fixes timed by --profile
+_PROFILED_FIXES = (
+    '_fix_heading_spacing',
+    '_fix_list_spacing',
+    '_fix_code_fence_consistency',
+    '_fix_emphasis_markers',
+)
+
 
 class MarkdownFormatter:
     """Formats markdown files fixing syntax issues without changing text content."""
     
-    def __init__(self, review_file: Path = None):
+    def __init__(self, review_file: Path = None, cache: ResultCache = None,
+                 profile: bool = False):
         """
         Initialize formatter.
         
         Args:
             review_file: Path to write uncertain changes for manual review
+            cache: Optional result cache for unchanged files
+            profile: If True, add per-fix timings to each format_file() result
         """
         self.review_file = review_file or Path('formatting_review.md')
+        self.cache = cache
         self.changes_made = []
         self.uncertain_changes = []
+        self.profiler = None
+        
+        if profile:
+            self.profiler = CheckProfiler(self, 'format_file', _PROFILED_FIXES)
     
     def format_file(self, filepath: Path, in_place: bool = False) -> Dict[str, Any]:
         """
@@ -43,6 +77,8 @@ class MarkdownFormatter:
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
                 original_content = f.read()
+                # Universal newlines already turned CRLF into LF while reading
+                newlines_translated = f.newlines not in (None, '\n')
         except Exception as e:
             return {
                 'filepath': str(filepath),
@@ -52,25 +88,71 @@ class MarkdownFormatter:
                 'uncertain_changes': []
             }
         
-        # Apply formatting fixes
-        formatted_content = original_content
-        formatted_content = self._fix_heading_spacing(formatted_content)
-        formatted_content = self._fix_list_spacing(formatted_content)
-        formatted_content = self._fix_code_fence_consistency(formatted_content)
-        formatted_content = self._fix_emphasis_markers(formatted_content)
-        formatted_content = self._normalize_line_endings(formatted_content)
-        formatted_content = self._ensure_final_newline(formatted_content)
-        
-        # Determine output path
-        if in_place:
+        return self.format_document(filepath, Document(original_content),
+                                    newlines_translated, in_place)
+    
+    def format_document(self, filepath: Path, document: Document,
+                        newlines_translated: bool = False,
+                        in_place: bool = False) -> Dict[str, Any]:
+        """
+        Format a document that was already read, possibly shared with other tools.
+        
+        Args:
+            filepath: Path the document was read from
+            document: Document text; its split lines are reused, not modified
+            newlines_translated: True if CRLF endings were converted on read
+            in_place: If True, modify file in place; otherwise create .formatted.md
+            
+        Returns:
+            Dictionary containing formatting results
+        """
+        self.changes_made = []
+        self.uncertain_changes = []
+        original_content = document.content
+        
+        cache_key = None
+        cached = None
+        if self.cache:
+            cache_key = self.cache.make_key(original_content, 'format_markdown', {
+                'newlines_translated': newlines_translated,
+            })
+            cached = self.cache.get(cache_key)
+        
+        if cached is not None:
+            # Unmodified documents are stored without a copy of their content
+            formatted_content = cached['formatted']
+            if formatted_content is None:
+                formatted_content = original_content
+            self.changes_made = cached['changes']
+            self.uncertain_changes = cached['uncertain_changes']
+        else:
+            # Apply formatting fixes
+            formatted_content = self._apply_line_fixes(original_content, document.texts)
+            formatted_content = self._normalize_line_endings(formatted_content,
+                                                             newlines_translated)
+            formatted_content = self._ensure_final_newline(formatted_content)
+            
+            if cache_key:
+                self.cache.put(cache_key, {
+                    'formatted': (formatted_content
+                                  if formatted_content != original_content else None),
+                    'changes': self.changes_made,
+                    'uncertain_changes': self.uncertain_changes
+                })
+        
+        modified = newlines_translated or formatted_content != original_content
+        
+        # Determine output path; unmodified files are left untouched so
+        # their mtimes do not trigger watchers or rebuilds
+        if in_place or not modified:
             output_path = filepath
         else:
             output_path = filepath.with_suffix('.formatted.md')
         
         # Write formatted content
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(formatted_content)
+            if modified:
+                self._write_atomic(output_path, formatted_content, filepath)
         except Exception as e:
             return {
                 'filepath': str(filepath),
@@ -90,9 +172,53 @@ class MarkdownFormatter:
             'success': True,
             'changes': self.changes_made,
             'uncertain_changes': self.uncertain_changes,
-            'modified': formatted_content != original_content
+            'modified': modified,
+            'written': modified
         }
     
+    def _write_atomic(self, output_path: Path, content: str, source: Path):
+        """
+        Write content via a temporary file renamed over output_path.
+        
+        Concurrent readers see either the old or the new file, never a
+        partial one. A symlinked output path is resolved first so the link
+        is kept and its target rewritten. The output keeps the permissions
+        and, where the process may set them, the owner and group of the
+        source file.
+        """
+        output_path = Path(os.path.realpath(output_path))
+        fd, tmp_name = tempfile.mkstemp(dir=output_path.parent,
+                                        prefix=f'.{output_path.name}.',
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            source_stat = os.stat(source)
+            os.chmod(tmp_name, stat.S_IMODE(source_stat.st_mode))
+            self._copy_owner(tmp_name, source_stat)
+            os.replace(tmp_name, output_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+    
+    def _copy_owner(self, path: str, source_stat: os.stat_result):
+        """Give path the owner and group of the source, if permitted."""
+        if not hasattr(os, 'chown'):
+            return
+        euid = os.geteuid()
+        if euid != 0 and euid != source_stat.st_uid:
+            return
+        try:
+            os.chown(path, source_stat.st_uid, source_stat.st_gid)
+        except OSError:
+            # Not a member of the source's group; keep the default group
+            pass
+    
     def _log_change(self, change_type: str, description: str):
         """Log a change that was made."""
         self.changes_made.append({
@@ -110,108 +236,135 @@ class MarkdownFormatter:
             'reason': reason
         })
     
-    def _fix_heading_spacing(self, content: str) -> str:
-        """Fix spacing issues in headings."""
-        lines = content.split('\n')
-        modified = False
+    def _apply_line_fixes(self, content: str, lines: List[str] = None) -> str:
+        """
+        Apply every line-level fix in a single traversal.
         
-        for i, line in enumerate(lines):
-            # Fix missing space after #
-            match = re.match(r'^(#{1,6})([^\s#].*)$', line)
-            if match:
-                lines[i] = f"{match.group(1)} {match.group(2)}"
-                modified = True
-                self._log_change('heading_spacing',
-                               f'Added space after # in heading on line {i+1}')
+        Each fix sees the line as left by the previous one, exactly as if
+        the fixes ran as separate passes. The document is only re-joined
+        when at least one line changed.
+        
+        Args:
+            content: Document text
+            lines: The content already split into lines; left unmodified
+        """
+        original = content.split('\n') if lines is None else lines
+        fixed_lines = None
+        
+        for i, line in enumerate(original):
+            fixed = self._fix_heading_spacing(i, line)
+            fixed = self._fix_list_spacing(i, fixed)
+            fixed = self._fix_code_fence_consistency(i, fixed)
+            fixed = self._fix_emphasis_markers(i, fixed)
             
-            # Fix multiple spaces after #
-            elif re.match(r'^(#{1,6})\s{2,}(.+)$', line):
-                match = re.match(r'^(#{1,6})\s{2,}(.+)$', line)
-                lines[i] = f"{match.group(1)} {match.group(2)}"
-                modified = True
-                self._log_change('heading_spacing',
-                               f'Normalized spacing in heading on line {i+1}')
-        
-        return '\n'.join(lines) if modified else content
+            if fixed is not line:
+                if fixed_lines is None:
+                    fixed_lines = list(original)
+                fixed_lines[i] = fixed
+        
+        # Report changes grouped by fix, in the order the fixes run
+        self.changes_made.sort(key=lambda change: _FIX_ORDER[change['type']])
+        
+        return '\n'.join(fixed_lines) if fixed_lines is not None else content
     
-    def _fix_list_spacing(self, content: str) -> str:
+    def _fix_heading_spacing(self, i: int, line: str) -> str:
+        """Fix spacing issues in headings."""
+        if not line.startswith('#'):
+            return line
+        
+        # Fix missing space after #
+        match = patterns.HEADING_NO_SPACE.match(line)
+        if match:
+            self._log_change('heading_spacing',
+                           f'Added space after # in heading on line {i+1}')
+            return f"{match.group(1)} {match.group(2)}"
+        
+        # Fix multiple spaces after #
+        match = patterns.HEADING_WIDE_SPACE.match(line)
+        if match:
+            self._log_change('heading_spacing',
+                           f'Normalized spacing in heading on line {i+1}')
+            return f"{match.group(1)} {match.group(2)}"
+        
+        return line
+    
+    def _fix_list_spacing(self, i: int, line: str) -> str:
         """Fix spacing issues in lists."""
-        lines = content.split('\n')
-        modified = False
+        stripped = line.lstrip()
+        if not stripped:
+            return line
+        first = stripped[0]
         
-        for i, line in enumerate(lines):
+        if first in patterns.BULLET_START:
             # Fix unordered list spacing
-            match = re.match(r'^(\s*)([*+-])([^\s].*)$', line)
+            match = patterns.BULLET_NO_SPACE.match(line)
             if match:
                 indent, marker, rest = match.groups()
-                lines[i] = f"{indent}{marker} {rest}"
-                modified = True
                 self._log_change('list_spacing',
                                f'Fixed spacing after list marker on line {i+1}')
+                return f"{indent}{marker} {rest}"
             
             # Fix multiple spaces after list marker
-            elif re.match(r'^(\s*)([*+-])\s{2,}(\S)', line):
-                match = re.match(r'^(\s*)([*+-])\s{2,}(.*)$', line)
+            match = patterns.BULLET_WIDE_SPACE.match(line)
+            if match:
                 indent, marker, rest = match.groups()
-                lines[i] = f"{indent}{marker} {rest}"
-                modified = True
                 self._log_change('list_spacing',
                                f'Normalized spacing after list marker on line {i+1}')
-            
-            # Fix ordered list spacing
-            elif re.match(r'^(\s*)(\d+\.)([^\s].*)$', line):
-                match = re.match(r'^(\s*)(\d+\.)([^\s].*)$', line)
+                return f"{indent}{marker} {rest}"
+        
+        # Fix ordered list spacing
+        elif first.isdigit():
+            match = patterns.ORDERED_NO_SPACE.match(line)
+            if match:
                 indent, number, rest = match.groups()
-                lines[i] = f"{indent}{number} {rest}"
-                modified = True
                 self._log_change('list_spacing',
                                f'Fixed spacing after ordered list number on line {i+1}')
+                return f"{indent}{number} {rest}"
         
-        return '\n'.join(lines) if modified else content
+        return line
     
-    def _fix_code_fence_consistency(self, content: str) -> str:
+    def _fix_code_fence_consistency(self, i: int, line: str) -> str:
         """Ensure code fences use consistent markers (prefer ```)."""
-        lines = content.split('\n')
-        modified = False
-        
-        for i, line in enumerate(lines):
-            # Convert ~~~ to ```
-            if re.match(r'^~{3,}', line):
-                backticks = '`' * len(re.match(r'^~+', line).group())
-                lines[i] = re.sub(r'^~+', backticks, line)
-                modified = True
-                self._log_change('code_fence',
-                               f'Normalized code fence to backticks on line {i+1}')
-        
-        return '\n'.join(lines) if modified else content
+        # Convert ~~~ to ```
+        if not line.startswith('~~~'):
+            return line
+        
+        tildes = patterns.TILDE_RUN.match(line).group()
+        self._log_change('code_fence',
+                       f'Normalized code fence to backticks on line {i+1}')
+        return '`' * len(tildes) + line[len(tildes):]
     
-    def _fix_emphasis_markers(self, content: str) -> str:
+    def _fix_emphasis_markers(self, i: int, line: str) -> str:
         """Fix mismatched emphasis markers (only certain cases)."""
-        lines = content.split('\n')
-        modified = False
+        # Both markers must be present for a mismatch
+        if '*' not in line or '_' not in line:
+            return line
         
-        for i, line in enumerate(lines):
-            # Only fix clear mismatches like *text_ where it's obvious
-            # Be conservative here
-            original_line = line
-            
-            # Fix *text_ to *text*
-            line = re.sub(r'\*([^*_]+)_(?![a-zA-Z])', r'*\1*', line)
-            
-            # Fix _text* to _text_
-            line = re.sub(r'(?<![a-zA-Z])_([^*_]+)\*', r'_\1_', line)
-            
-            if line != original_line:
-                lines[i] = line
-                modified = True
-                self._log_change('emphasis',
-                               f'Fixed mismatched emphasis markers on line {i+1}')
+        # Only fix clear mismatches like *text_ where it's obvious
+        # Be conservative here
+        
+        # Fix *text_ to *text*
+        fixed = patterns.STAR_UNDERSCORE.sub(r'*\1*', line)
+        
+        # Fix _text* to _text_
+        fixed = patterns.UNDERSCORE_STAR.sub(r'_\1_', fixed)
         
-        return '\n'.join(lines) if modified else content
+        if fixed == line:
+            return line
+        
+        self._log_change('emphasis',
+                       f'Fixed mismatched emphasis markers on line {i+1}')
+        return fixed
     
-    def _normalize_line_endings(self, content: str) -> str:
-        """Normalize line endings to Unix style (LF)."""
-        if '\r\n' in content:
+    def _normalize_line_endings(self, content: str, translated: bool = False) -> str:
+        """
+        Normalize line endings to Unix style (LF).
+        
+        Args:
+            content: Document text
+            translated: True if CRLF endings were already converted on read
+        """
+        if translated or '\r\n' in content:
             self._log_change('line_endings', 'Normalized line endings to LF')
             return content.replace('\r\n', '\n')
         return content
@@ -250,6 +403,14 @@ def main():
         print("\nOptions:")
         print("  --in-place    Modify files in place instead of creating .formatted.md files")
         print("  --review FILE Write uncertain changes to FILE (default: formatting_review.md)")
+        print("  --cache DIR   Reuse results for unchanged files from a cache in DIR")
+        print("  --cache-size MB  Maximum cache size before eviction (default: 256)")
+        print("  --profile     Record per-fix timings and regex calls in the report")
+        print("  --profile-top N  Slowest files and fixes to summarize (default: 10)")
+        print("  --ndjson      Stream the report as NDJSON, one line per file")
+        print("  --changed-since REF  Only format files changed since the merge base with REF")
+        print("  --staged      Only format files staged in the git index (the work-tree")
+        print("                copies are formatted, so unstaged edits are kept)")
         sys.exit(1)
     
     target = Path(sys.argv[1])
@@ -262,7 +423,37 @@ def main():
         if idx + 1 < len(sys.argv):
             review_file = Path(sys.argv[idx + 1])
     
-    formatter = MarkdownFormatter(review_file)
+    # Parse cache arguments
+    cache = None
+    if '--cache' in sys.argv:
+        idx = sys.argv.index('--cache')
+        if idx + 1 < len(sys.argv):
+            cache_size = 256
+            if '--cache-size' in sys.argv:
+                size_idx = sys.argv.index('--cache-size')
+                if size_idx + 1 < len(sys.argv):
+                    try:
+                        cache_size = int(sys.argv[size_idx + 1])
+                    except ValueError:
+                        print(f"Error: --cache-size expects an integer, got {sys.argv[size_idx + 1]}")
+                        sys.exit(1)
+            cache = ResultCache(Path(sys.argv[idx + 1]), cache_size * 1024 * 1024)
+    
+    # Parse profiling arguments
+    profile = '--profile' in sys.argv
+    profile_top = 10
+    if '--profile-top' in sys.argv:
+        idx = sys.argv.index('--profile-top')
+        if idx + 1 < len(sys.argv):
+            try:
+                profile_top = int(sys.argv[idx + 1])
+            except ValueError:
+                print(f"Error: --profile-top expects an integer, got {sys.argv[idx + 1]}")
+                sys.exit(1)
+    
+    ndjson = '--ndjson' in sys.argv
+    
+    formatter = MarkdownFormatter(review_file, cache, profile)
     
     # Collect files to format
     if target.is_file():
@@ -273,41 +464,71 @@ def main():
         print(f"Error: {target} is not a valid file or directory")
         sys.exit(1)
     
-    # Format all files
-    results = []
-    for filepath in files:
-        result = formatter.format_file(filepath, in_place)
-        results.append(result)
-        
-        print(f"\n{'='*60}")
-        print(f"File: {result['filepath']}")
-        print(f"Success: {result['success']}")
-        
-        if result.get('error'):
-            print(f"Error: {result['error']}")
-        else:
-            print(f"Output: {result['output_path']}")
-            print(f"Modified: {result['modified']}")
+    # Only format files changed relative to a git ref or staged in the index
+    changed_since = None
+    if '--changed-since' in sys.argv:
+        idx = sys.argv.index('--changed-since')
+        if idx + 1 < len(sys.argv):
+            changed_since = sys.argv[idx + 1]
+    if changed_since or '--staged' in sys.argv:
+        try:
+            files = changed_files(target, changed_since, '--staged' in sys.argv)
+        except GitError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    
+    # Format all files, writing each result to the report as it arrives
+    report_format = NDJSON if ndjson else JSON
+    report_file = report_path('formatting_report', report_format)
+    all_succeeded = True
+    profiles = []
+    with ReportWriter(report_file, report_format, 'format_markdown') as report:
+        for filepath in files:
+            result = formatter.format_file(filepath, in_place)
+            report.write(result)
+            all_succeeded = all_succeeded and result['success']
+            if profile:
+                profiles.append({'filepath': result['filepath'],
+                                 'profile': result['profile']})
             
-            if result['changes']:
-                print(f"\nChanges applied: {len(result['changes'])}")
-                for change in result['changes']:
-                    print(f"  [{change['type']}] {change['description']}")
+            print(f"\n{'='*60}")
+            print(f"File: {result['filepath']}")
+            print(f"Success: {result['success']}")
             
-            if result['uncertain_changes']:
-                print(f"\nUncertain changes logged: {len(result['uncertain_changes'])}")
-                print(f"Review at: {formatter.review_file}")
+            if result.get('error'):
+                print(f"Error: {result['error']}")
+            else:
+                if result['written']:
+                    print(f"Output: {result['output_path']}")
+                else:
+                    print("Output: unchanged, not written")
+                print(f"Modified: {result['modified']}")
+                
+                if result['changes']:
+                    print(f"\nChanges applied: {len(result['changes'])}")
+                    for change in result['changes']:
+                        print(f"  [{change['type']}] {change['description']}")
+                
+                if result['uncertain_changes']:
+                    print(f"\nUncertain changes logged: {len(result['uncertain_changes'])}")
+                    print(f"Review at: {formatter.review_file}")
+    
+    if cache:
+        cache.close()
     
-    # Write summary report
-    report_file = Path('formatting_report.json')
-    with open(report_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2)
+    if profile:
+        summary = summarize(profiles, profile_top)
+        print_summary(summary)
+        with open('formatting_profile.json', 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
     
     print(f"\n{'='*60}")
     print(f"Detailed report written to: {report_file}")
+    if profile:
+        print("Profile summary written to: formatting_profile.json")
     
     # Return exit code based on results
-    if any(not result['success'] for result in results):
+    if not all_succeeded:
         sys.exit(1)
     else:
         sys.exit(0)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Changed-file selection shared by the markdown validator scripts.
+Asks the local git repository which markdown files differ from a base ref
+(including uncommitted and untracked files) or are staged in the index, so
+pre-commit hooks and pull request pipelines only check what changed.
+Staged files can be read from the index, so hooks check what is committed.
+"""
+
+import io
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+
+
+class GitError(Exception):
+    """Raised when the changed files cannot be determined from git."""
+
+
+def _run(cwd: Path, *args: str) -> bytes:
+    """Run a git command and return its raw output."""
+    try:
+        completed = subprocess.run(['git', *args], cwd=cwd, capture_output=True,
+                                   check=True)
+    except FileNotFoundError:
+        raise GitError('git is not installed')
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode('utf-8', 'replace').strip()
+        raise GitError(message or f"git {' '.join(args)} failed")
+    return completed.stdout
+
+
+def _git(cwd: Path, *args: str) -> List[str]:
+    """Run a git command and return its NUL-separated output entries."""
+    return [entry for entry in _run(cwd, *args).decode('utf-8').split('\0') if entry]
+
+
+def changed_files(target: Path, base: Optional[str] = None,
+                  staged: bool = False) -> List[Path]:
+    """
+    List the markdown files under a target that changed.
+
+    Args:
+        target: Markdown file or directory inside a git work tree
+        base: Ref to compare with. Files are compared from the merge base
+            of ``base`` and HEAD to the work tree, so commits on the
+            branch, uncommitted edits and untracked files are included
+        staged: List the files staged in the index instead
+
+    Returns:
+        Sorted paths of changed, existing ``.md`` files under the target
+
+    Raises:
+        GitError: If git is unavailable, the target is not in a work tree
+            or the ref is unknown
+    """
+    directory = target if target.is_dir() else target.parent
+    # --relative limits the diff to the directory and reports paths within it
+    diff = ['diff', '--name-only', '-z', '--relative', '--diff-filter=d']
+    # Outside a work tree git diff would silently compare directories
+    _git(directory, 'rev-parse', '--is-inside-work-tree')
+
+    if staged:
+        names = _git(directory, *diff, '--cached')
+    else:
+        merge_base = _git(directory, 'merge-base', base or 'HEAD', 'HEAD')[0].strip()
+        names = _git(directory, *diff, merge_base)
+        names += _git(directory, 'ls-files', '--others', '--exclude-standard', '-z')
+
+    files = set()
+    for name in names:
+        path = directory / name
+        if path.suffix == '.md' and path.is_file():
+            files.add(path)
+
+    if target.is_file():
+        return [target] if target in files else []
+    return sorted(files)
+
+
+def staged_content(path: Path) -> str:
+    """
+    Read the copy of a file that is staged in the index.
+
+    Args:
+        path: File inside a git work tree
+
+    Returns:
+        Staged text, with line endings translated as when reading the
+        work-tree file in text mode
+
+    Raises:
+        GitError: If git is unavailable or the file is not in the index
+    """
+    # ':./name' is the index entry relative to the file's own directory
+    blob = _run(path.parent, 'cat-file', 'blob', f':./{path.name}')
+    return io.TextIOWrapper(io.BytesIO(blob), encoding='utf-8').read()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Line classification shared by the markdown validator scripts.
+Splits a document once and tags every line with its block kind so that
+checks consume a typed line stream instead of re-splitting and re-matching.
+Each line also records the region it sits in (prose, fenced code, front
+matter or an HTML block) so checks can skip non-prose lines in O(1).
+"""
+
+from itertools import chain
+from typing import (Iterable, Iterator, List, NamedTuple, Optional, Sequence, TextIO,
+                    Tuple)
+
+import markdown_patterns as patterns
+
+
+# Line kinds
+BLANK = 'blank'
+HEADING = 'heading'
+FENCE = 'fence'
+HR = 'hr'
+LIST_ITEM = 'list_item'
+PARAGRAPH = 'paragraph'
+
+# Regions
+PROSE = 'prose'
+CODE = 'code'
+FRONT_MATTER = 'front_matter'
+HTML = 'html'
+
+# HTML blocks of CommonMark types 6 and 7 end at the next blank line
+_UNTIL_BLANK = ''
+
+# A '---' on line 1 opens front matter only if a closing '---' or '...'
+# follows within this many lines, so streams need a bounded lookahead
+FRONT_MATTER_MAX_LINES = 1000
+
+
+class Line(NamedTuple):
+    """A classified source line."""
+    number: int
+    text: str
+    kind: str
+    marker: str = ''
+    body: str = ''
+    underline: bool = False
+    region: str = PROSE
+
+
+class RegionTracker:
+    """
+    Incrementally assigns lines to prose, code, front matter or HTML regions.
+
+    Fed one line at a time, so the region index is built in the same pass
+    as classification and also works on streamed files. Fences toggle on
+    any backtick or tilde fence line, matching the validator's fence check.
+    Whether the document opens with front matter needs lookahead, so the
+    number of front matter lines is passed in (see ``front_matter_end``).
+    """
+
+    def __init__(self, front_matter: int = 0):
+        self.line_count = 0
+        self.front_matter = front_matter
+        self.in_fence = False
+        self._html_end = None
+
+    def snapshot(self) -> Tuple[bool, bool, Optional[str]]:
+        """Return the state that decides the regions of the following lines."""
+        return (self.in_fence, self.line_count < self.front_matter, self._html_end)
+
+    def restore(self, line_count: int, snapshot: Tuple[bool, bool, Optional[str]]):
+        """Resume tracking after ``line_count`` lines from a saved snapshot."""
+        self.line_count = line_count
+        self.in_fence, _, self._html_end = snapshot
+
+    def region(self, text: str) -> str:
+        """Return the region of the next line and advance past it."""
+        self.line_count += 1
+
+        if self.line_count <= self.front_matter:
+            return FRONT_MATTER
+
+        if self.in_fence:
+            if text[:1] in patterns.FENCE_START and patterns.FENCE.match(text):
+                self.in_fence = False
+            return CODE
+
+        if self._html_end is not None:
+            if self._html_end == _UNTIL_BLANK:
+                if not text.strip():
+                    self._html_end = None
+                    return PROSE
+            elif self._html_end in text.lower():
+                self._html_end = None
+            return HTML
+
+        if text[:1] in patterns.FENCE_START and patterns.FENCE.match(text):
+            self.in_fence = True
+            return CODE
+
+        if '<' in text[:4]:
+            return self._html_region(text)
+
+        return PROSE
+
+    def _html_region(self, text: str) -> str:
+        """Detect the start of an HTML block."""
+        match = patterns.HTML_RAW_BLOCK.match(text)
+        if match:
+            end = f'</{match.group(1).lower()}>'
+            if end not in text.lower():
+                self._html_end = end
+            return HTML
+
+        if patterns.HTML_COMMENT_BLOCK.match(text):
+            if '-->' not in text[text.index('<!--') + 4:]:
+                self._html_end = '-->'
+            return HTML
+
+        if patterns.HTML_TAG_BLOCK.match(text):
+            self._html_end = _UNTIL_BLANK
+            return HTML
+
+        return PROSE
+
+
+def front_matter_end(lines: Sequence[str]) -> int:
+    """
+    Count the front matter lines at the start of a document.
+
+    Args:
+        lines: Leading lines of the document, at least the first
+            ``FRONT_MATTER_MAX_LINES`` if it has that many
+
+    Returns:
+        Number of lines from the opening '---' to the closing '---' or
+        '...' inclusive, or 0 if the document has no closed front matter
+    """
+    if not lines or lines[0].rstrip() != '---':
+        return 0
+    for i in range(1, min(len(lines), FRONT_MATTER_MAX_LINES)):
+        if lines[i].rstrip() in ('---', '...'):
+            return i + 1
+    return 0
+
+
+def iter_regions(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """Lazily pair lines with their regions, buffering only the front matter lookahead."""
+    lines = iter(lines)
+    head = []
+    for text in lines:
+        head.append(text)
+        if (len(head) == FRONT_MATTER_MAX_LINES or head[0].rstrip() != '---'
+                or (len(head) > 1 and text.rstrip() in ('---', '...'))):
+            break
+    tracker = RegionTracker(front_matter_end(head))
+    for text in chain(head, lines):
+        yield text, tracker.region(text)
+
+
+def classify_line(number: int, text: str, region: str = PROSE) -> Line:
+    """
+    Classify a single line.
+
+    Args:
+        number: 1-based line number
+        text: Line content without the trailing newline
+        region: Region the line belongs to
+
+    Returns:
+        Line tagged with its kind. ``marker`` holds the heading hashes,
+        fence run or list marker; ``body`` holds the heading text or the
+        remainder of a list item after its marker.
+    """
+    stripped = text.lstrip()
+    if not stripped:
+        return Line(number, text, BLANK, region=region)
+
+    # Dispatch on the leading character so most lines skip the regexes
+    lead = text[0]
+    if lead in patterns.FENCE_START:
+        match = patterns.FENCE.match(text)
+        if match:
+            return Line(number, text, FENCE, match.group(1), region=region)
+    elif lead in patterns.HEADING_START:
+        match = patterns.HEADING.match(text)
+        if match:
+            return Line(number, text, HEADING, match.group(1), match.group(2),
+                            region=region)
+
+    underline = (lead in patterns.UNDERLINE_START
+                 and bool(patterns.SETEXT_UNDERLINE.match(text)))
+
+    first = stripped[0]
+    if first in patterns.HR_START and patterns.HR.match(text):
+        return Line(number, text, HR, underline=underline, region=region)
+
+    if first in patterns.BULLET_START:
+        match = patterns.UNORDERED_ITEM.match(text)
+    elif first.isdigit():
+        match = patterns.ORDERED_ITEM.match(text)
+    else:
+        match = None
+    if match:
+        return Line(number, text, LIST_ITEM, match.group(1),
+                    text[match.end():], underline, region)
+
+    return Line(number, text, PARAGRAPH, underline=underline, region=region)
+
+
+def classify_lines(content: str) -> List[Line]:
+    """
+    Split content into lines and classify each one in a single pass.
+
+    Args:
+        content: Full markdown document
+
+    Returns:
+        List of classified lines, numbered from 1
+    """
+    return list(classify_stream(content.split('\n')))
+
+
+def classify_stream(lines: Iterable[str]) -> Iterator[Line]:
+    """Lazily classify lines, numbering them from 1 and tracking regions."""
+    for i, (text, region) in enumerate(iter_regions(lines), 1):
+        yield classify_line(i, text, region)
+
+
+class Document:
+    """
+    A document read once and shared by every check that runs on it.
+
+    The split lines, their classification and their regions are each
+    computed on first use and then reused, so tools running one after
+    another on the same document do not split or classify it again.
+    """
+
+    def __init__(self, content: str):
+        self.content = content
+        self._texts = None
+        self._lines = None
+        self._regions = None
+
+    @property
+    def texts(self) -> List[str]:
+        """Lines of the document without newlines (do not modify)."""
+        if self._texts is None:
+            self._texts = self.content.split('\n')
+        return self._texts
+
+    @property
+    def lines(self) -> List[Line]:
+        """Classified lines, numbered from 1."""
+        if self._lines is None:
+            self._lines = list(classify_stream(self.texts))
+        return self._lines
+
+    @property
+    def regions(self) -> List[str]:
+        """Region of every line, taken from the classified lines if present."""
+        if self._regions is None:
+            if self._lines is not None:
+                self._regions = [line.region for line in self._lines]
+            else:
+                tracker = RegionTracker(front_matter_end(self.texts))
+                self._regions = [tracker.region(text) for text in self.texts]
+        return self._regions
+
+
+def iter_text_lines(f: TextIO) -> Iterator[str]:
+    """
+    Yield the lines of an open text file without reading it whole.
+
+    Lines are produced exactly as ``f.read().split('\\n')`` would produce
+    them, including the empty final line after a trailing newline.
+    """
+    ends_with_newline = True
+    for raw in f:
+        if raw.endswith('\n'):
+            yield raw[:-1]
+        else:
+            ends_with_newline = False
+            yield raw
+    if ends_with_newline:
+        yield ''
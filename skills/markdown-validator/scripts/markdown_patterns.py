@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Compiled regular expressions shared by the markdown validator scripts.
+Every per-line pattern is compiled once at import time. Callers guard the
+patterns with the cheap literal checks below so that most lines never
+reach the regex engine.
+"""
+
+import re
+
+
+# First characters that can start each construct (after any indentation)
+FENCE_START = '`~'
+HEADING_START = '#'
+HR_START = '*-_'
+BULLET_START = '*+-'
+UNDERLINE_START = '=-'
+
+# Line classification (markdown_lines)
+HEADING = re.compile(r'^(#{1,6})\s+(.+)$')
+FENCE = re.compile(r'^(`{3,}|~{3,})')
+HR = re.compile(r'^\s*([*\-_])\s*\1\s*\1')
+UNORDERED_ITEM = re.compile(r'^\s*([*+-])(?=\s)')
+ORDERED_ITEM = re.compile(r'^\s*(\d+\.)(?=\s)')
+SETEXT_UNDERLINE = re.compile(r'^[=-]+\s*$')
+
+# Region tracking (markdown_lines); HTML block starts follow CommonMark
+HTML_RAW_BLOCK = re.compile(r'^ {0,3}<(script|pre|style|textarea)(?:\s|>|$)', re.IGNORECASE)
+HTML_COMMENT_BLOCK = re.compile(r'^ {0,3}<!--')
+HTML_TAG_BLOCK = re.compile(
+    r'^ {0,3}</?(?:address|article|aside|base|basefont|blockquote|body|caption'
+    r'|center|col|colgroup|dd|details|dialog|dir|div|dl|dt|fieldset|figcaption'
+    r'|figure|footer|form|frame|frameset|h[1-6]|head|header|hr|html|iframe'
+    r'|legend|li|link|main|menu|menuitem|nav|noframes|ol|optgroup|option|p'
+    r'|param|search|section|summary|table|tbody|td|tfoot|th|thead|title|tr'
+    r'|track|ul)(?:\s|/?>|$)', re.IGNORECASE)
+
+# Validation (validate_markdown)
+BROKEN_LINK = re.compile(r'\[([^\]]+)\](?!\(|:|\[)')
+BARE_URL = re.compile(r'(?<![(\[])https?://[^\s)>]+')
+INDENTED_CODE = re.compile(r'^    \S')
+MISMATCHED_EMPHASIS = re.compile(
+    r'(?<!\*)\*(?!\*)([^*_]+)_(?!_)|(?<!_)_(?!_)([^*_]+)\*(?!\*)')
+SHORT_HR = re.compile(r'^\s*[*\-_]{2}\s*$')
+
+# Extensions (check_extensions)
+SPEC_SECTION_SPLIT = re.compile(r'\n#{1,3}\s+')
+SPEC_EXTENSION_NAME = re.compile(r'Extension[:\s]+`?([a-zA-Z0-9_-]+)`?', re.IGNORECASE)
+SPEC_SYNTAX = re.compile(r'Syntax[:\s]+`([^`]+)`', re.IGNORECASE)
+CONTAINER_MARKER = re.compile(r'^(:{3,})\s*(\w+)?(.*)$')
+DEFINITION = re.compile(r'^:\s+')
+FOOTNOTE_REF = re.compile(r'\[\^([^\]]+)\](?!:)')
+FOOTNOTE_DEF = re.compile(r'^\[\^([^\]]+)\]:\s*')
+REFERENCE_DEF = re.compile(r'^\[([^\]^][^\]]*)\]:')
+# Not after a word or ']' (arr[0][1], x[i][j]) and never footnotes ([^1][^2])
+REFERENCE_FULL = re.compile(r'(?<![\w\]])\[([^\]^][^\]]*)\]\[((?!\^)[^\]]*)\]')
+REFERENCE_SHORTCUT = re.compile(r'\[([^\]^][^\]]*)\](?![(\[:])')
+INLINE_CODE = re.compile(r'(`+).+?\1')
+TASK_ITEM = re.compile(r'^(\s*[-*+])\s+\[([ xX])\]')
+TASK_ITEM_SPACED = re.compile(r'^(\s*[-*+])\s+\[([ xX])\]\s+')
+ATTRIBUTE_BLOCK = re.compile(r'\{([^}]+)\}')
+ATTRIBUTE_SYNTAX = re.compile(r'\.([\w-]+)|\#([\w-]+)|(\w+)=')
+
+# Formatting (format_markdown)
+HEADING_NO_SPACE = re.compile(r'^(#{1,6})([^\s#].*)$')
+HEADING_WIDE_SPACE = re.compile(r'^(#{1,6})\s{2,}(.+)$')
+BULLET_NO_SPACE = re.compile(r'^(\s*)([*+-])([^\s].*)$')
+BULLET_WIDE_SPACE = re.compile(r'^(\s*)([*+-])\s{2,}(\S.*)$')
+ORDERED_NO_SPACE = re.compile(r'^(\s*)(\d+\.)([^\s].*)$')
+TILDE_RUN = re.compile(r'^~+')
+STAR_UNDERSCORE = re.compile(r'\*([^*_]+)_(?![a-zA-Z])')
+UNDERSCORE_STAR = re.compile(r'(?<![a-zA-Z])_([^*_]+)\*')
+
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Incremental report writer shared by the markdown validator scripts.
+Each file's result is written as soon as it is produced, as the next element
+of a pretty-printed JSON array, one line of NDJSON or one SARIF result.
+The compact columnar format keeps interned columns instead of a dictionary
+per issue, so large reports are a fraction of the size and fast to parse.
+"""
+
+import sys
+import json
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, TextIO
+
+
+# Report formats
+JSON = 'json'
+NDJSON = 'ndjson'
+SARIF = 'sarif'
+COLUMNAR = 'columnar'
+
+REPORT_SUFFIXES = {
+    JSON: '.json',
+    NDJSON: '.ndjson',
+    SARIF: '.sarif',
+    COLUMNAR: '.columnar.json',
+}
+
+COLUMNAR_FORMAT = 'markdown-validator-columnar'
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+
+# Result keys stored in columns; any others are kept per file as extras
+_COLUMN_KEYS = ('filepath', 'valid', 'issues', 'uncertain_changes')
+
+# SARIF level of issue severities; uncertain changes are notes
+_SARIF_LEVELS = {'error': 'error', 'warning': 'warning'}
+
+
+def report_path(stem: str, report_format: str) -> Path:
+    """Name of a report file, e.g. ``markdown_validation_report.sarif``."""
+    return Path(stem + REPORT_SUFFIXES[report_format])
+
+
+class ReportWriter:
+    """
+    Writes file results one at a time.
+
+    NDJSON reports hold one compact JSON object per line and are flushed
+    after every file, so other tools can consume them while the run is
+    still going. JSON reports are byte-for-byte what ``json.dump(results,
+    f, indent=2)`` would write for the whole list. SARIF reports are
+    streamed too; the rule list is written after the results. Columnar
+    reports hold compact columns in memory and are written on close.
+    """
+
+    def __init__(self, report_file: Path, report_format: str = JSON,
+                 tool: str = 'markdown-validator', kind_key: str = 'type'):
+        """
+        Open a report.
+
+        Args:
+            report_file: Path of the report to write
+            report_format: JSON, NDJSON, SARIF or COLUMNAR
+            tool: Name of the script, recorded in SARIF and columnar reports
+            kind_key: Key naming the check of an issue ('type' or 'extension')
+        """
+        if report_format not in REPORT_SUFFIXES:
+            raise ValueError(f'Unknown report format: {report_format}')
+        self.report_file = report_file
+        self.report_format = report_format
+        self.tool = tool
+        self.kind_key = kind_key
+        self.count = 0
+        self._rules = {}
+        self._sarif_results = 0
+        self._columns = _ColumnarReport(tool, kind_key) if report_format == COLUMNAR else None
+        self._file = open(report_file, 'w', encoding='utf-8')
+
+    def write(self, result: Dict[str, Any]):
+        """Append one file result to the report."""
+        if self.report_format == NDJSON:
+            self._file.write(json.dumps(result) + '\n')
+            self._file.flush()
+        elif self.report_format == JSON:
+            element = json.dumps(result, indent=2).replace('\n', '\n  ')
+            self._file.write(('[\n  ' if self.count == 0 else ',\n  ') + element)
+        elif self.report_format == SARIF:
+            self._write_sarif(result)
+        else:
+            self._columns.add(result)
+        self.count += 1
+
+    def close(self):
+        """Finish the report."""
+        if self._file.closed:
+            return
+        if self.report_format == JSON:
+            self._file.write('\n]' if self.count else '[]')
+        elif self.report_format == SARIF:
+            self._finish_sarif()
+        elif self.report_format == COLUMNAR:
+            json.dump(self._columns.to_dict(), self._file, separators=(',', ':'))
+        self._file.close()
+
+    def __enter__(self) -> 'ReportWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write_sarif(self, result: Dict[str, Any]):
+        """Write the SARIF results for one file."""
+        path = Path(result['filepath'])
+        uri = path.as_uri() if path.is_absolute() else path.as_posix()
+
+        entries = []
+        if result.get('error'):
+            entries.append(('read_error', 'error', result['error'], 1))
+        for issue in result['issues']:
+            entries.append((issue[self.kind_key], _SARIF_LEVELS.get(issue['severity'], 'note'),
+                            issue['description'], issue['line']))
+        for change in result['uncertain_changes']:
+            entries.append((change[self.kind_key], 'note', change['reason'], change['line']))
+
+        for rule_id, level, message, line in entries:
+            rule_index = self._rules.setdefault(rule_id, len(self._rules))
+            sarif_result = {
+                'ruleId': rule_id,
+                'ruleIndex': rule_index,
+                'level': level,
+                'message': {'text': message},
+                'locations': [{
+                    'physicalLocation': {
+                        'artifactLocation': {'uri': uri},
+                        'region': {'startLine': max(line, 1)},
+                    }
+                }],
+            }
+            self._file.write((',\n' if self._sarif_results else self._sarif_header() + '\n')
+                             + json.dumps(sarif_result))
+            self._sarif_results += 1
+
+    def _sarif_header(self) -> str:
+        """Opening of the SARIF document, up to the results array."""
+        return '{"$schema": "%s", "version": "2.1.0", "runs": [{"results": [' % SARIF_SCHEMA
+
+    def _finish_sarif(self):
+        """Write the tool description and close the SARIF document."""
+        if not self._sarif_results:
+            self._file.write(self._sarif_header())
+        tool = {'driver': {'name': self.tool,
+                           'rules': [{'id': rule_id} for rule_id in self._rules]}}
+        self._file.write('\n], "tool": ' + json.dumps(tool) + '}]}\n')
+
+
+class _ColumnarReport:
+    """
+    Columns of a columnar report.
+
+    Every string of an issue or uncertain change (check names, severities,
+    descriptions, current and suggested text, reasons) is stored once in
+    ``strings`` and referenced by index. Entries keep the report order, so
+    each file only records how many issues and uncertain changes it has.
+    """
+
+    def __init__(self, tool: str, kind_key: str):
+        self.tool = tool
+        self.kind_key = kind_key
+        self.strings = []
+        self._string_index = {}
+        self.files = {'filepath': [], 'valid': [], 'issues': [],
+                      'uncertain_changes': [], 'extras': []}
+        self.issues = {'line': [], 'kind': [], 'severity': [], 'description': []}
+        self.uncertain = {'line': [], 'kind': [], 'current': [], 'suggested': [], 'reason': []}
+
+    def intern(self, text: str) -> int:
+        """Return the index of a string in the string table."""
+        index = self._string_index.get(text)
+        if index is None:
+            index = self._string_index[text] = len(self.strings)
+            self.strings.append(text)
+        return index
+
+    def add(self, result: Dict[str, Any]):
+        """Add one file result to the columns."""
+        files = self.files
+        files['filepath'].append(result['filepath'])
+        files['valid'].append(result['valid'])
+        files['issues'].append(len(result['issues']))
+        files['uncertain_changes'].append(len(result['uncertain_changes']))
+        extras = {key: value for key, value in result.items() if key not in _COLUMN_KEYS}
+        files['extras'].append(extras or None)
+
+        intern = self.intern
+        kind_key = self.kind_key
+        issues = self.issues
+        for issue in result['issues']:
+            issues['line'].append(issue['line'])
+            issues['kind'].append(intern(issue[kind_key]))
+            issues['severity'].append(intern(issue['severity']))
+            issues['description'].append(intern(issue['description']))
+
+        uncertain = self.uncertain
+        for change in result['uncertain_changes']:
+            uncertain['line'].append(change['line'])
+            uncertain['kind'].append(intern(change[kind_key]))
+            uncertain['current'].append(intern(change['current']))
+            uncertain['suggested'].append(intern(change['suggested']))
+            uncertain['reason'].append(intern(change['reason']))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The report as a JSON-compatible dictionary."""
+        return {
+            'format': COLUMNAR_FORMAT,
+            'version': 1,
+            'tool': self.tool,
+            'kind_key': self.kind_key,
+            'strings': self.strings,
+            'files': self.files,
+            'issues': self.issues,
+            'uncertain_changes': self.uncertain,
+        }
+
+
+def expand_columnar(report: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Rebuild the per-file results of a columnar report.
+
+    Yields:
+        Results in the shape the scripts produce, in report order
+    """
+    if report.get('format') != COLUMNAR_FORMAT:
+        raise ValueError('Not a columnar report')
+    strings = report['strings']
+    kind_key = report['kind_key']
+    files = report['files']
+
+    issues = zip(*(report['issues'][column]
+                   for column in ('line', 'kind', 'description', 'severity')))
+    changes = zip(*(report['uncertain_changes'][column]
+                    for column in ('line', 'kind', 'current', 'suggested', 'reason')))
+
+    for filepath, valid, issue_count, change_count, extras in zip(
+            files['filepath'], files['valid'], files['issues'],
+            files['uncertain_changes'], files['extras']):
+        result = {'filepath': filepath, 'valid': valid}
+        extras = extras or {}
+        if 'error' in extras:
+            result['error'] = extras['error']
+        result['issues'] = [
+            {'line': line, kind_key: strings[kind],
+             'description': strings[description], 'severity': strings[severity]}
+            for line, kind, description, severity in islice(issues, issue_count)
+        ]
+        result['uncertain_changes'] = [
+            {'line': line, kind_key: strings[kind], 'current': strings[current],
+             'suggested': strings[suggested], 'reason': strings[reason]}
+            for line, kind, current, suggested, reason in islice(changes, change_count)
+        ]
+        for key, value in extras.items():
+            result.setdefault(key, value)
+        yield result
+
+
+def iter_report(source: TextIO, ndjson: bool) -> Iterator[Dict[str, Any]]:
+    """Read the file results of an NDJSON, JSON or columnar report."""
+    if ndjson:
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+        return
+
+    report = json.load(source)
+    if isinstance(report, dict):
+        yield from expand_columnar(report)
+    else:
+        yield from report
+
+
+def ndjson_to_json(source: TextIO, target: TextIO):
+    """
+    Convert an NDJSON report into a pretty-printed JSON array.
+
+    Results are copied one at a time, so memory use does not depend on
+    the size of the report.
+    """
+    write_json(iter_report(source, True), target)
+
+
+def write_json(results: Iterator[Dict[str, Any]], target: TextIO):
+    """Write results as a pretty-printed JSON array, one at a time."""
+    first = True
+    for result in results:
+        element = json.dumps(result, indent=2).replace('\n', '\n  ')
+        target.write(('[\n  ' if first else ',\n  ') + element)
+        first = False
+    target.write('[]' if first else '\n]')
+
+
+def main():
+    """Convert an NDJSON or columnar report to pretty-printed JSON."""
+    if len(sys.argv) < 2:
+        print("Usage: python report_writer.py <report.ndjson|report.columnar.json> [report.json]")
+        print("\nWrites the results of an NDJSON or columnar report as a pretty-printed")
+        print("JSON array, to the given file or to stdout. Use - to read NDJSON from stdin.")
+        sys.exit(1)
+
+    ndjson = sys.argv[1] == '-' or sys.argv[1].endswith(REPORT_SUFFIXES[NDJSON])
+    try:
+        source = sys.stdin if sys.argv[1] == '-' else open(sys.argv[1], 'r', encoding='utf-8')
+        with source:
+            if len(sys.argv) > 2:
+                with open(sys.argv[2], 'w', encoding='utf-8') as target:
+                    write_json(iter_report(source, ndjson), target)
+            else:
+                write_json(iter_report(source, ndjson), sys.stdout)
+                sys.stdout.write('\n')
+    except (OSError, ValueError) as e:
+        print(f"Error: Failed to convert report: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+On-disk result cache shared by the markdown validator scripts.
+Results are keyed by a hash of the file content, the scripts' source code
+and the options in effect, so unchanged files are answered without being
+re-checked. The cache is a single SQLite file with size-bounded LRU eviction.
+"""
+
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+
+DEFAULT_CACHE_DIR = Path('.markdown_validator_cache')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Pending LRU touches are flushed in batches to keep cache hits cheap
+_TOUCH_BATCH = 500
+
+# Modules whose code decides the cached results; changes to the other
+# scripts (runners, reports, profiling) leave the cache valid
+_RESULT_MODULES = (
+    'validate_markdown.py',
+    'check_extensions.py',
+    'format_markdown.py',
+    'markdown_lines.py',
+    'markdown_patterns.py',
+    'symbol_index.py',
+    'example_index.py',
+)
+
+_scripts_version = None
+
+
+def scripts_version() -> str:
+    """
+    Fingerprint the source of the modules that produce cached results.
+
+    Any change to the checking code invalidates all cached results, so
+    there is no version number to bump by hand.
+    """
+    global _scripts_version
+    if _scripts_version is None:
+        digest = hashlib.sha256()
+        directory = Path(__file__).resolve().parent
+        for name in _RESULT_MODULES:
+            script = directory / name
+            digest.update(script.name.encode('utf-8'))
+            digest.update(script.read_bytes())
+        _scripts_version = digest.hexdigest()
+    return _scripts_version
+
+
+class ResultCache:
+    """Content-addressed store for per-file check results."""
+
+    def __init__(self, cache_dir: Path = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize the cache. The database is opened lazily on first use.
+
+        Args:
+            cache_dir: Directory holding the cache database
+            max_bytes: Total size of stored results before eviction starts
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._pending_touches = []
+
+    def __getstate__(self):
+        # Worker processes open their own connection
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_pending_touches'] = []
+        return state
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database, creating it if needed."""
+        if self._conn is None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.cache_dir / 'results.sqlite3'),
+                                   timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                ' key TEXT PRIMARY KEY,'
+                ' value TEXT NOT NULL,'
+                ' size INTEGER NOT NULL,'
+                ' last_used REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS results_last_used'
+                         ' ON results (last_used)')
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key_digest(tool: str, options: Dict[str, Any] = None):
+        """Start a key digest for a tool and its options."""
+        digest = hashlib.sha256()
+        digest.update(tool.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(scripts_version().encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(json.dumps(options or {}, sort_keys=True).encode('utf-8'))
+        digest.update(b'\0')
+        return digest
+
+    @classmethod
+    def make_key(cls, content: str, tool: str, options: Dict[str, Any] = None) -> str:
+        """
+        Build the cache key for a document.
+
+        Args:
+            content: Full document text
+            tool: Name of the script producing the result
+            options: Options that influence the result
+
+        Returns:
+            Hex digest identifying the result
+        """
+        digest = cls._key_digest(tool, options)
+        digest.update(content.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    @classmethod
+    def make_file_key(cls, filepath: Path, tool: str,
+                      options: Dict[str, Any] = None) -> str:
+        """
+        Build the cache key for a file by hashing it in chunks.
+
+        Used by streaming validation so large files are never held in
+        memory. The key equals make_key() for files without carriage
+        returns, whose raw bytes match their decoded text.
+        """
+        digest = cls._key_digest(tool, options)
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for key, or None on a miss."""
+        try:
+            row = self._connect().execute(
+                'SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Warning: Result cache unavailable: {e}", file=sys.stderr)
+            return None
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._pending_touches.append((time.time(), key))
+        if len(self._pending_touches) >= _TOUCH_BATCH:
+            self._flush_touches()
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store a result."""
+        data = json.dumps(value)
+        try:
+            self._connect().execute(
+                'INSERT OR REPLACE INTO results (key, value, size, last_used)'
+                ' VALUES (?, ?, ?, ?)',
+                (key, data, len(data), time.time()))
+        except sqlite3.Error as e:
+            print(f"Warning: Failed to write result cache: {e}", file=sys.stderr)
+
+    def _flush_touches(self):
+        """Record pending cache hits for LRU ordering."""
+        touches, self._pending_touches = self._pending_touches, []
+        if not touches or self._conn is None:
+            return
+        try:
+            with self._conn:
+                self._conn.execute('BEGIN')
+                self._conn.executemany(
+                    'UPDATE results SET last_used = ? WHERE key = ?', touches)
+        except sqlite3.Error:
+            # Recency is only an eviction hint
+            pass
+
+    def evict(self):
+        """Drop least recently used results until the cache fits max_bytes."""
+        conn = self._connect()
+        total = conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Evict down to 90% so the next run does not evict again immediately
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        stale = []
+        for key, size in conn.execute(
+                'SELECT key, size FROM results ORDER BY last_used'):
+            if freed >= target:
+                break
+            stale.append((key,))
+            freed += size
+
+        with conn:
+            conn.execute('BEGIN')
+            conn.executemany('DELETE FROM results WHERE key = ?', stale)
+
+    def close(self):
+        """Flush pending updates, enforce the size bound and close."""
+        try:
+            self._connect()
+            self._flush_touches()
+            self.evict()
+        except sqlite3.Error as e:
+            print(f"Warning: Failed to maintain result cache: {e}", file=sys.stderr)
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Combined runner for the markdown validator scripts.
+Reads each file once and runs the validator, the extension checker and the
+formatter on the same in-memory document, sharing its split and classified
+lines, then writes a single merged report.
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from markdown_lines import Document
+from validate_markdown import MarkdownValidator
+from check_extensions import ExtensionChecker
+from format_markdown import MarkdownFormatter
+from result_cache import ResultCache
+from git_changes import changed_files, staged_content, GitError
+from report_writer import ReportWriter, report_path, JSON, NDJSON
+
+
+def run_file(filepath: Path, validator: MarkdownValidator, checker: ExtensionChecker,
+             formatter: Optional[MarkdownFormatter] = None,
+             in_place: bool = False, staged: bool = False) -> Dict[str, Any]:
+    """
+    Validate, check and format one file from a single read.
+
+    Args:
+        filepath: Path to markdown file
+        validator: Validator to run
+        checker: Extension checker to run
+        formatter: Formatter to run, or None to skip formatting
+        in_place: If True, the formatter modifies the file in place
+        staged: If True, validate and check the copy staged in the git
+            index; the formatter still works on the work-tree file
+
+    Returns:
+        Merged result with 'validation', 'extensions' and (when formatting)
+        'formatting' sections, each shaped like the script's own result
+        without the filepath
+    """
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+            # Universal newlines already turned CRLF into LF while reading
+            newlines_translated = f.newlines not in (None, '\n')
+        checked = Document(staged_content(filepath)) if staged else None
+    except Exception as e:
+        return {
+            'filepath': str(filepath),
+            'valid': False,
+            'error': f'Failed to read file: {str(e)}'
+        }
+
+    document = Document(content)
+    checked = checked or document
+    result = {
+        'filepath': str(filepath),
+        'valid': True,
+        'validation': validator.validate_document(checked),
+        'extensions': checker.check_document(checked),
+    }
+    if formatter:
+        formatting = formatter.format_document(filepath, document,
+                                               newlines_translated, in_place)
+        del formatting['filepath']
+        result['formatting'] = formatting
+
+    result['valid'] = (result['validation']['valid'] and result['extensions']['valid']
+                       and result.get('formatting', {}).get('success', True))
+    return result
+
+
+def main():
+    """Main entry point for the combined runner."""
+    if len(sys.argv) < 2:
+        print("Usage: python run_all.py <file.md> [--spec spec.md] [--examples examples/]")
+        print("       python run_all.py <directory/> [--spec spec.md] [--examples examples/]")
+        print("\nRuns validate_markdown, check_extensions and format_markdown, reading each file once.")
+        print("\nOptions:")
+        print("  --in-place        Format files in place instead of creating .formatted.md files")
+        print("  --review FILE     Write uncertain formatting changes to FILE")
+        print("  --no-format       Only validate and check extensions")
+        print("  --cache DIR       Reuse results for unchanged files from a cache in DIR")
+        print("  --cache-size MB   Maximum cache size before eviction (default: 256)")
+        print("  --ndjson          Stream the report as NDJSON, one line per file")
+        print("  --changed-since REF  Only run on files changed since the merge base with REF")
+        print("  --staged          Only run on files staged in the git index; they are")
+        print("                    checked as staged and formatted in the work tree")
+        sys.exit(1)
+
+    target = Path(sys.argv[1])
+    spec_file = None
+    examples_dir = None
+    review_file = None
+    in_place = False
+    run_formatter = True
+    cache_dir = None
+    cache_size = 256
+    report_format = JSON
+    changed_since = None
+    staged = False
+
+    # Parse optional arguments
+    i = 2
+    while i < len(sys.argv):
+        if sys.argv[i] == '--spec' and i + 1 < len(sys.argv):
+            spec_file = Path(sys.argv[i + 1])
+            i += 2
+        elif sys.argv[i] == '--examples' and i + 1 < len(sys.argv):
+            examples_dir = Path(sys.argv[i + 1])
+            i += 2
+        elif sys.argv[i] == '--review' and i + 1 < len(sys.argv):
+            review_file = Path(sys.argv[i + 1])
+            i += 2
+        elif sys.argv[i] == '--in-place':
+            in_place = True
+            i += 1
+        elif sys.argv[i] == '--no-format':
+            run_formatter = False
+            i += 1
+        elif sys.argv[i] == '--cache' and i + 1 < len(sys.argv):
+            cache_dir = Path(sys.argv[i + 1])
+            i += 2
+        elif sys.argv[i] == '--cache-size' and i + 1 < len(sys.argv):
+            try:
+                cache_size = int(sys.argv[i + 1])
+            except ValueError:
+                print(f"Error: --cache-size expects an integer, got {sys.argv[i + 1]}")
+                sys.exit(1)
+            i += 2
+        elif sys.argv[i] == '--ndjson':
+            report_format = NDJSON
+            i += 1
+        elif sys.argv[i] == '--changed-since' and i + 1 < len(sys.argv):
+            changed_since = sys.argv[i + 1]
+            i += 2
+        elif sys.argv[i] == '--staged':
+            staged = True
+            i += 1
+        else:
+            i += 1
+
+    # Collect files to process
+    if target.is_file():
+        files = [target]
+    elif target.is_dir():
+        files = sorted(target.rglob('*.md'))
+    else:
+        print(f"Error: {target} is not a valid file or directory")
+        sys.exit(1)
+
+    # Only process files changed relative to a git ref or staged in the index
+    if changed_since or staged:
+        try:
+            files = changed_files(target, changed_since, staged)
+        except GitError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+    cache = ResultCache(cache_dir, cache_size * 1024 * 1024) if cache_dir else None
+    validator = MarkdownValidator(spec_file, examples_dir, cache)
+    checker = ExtensionChecker(spec_file, examples_dir, cache)
+    formatter = MarkdownFormatter(review_file, cache) if run_formatter else None
+
+    # Process all files, writing each merged result as it arrives
+    report_file = report_path('markdown_report', report_format)
+    all_valid = True
+    with ReportWriter(report_file, report_format, 'run_all') as report:
+        for filepath in files:
+            result = run_file(filepath, validator, checker, formatter, in_place, staged)
+            report.write(result)
+            all_valid = all_valid and result['valid']
+
+            print(f"\n{'='*60}")
+            print(f"File: {result['filepath']}")
+            print(f"Valid: {result['valid']}")
+
+            if result.get('error'):
+                print(f"Error: {result['error']}")
+                continue
+
+            validation = result['validation']
+            extensions = result['extensions']
+            print(f"Syntax: {len(validation['issues'])} issues, "
+                  f"{len(validation['uncertain_changes'])} uncertain changes")
+            print(f"Extensions: {len(extensions['issues'])} issues, "
+                  f"{len(extensions['uncertain_changes'])} uncertain changes")
+
+            formatting = result.get('formatting')
+            if formatting:
+                if formatting.get('error'):
+                    print(f"Formatting error: {formatting['error']}")
+                elif formatting['written']:
+                    print(f"Formatted: {len(formatting['changes'])} changes, "
+                          f"written to {formatting['output_path']}")
+                else:
+                    print("Formatted: unchanged, not written")
+
+    if cache:
+        cache.close()
+
+    print(f"\n{'='*60}")
+    print(f"Merged report written to: {report_file}")
+
+    # Return exit code based on all results
+    if not all_valid:
+        sys.exit(1)
+    else:
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
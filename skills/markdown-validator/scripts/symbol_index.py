@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Footnote and reference-link symbol index shared by the markdown validator
+scripts. Records where every label is defined and used, one document at a
+time, and resolves uses against definitions with dictionary lookups so a
+whole document set is cross-checked in linear time.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Symbol kinds
+FOOTNOTE = 'footnote'
+REFERENCE = 'reference'
+
+# Findings produced by SymbolIndex.resolve()
+UNDEFINED = 'undefined'
+UNREFERENCED = 'unreferenced'
+AMBIGUOUS = 'ambiguous'
+
+
+def normalize_reference_label(label: str) -> str:
+    """Match reference labels case-insensitively with collapsed whitespace."""
+    return ' '.join(label.split()).casefold()
+
+
+class SymbolIndex:
+    """
+    Definitions and uses of footnote and reference-link labels.
+
+    Only the first definition and the first use of a label in each file
+    are kept; that is all resolution needs, and it bounds memory by the
+    number of distinct labels per file. Files are identified by whatever
+    key the caller passes (``None`` for a single in-memory document).
+    """
+
+    def __init__(self):
+        # (kind, label) -> {file: line of first definition}
+        self.definitions = {}
+        # (kind, label) -> {file: [line of first use, line of first explicit use]}
+        self.uses = {}
+
+    def define(self, kind: str, label: str, filepath: Optional[str], line: int):
+        """Record a definition; returns the line of an earlier one in the same file."""
+        files = self.definitions.setdefault((kind, label), {})
+        if filepath in files:
+            return files[filepath]
+        files[filepath] = line
+        return None
+
+    def is_defined(self, kind: str, label: str, filepath: Optional[str]) -> bool:
+        """Return True if the label is defined in the given file."""
+        return filepath in self.definitions.get((kind, label), ())
+
+    def use(self, kind: str, label: str, filepath: Optional[str], line: int,
+            explicit: bool = True):
+        """
+        Record a use of a label.
+
+        Args:
+            kind: FOOTNOTE or REFERENCE
+            label: Symbol label (already normalized for references)
+            filepath: File the use appears in
+            line: 1-based line number
+            explicit: False for uses that may just be bracketed text, such
+                as shortcut reference links; they mark definitions as used
+                but are never reported as undefined
+        """
+        files = self.uses.setdefault((kind, label), {})
+        first = files.get(filepath)
+        if first is None:
+            files[filepath] = [line, line if explicit else None]
+        elif explicit and first[1] is None:
+            first[1] = line
+
+    def to_records(self, filepath: Optional[str]) -> Dict[str, List[List[Any]]]:
+        """Serialize the symbols of one file to JSON-compatible lists."""
+        return {
+            'definitions': [[kind, label, files[filepath]]
+                            for (kind, label), files in self.definitions.items()
+                            if filepath in files],
+            'uses': [[kind, label] + files[filepath]
+                     for (kind, label), files in self.uses.items()
+                     if filepath in files],
+        }
+
+    def add_records(self, filepath: str, records: Dict[str, List[List[Any]]]):
+        """Add the symbols of one file produced by to_records()."""
+        for kind, label, line in records['definitions']:
+            self.definitions.setdefault((kind, label), {})[filepath] = line
+        for kind, label, line, explicit_line in records['uses']:
+            self.uses.setdefault((kind, label), {})[filepath] = [line, explicit_line]
+
+    def resolve(self) -> List[Tuple[str, str, str, Optional[str], int, List[Any]]]:
+        """
+        Resolve every use against the definitions.
+
+        A use resolves to a definition in its own file first, otherwise to
+        a definition in any other file of the set. Findings are reported
+        in the order symbols were first recorded, so they are deterministic.
+
+        Returns:
+            List of (finding, kind, label, filepath, line, other_files) tuples
+        """
+        findings = []
+        # Labels used in a file that does not define them
+        used_elsewhere = set()
+
+        for key, files in self.uses.items():
+            kind, label = key
+            definitions = self.definitions.get(key, {})
+            for filepath, (line, explicit_line) in files.items():
+                if filepath in definitions:
+                    continue
+                if not definitions:
+                    if explicit_line is not None:
+                        findings.append((UNDEFINED, kind, label, filepath, explicit_line, []))
+                    continue
+                used_elsewhere.add(key)
+                if len(definitions) > 1 and explicit_line is not None:
+                    findings.append((AMBIGUOUS, kind, label, filepath, explicit_line,
+                                     list(definitions)))
+
+        for key, files in self.definitions.items():
+            if key in used_elsewhere:
+                continue
+            kind, label = key
+            uses = self.uses.get(key, {})
+            for filepath, line in files.items():
+                if filepath not in uses:
+                    findings.append((UNREFERENCED, kind, label, filepath, line, []))
+
+        return findings
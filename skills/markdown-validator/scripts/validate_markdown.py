@@ -4,35 +4,89 @@ Markdown validation script that checks syntax and formatting without altering te
 Logs uncertain changes to a review file for manual inspection.
 """
 
+import os
 import sys
 import json
-import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterable, Optional
+
+import markdown_patterns as patterns
+from markdown_lines import (
+    Document, Line, RegionTracker, classify_line, classify_stream, front_matter_end,
+    iter_text_lines, FENCE, HEADING, LIST_ITEM, PARAGRAPH, CODE, PROSE
+)
+from result_cache import ResultCache
+from check_profiler import CheckProfiler, summarize, print_summary
+from git_changes import changed_files, staged_content, GitError
+from report_writer import ReportWriter, report_path, REPORT_SUFFIXES, JSON, NDJSON
+
+
+# Check that reports each issue type; reports list issues grouped by check
+_CHECK_ORDER = {
+    'heading_format': 0,
+    'heading_hierarchy': 0,
+    'heading_trailing_hashes': 0,
+    'setext_heading': 0,
+    'list_spacing': 1,
+    'broken_link': 2,
+    'bare_url': 2,
+    'fence_mismatch': 3,
+    'unclosed_fence': 3,
+    'indented_code_block': 3,
+    'mismatched_emphasis': 4,
+    'invalid_hr': 5,
+    'trailing_whitespace': 6,
+}
+
+# Per-line checks timed by --profile
+_PROFILED_CHECKS = (
+    '_check_heading_structure',
+    '_check_list_formatting',
+    '_check_link_syntax',
+    '_check_code_block_syntax',
+    '_check_emphasis_markers',
+    '_check_horizontal_rules',
+    '_check_trailing_whitespace',
+)
 
 
 class MarkdownValidator:
     """Validates markdown files for syntax and formatting issues."""
     
-    def __init__(self, spec_file: Path = None, examples_dir: Path = None):
+    def __init__(self, spec_file: Path = None, examples_dir: Path = None,
+                 cache: ResultCache = None, profile: bool = False):
         """
         Initialize validator with optional specification and examples.
         
         Args:
             spec_file: Path to markdown specification document
             examples_dir: Path to directory containing example markdown files
+            cache: Optional result cache for unchanged files
+            profile: If True, add per-check timings to each validate_file() result
         """
         self.spec_file = spec_file
         self.examples_dir = examples_dir
+        self.cache = cache
         self.issues = []
         self.uncertain_changes = []
+        self.profiler = None
+        
+        if profile:
+            self.profiler = CheckProfiler(self, 'validate_file', _PROFILED_CHECKS)
         
-    def validate_file(self, filepath: Path) -> Dict[str, Any]:
+    def validate_file(self, filepath: Path, stream: bool = False,
+                      staged: bool = False) -> Dict[str, Any]:
         """
         Validate a markdown file.
         
         Args:
             filepath: Path to markdown file
+            stream: If True, validate line by line from the open file so
+                memory stays bounded regardless of file size
+            staged: If True, validate the copy staged in the git index
+                instead of the work-tree file (read whole, not streamed)
             
         Returns:
             Dictionary containing validation results
@@ -40,33 +94,167 @@ class MarkdownValidator:
         self.issues = []
         self.uncertain_changes = []
         
+        if stream and not staged:
+            return self._validate_stream(filepath)
+        
+        try:
+            if staged:
+                content = staged_content(filepath)
+            else:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    content = f.read()
+        except Exception as e:
+            return self._read_error(filepath, e)
+        
+        return {'filepath': str(filepath), **self.validate_content(content)}
+    
+    def validate_content(self, content: str) -> Dict[str, Any]:
+        """
+        Validate markdown text that is already in memory.
+        
+        Args:
+            content: Markdown document text, e.g. an unsaved editor buffer
+            
+        Returns:
+            Dictionary containing validation results (without a filepath)
+        """
+        return self.validate_document(Document(content))
+    
+    def validate_document(self, document: Document) -> Dict[str, Any]:
+        """
+        Validate a document whose lines may be shared with other tools.
+        
+        Args:
+            document: Document read once; its classified lines are reused
+            
+        Returns:
+            Dictionary containing validation results (without a filepath)
+        """
+        self.issues = []
+        self.uncertain_changes = []
+        
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.make_key(document.content, 'validate_markdown',
+                                            self._cache_options())
+            cached = self._from_cache(cache_key)
+            if cached is not None:
+                return cached
+        
+        # Classify every line once and run all checks over the shared stream
+        self._check_lines(document.lines)
+        
+        return self._result(cache_key)
+    
+    def open_document(self, content: str) -> 'IncrementalValidation':
+        """
+        Validate markdown text and keep the state needed to re-check edits.
+        
+        Args:
+            content: Markdown document text, e.g. an editor buffer
+            
+        Returns:
+            Incremental validation whose result() matches validate_content()
+        """
+        return IncrementalValidation(self, content)
+    
+    def _validate_stream(self, filepath: Path) -> Dict[str, Any]:
+        """Validate a file from its line iterator without loading it whole."""
         try:
+            cache_key = None
+            if self.cache:
+                cache_key = self.cache.make_file_key(filepath, 'validate_markdown',
+                                                     self._cache_options())
+                cached = self._from_cache(cache_key)
+                if cached is not None:
+                    return {'filepath': str(filepath), **cached}
+            
             with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
+                self._check_lines(classify_stream(iter_text_lines(f)))
         except Exception as e:
-            return {
-                'filepath': str(filepath),
-                'valid': False,
-                'error': f'Failed to read file: {str(e)}',
-                'issues': [],
-                'uncertain_changes': []
-            }
-        
-        # Run validation checks
-        self._check_heading_structure(content)
-        self._check_list_formatting(content)
-        self._check_link_syntax(content)
-        self._check_code_block_syntax(content)
-        self._check_emphasis_markers(content)
-        self._check_horizontal_rules(content)
-        self._check_trailing_whitespace(content)
+            self.issues = []
+            self.uncertain_changes = []
+            return self._read_error(filepath, e)
         
+        return {'filepath': str(filepath), **self._result(cache_key)}
+    
+    def _read_error(self, filepath: Path, error: Exception) -> Dict[str, Any]:
+        """Build the result for a file that could not be read."""
         return {
             'filepath': str(filepath),
+            'valid': False,
+            'error': f'Failed to read file: {str(error)}',
+            'issues': [],
+            'uncertain_changes': []
+        }
+    
+    def _cache_options(self) -> Dict[str, Any]:
+        """Options that take part in the cache key."""
+        return {
+            'spec': str(self.spec_file),
+            'examples': str(self.examples_dir),
+        }
+    
+    def _from_cache(self, cache_key: str) -> Dict[str, Any]:
+        """Load a cached result into the validator, or return None."""
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.issues = cached['issues']
+            self.uncertain_changes = cached['uncertain_changes']
+        return cached
+    
+    def _result(self, cache_key: str = None) -> Dict[str, Any]:
+        """Build the result for the checked document and cache it."""
+        result = {
             'valid': len(self.issues) == 0,
             'issues': self.issues,
             'uncertain_changes': self.uncertain_changes
         }
+        if cache_key:
+            self.cache.put(cache_key, result)
+        return result
+    
+    def _check_lines(self, lines: Iterable[Line]):
+        """
+        Run every check over the line stream in a single pass.
+        
+        Only one line of lookahead is held (for setext headings), so the
+        stream may come straight from a file.
+        """
+        self._prev_heading_level = 0
+        self._fence_char = None
+        self._fence_line = 0
+        
+        line = None
+        for next_line in lines:
+            if line is not None:
+                self._check_line(line, next_line)
+            line = next_line
+        if line is not None:
+            self._check_line(line, None)
+        
+        self._finish()
+    
+    def _finish(self):
+        """Report an unclosed fence and group the issues by check."""
+        # Check if we ended with unclosed fence
+        if self._fence_char:
+            self._add_issue(self._fence_line, 'unclosed_fence',
+                          f'Unclosed code fence started on line {self._fence_line}')
+        
+        # Report issues grouped by check, in the order the checks run
+        self.issues.sort(key=lambda issue: _CHECK_ORDER[issue['type']])
+        self.uncertain_changes.sort(key=lambda change: _CHECK_ORDER[change['type']])
+    
+    def _check_line(self, line: Line, next_line: Optional[Line]):
+        """Run every check on a single line."""
+        self._check_heading_structure(line, next_line)
+        self._check_list_formatting(line)
+        self._check_link_syntax(line)
+        self._check_code_block_syntax(line)
+        self._check_emphasis_markers(line)
+        self._check_horizontal_rules(line)
+        self._check_trailing_whitespace(line)
     
     def _add_issue(self, line_num: int, issue_type: str, description: str, 
                    severity: str = 'error'):
@@ -89,186 +277,447 @@ class MarkdownValidator:
             'reason': reason
         })
     
-    def _check_heading_structure(self, content: str):
+    def _check_heading_structure(self, line: Line, next_line: Optional[Line]):
         """Check for proper heading hierarchy and formatting."""
-        lines = content.split('\n')
-        prev_level = 0
-        
-        for i, line in enumerate(lines, 1):
-            # Check ATX-style headings
-            heading_match = re.match(r'^(#{1,6})\s+(.+)$', line)
-            if heading_match:
-                hashes, heading_text = heading_match.groups()
-                level = len(hashes)
-                
-                # Check for space after hashes
-                if not re.match(r'^#{1,6}\s', line):
-                    self._add_issue(i, 'heading_format', 
-                                  'Heading must have space after #')
-                
-                # Check for proper hierarchy (not skipping levels)
-                if prev_level > 0 and level > prev_level + 1:
-                    self._add_issue(i, 'heading_hierarchy', 
-                                  f'Heading level skipped from {prev_level} to {level}',
-                                  severity='warning')
-                
-                # Check for trailing hashes (inconsistent style)
-                if re.search(r'#+\s*$', line):
-                    self._add_uncertain_change(
-                        i, 'heading_trailing_hashes',
-                        line,
-                        f"{hashes} {heading_text.rstrip('#').strip()}",
-                        'Trailing hashes in heading - style preference'
-                    )
-                
-                prev_level = level
+        if line.region != PROSE:
+            return
+        
+        i = line.number
+        
+        # Check ATX-style headings
+        if line.kind == HEADING:
+            hashes, heading_text = line.marker, line.body
+            level = len(hashes)
+            prev_level = self._prev_heading_level
+            
+            # Check for space after hashes
+            if not line.text[level:level + 1].isspace():
+                self._add_issue(i, 'heading_format', 
+                              'Heading must have space after #')
+            
+            # Check for proper hierarchy (not skipping levels)
+            if prev_level > 0 and level > prev_level + 1:
+                self._add_issue(i, 'heading_hierarchy', 
+                              f'Heading level skipped from {prev_level} to {level}',
+                              severity='warning')
             
-            # Check for setext-style headings (= and -)
-            elif i < len(lines) and re.match(r'^[=-]+\s*$', lines[i]):
+            # Check for trailing hashes (inconsistent style)
+            if line.text.rstrip().endswith('#'):
                 self._add_uncertain_change(
-                    i, 'setext_heading',
-                    f"{line}\n{lines[i]}",
-                    f"# {line}" if '=' in lines[i] else f"## {line}",
-                    'Setext-style heading - ATX style is more common'
+                    i, 'heading_trailing_hashes',
+                    line.text,
+                    f"{hashes} {heading_text.rstrip('#').strip()}",
+                    'Trailing hashes in heading - style preference'
                 )
+            
+            self._prev_heading_level = level
+        
+        # Check for setext-style headings (= and -)
+        elif (next_line is not None and next_line.underline
+              and next_line.region == PROSE):
+            underline = next_line.text
+            self._add_uncertain_change(
+                i, 'setext_heading',
+                f"{line.text}\n{underline}",
+                f"# {line.text}" if '=' in underline else f"## {line.text}",
+                'Setext-style heading - ATX style is more common'
+            )
     
-    def _check_list_formatting(self, content: str):
+    def _check_list_formatting(self, line: Line):
         """Check for consistent list formatting."""
-        lines = content.split('\n')
-        
-        for i, line in enumerate(lines, 1):
-            # Unordered list items
-            if re.match(r'^\s*[*+-]\s+', line):
-                # Check for consistent spacing
-                if not re.match(r'^\s*[*+-]\s\s+', line) and not re.match(r'^\s*[*+-]\s\S', line):
-                    self._add_issue(i, 'list_spacing',
-                                  'List item should have single space after marker')
-                
-                # Track which marker is used
-                marker = re.search(r'[*+-]', line).group()
-                # Could check for consistency across file, but this is style preference
-            
+        if line.kind != LIST_ITEM or line.region != PROSE:
+            return
+        
+        # The body starts with the whitespace that follows the marker
+        if line.marker[-1] == '.':
             # Ordered list items
-            if re.match(r'^\s*\d+\.\s+', line):
-                if not re.match(r'^\s*\d+\.\s\S', line):
-                    self._add_issue(i, 'list_spacing',
-                                  'Ordered list item should have single space after number')
+            if len(line.body) < 2 or line.body[1].isspace():
+                self._add_issue(line.number, 'list_spacing',
+                              'Ordered list item should have single space after number')
+        
+        # Unordered list items: a lone space after the marker is the
+        # only spacing that is neither a single space nor an indent
+        elif len(line.body) < 2:
+            self._add_issue(line.number, 'list_spacing',
+                          'List item should have single space after marker')
     
-    def _check_link_syntax(self, content: str):
+    def _check_link_syntax(self, line: Line):
         """Check for proper link formatting."""
-        lines = content.split('\n')
-        
-        for i, line in enumerate(lines, 1):
-            # Check for malformed inline links [text](url)
-            # Match potential links with missing parts
-            if '[' in line and ']' in line:
-                # Check for links missing URL: [text]
-                broken_links = re.finditer(r'\[([^\]]+)\](?!\(|:|\[)', line)
-                for match in broken_links:
-                    self._add_issue(i, 'broken_link',
-                                  f'Link text "{match.group(1)}" missing URL or reference')
-            
-            # Check for URLs that should be in link format
-            bare_urls = re.finditer(r'(?<![(\[])https?://[^\s)>]+', line)
-            for match in bare_urls:
-                self._add_uncertain_change(
-                    i, 'bare_url',
-                    match.group(),
-                    f'<{match.group()}>',
-                    'Bare URL - consider wrapping in < > or proper link syntax'
-                )
+        if line.region != PROSE:
+            return
+        
+        i, text = line.number, line.text
+        
+        # Check for malformed inline links [text](url)
+        # Match potential links with missing parts
+        if '[' in text and ']' in text:
+            # Check for links missing URL: [text]
+            broken_links = patterns.BROKEN_LINK.finditer(text)
+            for match in broken_links:
+                self._add_issue(i, 'broken_link',
+                              f'Link text "{match.group(1)}" missing URL or reference')
+        
+        # Check for URLs that should be in link format
+        if '://' not in text:
+            return
+        bare_urls = patterns.BARE_URL.finditer(text)
+        for match in bare_urls:
+            self._add_uncertain_change(
+                i, 'bare_url',
+                match.group(),
+                f'<{match.group()}>',
+                'Bare URL - consider wrapping in < > or proper link syntax'
+            )
     
-    def _check_code_block_syntax(self, content: str):
+    def _check_code_block_syntax(self, line: Line):
         """Check for proper code block formatting."""
-        lines = content.split('\n')
-        in_fenced_block = False
-        fence_char = None
-        fence_line = 0
-        
-        for i, line in enumerate(lines, 1):
-            # Check for fenced code blocks
-            fence_match = re.match(r'^(`{3,}|~{3,})', line)
-            if fence_match:
-                if not in_fenced_block:
-                    in_fenced_block = True
-                    fence_char = fence_match.group(1)[0]
-                    fence_line = i
-                else:
-                    # Closing fence
-                    if fence_match.group(1)[0] != fence_char:
-                        self._add_issue(i, 'fence_mismatch',
-                                      f'Fence character mismatch (opened with {fence_char} on line {fence_line})')
-                    in_fenced_block = False
-                    fence_char = None
-            
-            # Check for indented code blocks (4 spaces)
-            elif re.match(r'^    \S', line) and not in_fenced_block:
-                self._add_uncertain_change(
-                    i, 'indented_code_block',
-                    line,
-                    f"```\n{line.strip()}\n```",
-                    'Indented code block - fenced code blocks are clearer'
-                )
+        i = line.number
         
-        # Check if we ended with unclosed fence
-        if in_fenced_block:
-            self._add_issue(fence_line, 'unclosed_fence',
-                          f'Unclosed code fence started on line {fence_line}')
+        # Check for fenced code blocks (fences inside front matter or
+        # HTML blocks are not fences)
+        if line.kind == FENCE and line.region == CODE:
+            if not self._fence_char:
+                self._fence_char = line.marker[0]
+                self._fence_line = i
+            else:
+                # Closing fence
+                if line.marker[0] != self._fence_char:
+                    self._add_issue(i, 'fence_mismatch',
+                                  self._fence_mismatch_message(self._fence_char, self._fence_line))
+                self._fence_char = None
+        
+        # Check for indented code blocks (4 spaces)
+        elif (line.region == PROSE and line.text.startswith('    ')
+              and patterns.INDENTED_CODE.match(line.text)):
+            self._add_uncertain_change(
+                i, 'indented_code_block',
+                line.text,
+                f"```\n{line.text.strip()}\n```",
+                'Indented code block - fenced code blocks are clearer'
+            )
+    
+    def _fence_mismatch_message(self, fence_char: str, fence_line: int) -> str:
+        """Describe a closing fence that does not match its opening fence."""
+        return f'Fence character mismatch (opened with {fence_char} on line {fence_line})'
     
-    def _check_emphasis_markers(self, content: str):
+    def _check_emphasis_markers(self, line: Line):
         """Check for consistent emphasis and strong emphasis markers."""
-        lines = content.split('\n')
-        
-        for i, line in enumerate(lines, 1):
-            # Check for mismatched emphasis markers
-            # Looking for *text_ or _text* patterns
-            mismatched = re.finditer(r'(?<!\*)\*(?!\*)([^*_]+)_(?!_)|(?<!_)_(?!_)([^*_]+)\*(?!\*)', line)
-            for match in mismatched:
-                self._add_issue(i, 'mismatched_emphasis',
-                              f'Mismatched emphasis markers: {match.group()}')
+        # Check for mismatched emphasis markers
+        # Looking for *text_ or _text* patterns
+        if line.region != PROSE or '*' not in line.text or '_' not in line.text:
+            return
+        mismatched = patterns.MISMATCHED_EMPHASIS.finditer(line.text)
+        for match in mismatched:
+            self._add_issue(line.number, 'mismatched_emphasis',
+                          f'Mismatched emphasis markers: {match.group()}')
     
-    def _check_horizontal_rules(self, content: str):
+    def _check_horizontal_rules(self, line: Line):
         """Check for proper horizontal rule syntax."""
-        lines = content.split('\n')
-        
-        for i, line in enumerate(lines, 1):
-            # Check for potential horizontal rules
-            if re.match(r'^\s*([*\-_])\s*\1\s*\1', line):
-                # Valid horizontal rule
-                pass
-            elif re.match(r'^\s*[*\-_]{2}\s*$', line):
-                self._add_issue(i, 'invalid_hr',
-                              'Horizontal rule requires at least 3 characters')
-    
-    def _check_trailing_whitespace(self, content: str):
+        # Valid horizontal rules are classified as HR; two-character
+        # rules fall through to paragraphs
+        if (line.kind == PARAGRAPH and line.region == PROSE
+                and line.text.lstrip()[0] in patterns.HR_START
+                and patterns.SHORT_HR.match(line.text)):
+            self._add_issue(line.number, 'invalid_hr',
+                          'Horizontal rule requires at least 3 characters')
+    
+    def _check_trailing_whitespace(self, line: Line):
         """Check for trailing whitespace (may be intentional for line breaks)."""
-        lines = content.split('\n')
-        
-        for i, line in enumerate(lines, 1):
-            if line.endswith(' ') or line.endswith('\t'):
-                # Two trailing spaces create a line break in markdown
-                if line.endswith('  ') and not line.endswith('   '):
-                    # This is likely intentional
-                    continue
-                else:
-                    self._add_uncertain_change(
-                        i, 'trailing_whitespace',
-                        line,
-                        line.rstrip(),
-                        'Trailing whitespace (may be intentional for line break)'
-                    )
+        text = line.text
+        if text.endswith(' ') or text.endswith('\t'):
+            # Two trailing spaces create a line break in markdown
+            if text.endswith('  ') and not text.endswith('   '):
+                # This is likely intentional
+                return
+            self._add_uncertain_change(
+                line.number, 'trailing_whitespace',
+                text,
+                text.rstrip(),
+                'Trailing whitespace (may be intentional for line break)'
+            )
+
+
+# Check state before the first line: region tracker snapshot, previous
+# heading level, open fence character and distance back to the open fence
+_INITIAL_STATE = (RegionTracker().snapshot(), 0, None, 0)
+
+# Shared record for the (common) lines without issues
+_NO_RECORDS = ((), ())
+
+
+class IncrementalValidation:
+    """
+    Validation result for one document that can be updated by line edits.
+    
+    The check state before every line is kept, so an edit is re-checked
+    from the line above it (whose setext check sees the edited line) until
+    the state matches the previous run again, e.g. at the end of an
+    enclosing fence. All other lines keep their issues, shifted to their
+    new line numbers, so the work is proportional to the edit.
+    """
+    
+    def __init__(self, validator: MarkdownValidator, content: str):
+        """
+        Validate a document from scratch.
+        
+        Args:
+            validator: Validator whose checks are run
+            content: Markdown document text
+        """
+        self.validator = validator
+        self.lines = content.split('\n')
+        self.lines_checked = 0
+        self._front_matter = front_matter_end(self.lines)
+        self._states = [_INITIAL_STATE]
+        self._records = []
+        
+        states, records, _ = self._check_from(0, 0, None, 0)
+        self._states.extend(states)
+        self._records = records
+    
+    @property
+    def content(self) -> str:
+        """Current document text."""
+        return '\n'.join(self.lines)
+    
+    def apply_edit(self, start_line: int, end_line: int,
+                   new_lines: List[str]) -> Dict[str, Any]:
+        """
+        Replace a range of lines and re-check only the affected lines.
+        
+        Args:
+            start_line: First replaced line (1-based)
+            end_line: Last replaced line, inclusive; ``start_line - 1``
+                inserts before ``start_line`` without replacing anything
+            new_lines: Replacement lines, without newlines
+            
+        Returns:
+            Validation results for the edited document
+        """
+        if not 1 <= start_line <= end_line + 1 <= len(self.lines) + 1:
+            raise ValueError(f'Invalid line range {start_line}-{end_line} '
+                             f'for a document of {len(self.lines)} lines')
+        if any('\n' in text for text in new_lines):
+            raise ValueError('Replacement lines must not contain newlines')
+        
+        # 0-based replaced range [start, end) and its end after the edit
+        start, end = start_line - 1, end_line
+        delta = len(new_lines) - (end - start)
+        settle = start + len(new_lines)
+        
+        self.lines[start:end] = new_lines
+        if not self.lines:
+            self.lines = ['']
+            delta += 1
+        
+        first = max(start - 1, 0)
+        
+        # Closing or opening front matter changes the regions of the lines
+        # above the edit too, so those are re-checked from the top
+        front_matter = front_matter_end(self.lines)
+        if min(front_matter, first + 1) != min(self._front_matter, first + 1):
+            first = 0
+        self._front_matter = front_matter
+        
+        old_states, old_records = self._states, self._records
+        states, records, last = self._check_from(first, settle, old_states, delta)
+        
+        # Everything after the last re-checked line is unchanged but shifted
+        self._states = old_states[:first + 1] + states + old_states[last + 2 - delta:]
+        tail = old_records[last + 1 - delta:]
+        if delta:
+            tail = [self._shift(last + 1 + j, record, delta)
+                    for j, record in enumerate(tail)]
+        self._records = old_records[:first] + records + tail
+        
+        return self.result()
+    
+    def result(self) -> Dict[str, Any]:
+        """
+        Build the validation results for the current document.
+        
+        Returns:
+            Dictionary containing validation results (without a filepath)
+        """
+        validator = self.validator
+        validator.issues = [issue for issues, _ in self._records for issue in issues]
+        validator.uncertain_changes = [change for _, changes in self._records
+                                       for change in changes]
+        
+        _, _, validator._fence_char, back = self._states[-1]
+        validator._fence_line = len(self.lines) + 1 - back
+        validator._finish()
+        
+        return validator._result()
+    
+    def _check_from(self, first: int, settle: int,
+                    old_states: Optional[List[Tuple]], delta: int):
+        """
+        Re-check lines from ``first`` until the state settles.
+        
+        Checking stops after line ``k >= settle - 1`` once the state after
+        it equals the old state at the same (shifted) position, or at the
+        end of the document.
+        
+        Returns:
+            States after each checked line, their issue records and the
+            0-based index of the last checked line
+        """
+        validator = self.validator
+        lines = self.lines
+        count = len(lines)
+        
+        snapshot, validator._prev_heading_level, validator._fence_char, back = \
+            self._states[first]
+        validator._fence_line = first + 1 - back
+        tracker = RegionTracker(self._front_matter)
+        tracker.restore(first, snapshot)
+        
+        states = []
+        records = []
+        k = first
+        line = classify_line(k + 1, lines[k], tracker.region(lines[k]))
+        while True:
+            snapshot = tracker.snapshot()
+            next_line = None
+            if k + 1 < count:
+                next_line = classify_line(k + 2, lines[k + 1],
+                                          tracker.region(lines[k + 1]))
+            
+            validator.issues = []
+            validator.uncertain_changes = []
+            validator._check_line(line, next_line)
+            if validator.issues or validator.uncertain_changes:
+                records.append((validator.issues, validator.uncertain_changes))
+            else:
+                records.append(_NO_RECORDS)
+            
+            fence_char = validator._fence_char
+            state = (snapshot, validator._prev_heading_level, fence_char,
+                     k + 2 - validator._fence_line if fence_char else 0)
+            states.append(state)
+            
+            if next_line is None:
+                break
+            # The old first line is no longer first (front matter can
+            # only open on line 1), so it is always re-checked
+            old_index = k + 1 - delta
+            if (old_states is not None and k + 1 >= settle
+                    and 0 < old_index < len(old_states)
+                    and old_states[old_index] == state):
+                break
+            line = next_line
+            k += 1
+        
+        validator.issues = []
+        validator.uncertain_changes = []
+        self.lines_checked = k - first + 1
+        return states, records, k
+    
+    def _shift(self, index: int, record: Tuple, delta: int) -> Tuple:
+        """Move the issues of an unchanged line to its new line number."""
+        if record is _NO_RECORDS:
+            return record
+        
+        issues, changes = record
+        shifted_issues = []
+        for issue in issues:
+            issue = {**issue, 'line': issue['line'] + delta}
+            if issue['type'] == 'fence_mismatch':
+                # The opening fence moved by the same amount
+                _, _, fence_char, back = self._states[index]
+                issue['description'] = self.validator._fence_mismatch_message(
+                    fence_char, index + 1 - back)
+            shifted_issues.append(issue)
+        shifted_changes = [{**change, 'line': change['line'] + delta}
+                           for change in changes]
+        return (shifted_issues, shifted_changes)
+
+
+# Per-process validator used by --jobs workers
+_worker_validator = None
+
+
+def _init_worker(spec_file: Path, examples_dir: Path, cache: ResultCache,
+                 profile: bool):
+    """Create the validator once per worker process."""
+    global _worker_validator
+    _worker_validator = MarkdownValidator(spec_file, examples_dir, cache, profile)
+    if cache:
+        # Workers exit without running atexit handlers; a multiprocessing
+        # finalizer flushes the worker's pending LRU touches on shutdown
+        Finalize(cache, cache.close, exitpriority=0)
+
+
+def _validate_in_worker(filepath: Path, stream: bool, staged: bool) -> Dict[str, Any]:
+    """Validate a single file inside a worker process."""
+    return _worker_validator.validate_file(filepath, stream, staged)
+
+
+def validate_files(files: List[Path], spec_file: Path = None,
+                   examples_dir: Path = None, jobs: int = 1,
+                   cache: ResultCache = None, stream: bool = False,
+                   profile: bool = False, staged: bool = False):
+    """
+    Validate files, optionally spreading them across a process pool.
+    
+    Args:
+        files: Files to validate
+        spec_file: Path to markdown specification document
+        examples_dir: Path to directory containing example markdown files
+        jobs: Number of worker processes (1 validates in this process)
+        cache: Optional result cache for unchanged files
+        stream: Validate each file line by line with bounded memory
+        profile: Add per-check timings to each result
+        staged: Validate the copies staged in the git index
+        
+    Yields:
+        Validation results in the same order as ``files``
+    """
+    if jobs <= 1 or len(files) <= 1:
+        validator = MarkdownValidator(spec_file, examples_dir, cache, profile)
+        for filepath in files:
+            yield validator.validate_file(filepath, stream, staged)
+        return
+    
+    # Executor.map preserves input order, so the report stays deterministic
+    chunksize = max(1, len(files) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(spec_file, examples_dir, cache, profile)) as executor:
+        yield from executor.map(_validate_in_worker, files, [stream] * len(files),
+                                [staged] * len(files), chunksize=chunksize)
 
 
 def main():
     """Main entry point for the validator."""
     if len(sys.argv) < 2:
         print("Usage: python validate_markdown.py <file.md> [--spec spec.md] [--examples examples/]")
-        print("       python validate_markdown.py <directory/> [--spec spec.md] [--examples examples/]")
+        print("       python validate_markdown.py <directory/> [--spec spec.md] [--examples examples/] [--jobs N]")
+        print("\nOptions:")
+        print("  --jobs N          Validate files in N worker processes (0 = one per CPU)")
+        print("  --cache DIR       Reuse results for unchanged files from a cache in DIR")
+        print("  --cache-size MB   Maximum cache size before eviction (default: 256)")
+        print("  --stream          Validate line by line for very large files")
+        print("  --profile         Record per-check timings and regex calls in the report")
+        print("  --profile-top N   Slowest files and checks to summarize (default: 10)")
+        print("  --format FORMAT   Report format: json (default), ndjson, sarif or columnar")
+        print("  --ndjson          Stream the report as NDJSON, one line per file")
+        print("  --changed-since REF  Only validate files changed since the merge base with REF")
+        print("  --staged          Only validate files staged in the git index, as staged")
         sys.exit(1)
     
     target = Path(sys.argv[1])
     spec_file = None
     examples_dir = None
+    jobs = 1
+    cache_dir = None
+    cache_size = 256
+    stream = False
+    profile = False
+    profile_top = 10
+    report_format = JSON
+    changed_since = None
+    staged = False
     
     # Parse optional arguments
     i = 2
@@ -279,53 +728,122 @@ def main():
         elif sys.argv[i] == '--examples' and i + 1 < len(sys.argv):
             examples_dir = Path(sys.argv[i + 1])
             i += 2
+        elif sys.argv[i] == '--jobs' and i + 1 < len(sys.argv):
+            try:
+                jobs = int(sys.argv[i + 1])
+            except ValueError:
+                print(f"Error: --jobs expects an integer, got {sys.argv[i + 1]}")
+                sys.exit(1)
+            i += 2
+        elif sys.argv[i] == '--cache' and i + 1 < len(sys.argv):
+            cache_dir = Path(sys.argv[i + 1])
+            i += 2
+        elif sys.argv[i] == '--cache-size' and i + 1 < len(sys.argv):
+            try:
+                cache_size = int(sys.argv[i + 1])
+            except ValueError:
+                print(f"Error: --cache-size expects an integer, got {sys.argv[i + 1]}")
+                sys.exit(1)
+            i += 2
+        elif sys.argv[i] == '--stream':
+            stream = True
+            i += 1
+        elif sys.argv[i] == '--profile':
+            profile = True
+            i += 1
+        elif sys.argv[i] == '--profile-top' and i + 1 < len(sys.argv):
+            try:
+                profile_top = int(sys.argv[i + 1])
+            except ValueError:
+                print(f"Error: --profile-top expects an integer, got {sys.argv[i + 1]}")
+                sys.exit(1)
+            i += 2
+        elif sys.argv[i] == '--format' and i + 1 < len(sys.argv):
+            report_format = sys.argv[i + 1]
+            if report_format not in REPORT_SUFFIXES:
+                print(f"Error: --format expects one of {', '.join(REPORT_SUFFIXES)}, got {report_format}")
+                sys.exit(1)
+            i += 2
+        elif sys.argv[i] == '--ndjson':
+            report_format = NDJSON
+            i += 1
+        elif sys.argv[i] == '--changed-since' and i + 1 < len(sys.argv):
+            changed_since = sys.argv[i + 1]
+            i += 2
+        elif sys.argv[i] == '--staged':
+            staged = True
+            i += 1
         else:
             i += 1
     
-    validator = MarkdownValidator(spec_file, examples_dir)
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    
+    cache = ResultCache(cache_dir, cache_size * 1024 * 1024) if cache_dir else None
     
     # Collect files to validate
     if target.is_file():
         files = [target]
     elif target.is_dir():
-        files = list(target.rglob('*.md'))
+        files = sorted(target.rglob('*.md'))
     else:
         print(f"Error: {target} is not a valid file or directory")
         sys.exit(1)
     
-    # Validate all files
-    results = []
-    for filepath in files:
-        result = validator.validate_file(filepath)
-        results.append(result)
-        
-        print(f"\n{'='*60}")
-        print(f"File: {result['filepath']}")
-        print(f"Valid: {result['valid']}")
-        
-        if result.get('error'):
-            print(f"Error: {result['error']}")
-        
-        if result['issues']:
-            print(f"\nIssues found: {len(result['issues'])}")
-            for issue in result['issues']:
-                print(f"  Line {issue['line']} [{issue['severity'].upper()}] {issue['type']}: {issue['description']}")
-        
-        if result['uncertain_changes']:
-            print(f"\nUncertain changes: {len(result['uncertain_changes'])}")
-            for change in result['uncertain_changes']:
-                print(f"  Line {change['line']} [{change['type']}]: {change['reason']}")
+    # Only check files changed relative to a git ref or staged in the index
+    if changed_since or staged:
+        try:
+            files = changed_files(target, changed_since, staged)
+        except GitError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    
+    # Validate all files, writing each result to the report as it arrives
+    report_file = report_path('markdown_validation_report', report_format)
+    all_valid = True
+    profiles = []
+    with ReportWriter(report_file, report_format, 'validate_markdown', 'type') as report:
+        for result in validate_files(files, spec_file, examples_dir, jobs, cache,
+                                     stream, profile, staged):
+            report.write(result)
+            all_valid = all_valid and result['valid']
+            if profile:
+                profiles.append({'filepath': result['filepath'],
+                                 'profile': result['profile']})
+            
+            print(f"\n{'='*60}")
+            print(f"File: {result['filepath']}")
+            print(f"Valid: {result['valid']}")
+            
+            if result.get('error'):
+                print(f"Error: {result['error']}")
+            
+            if result['issues']:
+                print(f"\nIssues found: {len(result['issues'])}")
+                for issue in result['issues']:
+                    print(f"  Line {issue['line']} [{issue['severity'].upper()}] {issue['type']}: {issue['description']}")
+            
+            if result['uncertain_changes']:
+                print(f"\nUncertain changes: {len(result['uncertain_changes'])}")
+                for change in result['uncertain_changes']:
+                    print(f"  Line {change['line']} [{change['type']}]: {change['reason']}")
+    
+    if cache:
+        cache.close()
     
-    # Write detailed report
-    report_file = Path('markdown_validation_report.json')
-    with open(report_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2)
+    if profile:
+        summary = summarize(profiles, profile_top)
+        print_summary(summary)
+        with open('markdown_validation_profile.json', 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
     
     print(f"\n{'='*60}")
     print(f"Detailed report written to: {report_file}")
+    if profile:
+        print("Profile summary written to: markdown_validation_profile.json")
     
     # Return exit code based on validation results
-    if any(not result['valid'] for result in results):
+    if not all_valid:
         sys.exit(1)
     else:
         sys.exit(0)
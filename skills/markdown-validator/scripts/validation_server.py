@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Long-running validation server for editor integrations.
+Keeps the markdown validator and extension checker loaded and answers
+JSON-RPC 2.0 requests for buffer contents over stdio or a Unix socket.
+"""
+
+import os
+import sys
+import json
+import stat
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple, TextIO
+
+from validate_markdown import MarkdownValidator
+from check_extensions import ExtensionChecker
+from example_index import ExampleIndex
+
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+class RpcError(Exception):
+    """Error reported to the client as a JSON-RPC error object."""
+    
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class ValidationServer:
+    """Answers validation requests with warm validator and checker instances."""
+    
+    def __init__(self, spec_file: Path = None, examples_dir: Path = None):
+        """
+        Initialize server with optional specification and examples.
+        
+        Args:
+            spec_file: Path to markdown specification document
+            examples_dir: Path to directory containing example markdown files
+        """
+        self.spec_file = spec_file
+        self.examples_dir = examples_dir
+        self.validator = None
+        self.checker = None
+        self.running = True
+        self.documents = {}
+        self._loaded_signature = None
+        # The checkers keep per-document state, so requests run one at a time
+        self._lock = threading.Lock()
+        self._methods = {
+            'ping': self._ping,
+            'validate': self._validate,
+            'check_extensions': self._check_extensions,
+            'diagnostics': self._diagnostics,
+            'open': self._open,
+            'edit': self._edit,
+            'close': self._close,
+            'configure': self._configure,
+            'shutdown': self._shutdown,
+        }
+        self._load()
+    
+    def _signature(self) -> Tuple:
+        """Modification times of the spec and examples, to detect edits."""
+        signature = []
+        for path in (self.spec_file, self.examples_dir):
+            try:
+                signature.append(path.stat().st_mtime_ns if path else None)
+            except OSError:
+                signature.append(None)
+        # Editing an example in place leaves the directory's mtime alone, so
+        # every example file is listed, as in the result cache options
+        if self.examples_dir and self.examples_dir.is_dir():
+            signature.extend(tuple(entry)
+                             for entry in ExampleIndex(self.examples_dir).files())
+        return tuple(signature)
+    
+    def _load(self):
+        """Create the validator and checker, loading spec and examples once."""
+        self._loaded_signature = self._signature()
+        self.validator = MarkdownValidator(self.spec_file, self.examples_dir)
+        self.checker = ExtensionChecker(self.spec_file, self.examples_dir)
+        # Open documents keep a reference to the validator that checked them
+        self.documents = {
+            path: self.validator.open_document(document.content)
+            for path, document in self.documents.items()
+        }
+    
+    def _reload_if_changed(self):
+        """Reload the spec and examples if they changed on disk."""
+        if self._signature() != self._loaded_signature:
+            self._load()
+    
+    def handle(self, raw: str) -> Optional[str]:
+        """
+        Handle one serialized JSON-RPC message.
+        
+        Args:
+            raw: A single JSON-RPC request or notification
+        
+        Returns:
+            Serialized response, or None for notifications
+        """
+        try:
+            request = json.loads(raw)
+        except ValueError as e:
+            return self._error_response(None, PARSE_ERROR, f'Parse error: {e}')
+        
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return self._error_response(None, INVALID_REQUEST, 'Invalid request')
+        
+        request_id = request.get('id')
+        is_notification = 'id' not in request
+        method = self._methods.get(request['method'])
+        params = request.get('params', {})
+        
+        try:
+            if method is None:
+                raise RpcError(METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+            if not isinstance(params, dict):
+                raise RpcError(INVALID_PARAMS, 'Params must be an object')
+            with self._lock:
+                result = method(params)
+        except RpcError as e:
+            if is_notification:
+                return None
+            return self._error_response(request_id, e.code, e.message)
+        except Exception as e:
+            if is_notification:
+                return None
+            return self._error_response(request_id, INTERNAL_ERROR, f'Internal error: {e}')
+        
+        if is_notification:
+            return None
+        return json.dumps({'jsonrpc': '2.0', 'id': request_id, 'result': result})
+    
+    def _error_response(self, request_id: Any, code: int, message: str) -> str:
+        """Serialize a JSON-RPC error response."""
+        return json.dumps({
+            'jsonrpc': '2.0',
+            'id': request_id,
+            'error': {'code': code, 'message': message}
+        })
+    
+    def _document(self, params: Dict[str, Any]) -> Tuple[Optional[str], str]:
+        """
+        Get the document named by the request parameters.
+        
+        Buffers are sent as ``text``; ``path`` alone reads the saved file.
+        """
+        path = params.get('path')
+        text = params.get('text')
+        if path is not None and not isinstance(path, str):
+            raise RpcError(INVALID_PARAMS, 'path must be a string')
+        if text is None:
+            if path is None:
+                raise RpcError(INVALID_PARAMS, 'Either text or path is required')
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except Exception as e:
+                raise RpcError(INVALID_PARAMS, f'Failed to read file: {str(e)}')
+        elif not isinstance(text, str):
+            raise RpcError(INVALID_PARAMS, 'text must be a string')
+        return path, text
+    
+    def _with_path(self, path: Optional[str], result: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach the document path to a result, as the CLI reports do."""
+        if path is None:
+            return result
+        return {'filepath': path, **result}
+    
+    def _ping(self, params: Dict[str, Any]) -> str:
+        """Liveness check."""
+        return 'pong'
+    
+    def _validate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the markdown validator on a document."""
+        path, text = self._document(params)
+        self._reload_if_changed()
+        return self._with_path(path, self.validator.validate_content(text))
+    
+    def _check_extensions(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the extension checker on a document."""
+        path, text = self._document(params)
+        self._reload_if_changed()
+        return self._with_path(path, self.checker.check_content(text))
+    
+    def _diagnostics(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Run both tools on a document."""
+        path, text = self._document(params)
+        self._reload_if_changed()
+        validation = self.validator.validate_content(text)
+        extensions = self.checker.check_content(text)
+        return self._with_path(path, {
+            'valid': validation['valid'] and extensions['valid'],
+            'validation': validation,
+            'extensions': extensions
+        })
+    
+    def _open(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate a document and keep it open for incremental edits."""
+        path, text = self._document(params)
+        if path is None:
+            raise RpcError(INVALID_PARAMS, 'path is required to open a document')
+        self._reload_if_changed()
+        self.documents[path] = self.validator.open_document(text)
+        return self._with_path(path, self.documents[path].result())
+    
+    def _edit(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace a line range of an open document and re-check it."""
+        path = params.get('path')
+        if path not in self.documents:
+            raise RpcError(INVALID_PARAMS, f'Document is not open: {path}')
+        start, end, lines = params.get('start'), params.get('end'), params.get('lines')
+        if not isinstance(start, int) or not isinstance(end, int):
+            raise RpcError(INVALID_PARAMS, 'start and end must be line numbers')
+        if not isinstance(lines, list) or not all(isinstance(text, str) for text in lines):
+            raise RpcError(INVALID_PARAMS, 'lines must be a list of strings')
+        self._reload_if_changed()
+        try:
+            result = self.documents[path].apply_edit(start, end, lines)
+        except ValueError as e:
+            raise RpcError(INVALID_PARAMS, str(e))
+        return self._with_path(path, result)
+    
+    def _close(self, params: Dict[str, Any]) -> None:
+        """Forget an open document."""
+        self.documents.pop(params.get('path'), None)
+        return None
+    
+    def _configure(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Switch to a different spec and examples directory."""
+        for name in ('spec', 'examples'):
+            if params.get(name) is not None and not isinstance(params[name], str):
+                raise RpcError(INVALID_PARAMS, f'{name} must be a string')
+        self.spec_file = Path(params['spec']) if params.get('spec') else None
+        self.examples_dir = Path(params['examples']) if params.get('examples') else None
+        self._load()
+        return {
+            'spec': str(self.spec_file) if self.spec_file else None,
+            'examples': str(self.examples_dir) if self.examples_dir else None,
+            'spec_rules': len(self.checker.spec_rules)
+        }
+    
+    def _shutdown(self, params: Dict[str, Any]) -> None:
+        """Stop serving after this request."""
+        self.running = False
+        return None
+
+
+def serve_stdio(server: ValidationServer, infile: TextIO = None, outfile: TextIO = None):
+    """
+    Serve newline-delimited JSON-RPC messages on stdin/stdout.
+    
+    Args:
+        server: Validation server answering the requests
+        infile: Input stream (defaults to stdin)
+        outfile: Output stream (defaults to stdout)
+    """
+    infile = infile or sys.stdin
+    outfile = outfile or sys.stdout
+    
+    for raw in infile:
+        if not raw.strip():
+            continue
+        response = server.handle(raw)
+        if response is not None:
+            outfile.write(response + '\n')
+            outfile.flush()
+        if not server.running:
+            break
+
+
+class _ConnectionHandler(socketserver.StreamRequestHandler):
+    """Serves newline-delimited JSON-RPC messages on one socket connection."""
+    
+    def handle(self):
+        for raw in self.rfile:
+            if not raw.strip():
+                continue
+            response = self.server.validation_server.handle(raw.decode('utf-8'))
+            if response is not None:
+                self.wfile.write(response.encode('utf-8') + b'\n')
+                self.wfile.flush()
+            if not self.server.validation_server.running:
+                # shutdown() blocks until serve_forever returns, so it
+                # must not run on the serving thread
+                threading.Thread(target=self.server.shutdown).start()
+                break
+
+
+def serve_socket(server: ValidationServer, socket_path: Path):
+    """
+    Serve newline-delimited JSON-RPC messages on a Unix domain socket.
+    
+    Args:
+        server: Validation server answering the requests
+        socket_path: Filesystem path of the socket to create
+        
+    Raises:
+        FileExistsError: If something other than a stale socket is at the
+            path, e.g. a regular file or the socket of a running server
+    """
+    # A stale socket from an earlier run is replaced; anything else is kept
+    _remove_socket(socket_path, stale_only=True)
+    
+    with socketserver.ThreadingUnixStreamServer(str(socket_path), _ConnectionHandler) as listener:
+        listener.daemon_threads = True
+        listener.validation_server = server
+        print(f"Listening on {socket_path}", file=sys.stderr)
+        try:
+            listener.serve_forever()
+        finally:
+            _remove_socket(socket_path)
+
+
+def _remove_socket(socket_path: Path, stale_only: bool = False):
+    """
+    Unlink a socket file, leaving any other kind of file in place.
+    
+    Args:
+        socket_path: Path of the socket
+        stale_only: If True, only unlink a socket nobody is listening on,
+            and raise FileExistsError for anything else at the path
+    """
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        if stale_only:
+            raise FileExistsError(f'{socket_path} exists and is not a socket')
+        return
+    if stale_only:
+        _check_stale(socket_path)
+    socket_path.unlink()
+
+
+def _check_stale(socket_path: Path):
+    """Raise FileExistsError unless connecting to the socket is refused."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(socket_path))
+        except ConnectionRefusedError:
+            return
+        except OSError as e:
+            raise FileExistsError(f'{socket_path} exists and cannot be checked: {e}')
+    raise FileExistsError(f'A server is already running on {socket_path}')
+
+
+def main():
+    """Main entry point for the validation server."""
+    if '--help' in sys.argv or '-h' in sys.argv:
+        print("Usage: python validation_server.py [--spec spec.md] [--examples examples/] [--socket PATH]")
+        print("\nServes JSON-RPC 2.0 requests, one JSON message per line, on stdin/stdout")
+        print("or on a Unix domain socket.")
+        print("\nMethods:")
+        print("  validate          {text | path}  Standard markdown validation")
+        print("  check_extensions  {text | path}  Custom extension checks")
+        print("  diagnostics       {text | path}  Both of the above")
+        print("  open              {path, text}   Validate and keep the document for edits")
+        print("  edit              {path, start, end, lines}  Re-check only the edited lines")
+        print("  close             {path}         Forget an open document")
+        print("  configure         {spec, examples}  Load a different spec/examples")
+        print("  ping, shutdown")
+        sys.exit(1)
+    
+    spec_file = None
+    examples_dir = None
+    socket_path = None
+    
+    # Parse optional arguments
+    i = 1
+    while i < len(sys.argv):
+        if sys.argv[i] == '--spec' and i + 1 < len(sys.argv):
+            spec_file = Path(sys.argv[i + 1])
+            i += 2
+        elif sys.argv[i] == '--examples' and i + 1 < len(sys.argv):
+            examples_dir = Path(sys.argv[i + 1])
+            i += 2
+        elif sys.argv[i] == '--socket' and i + 1 < len(sys.argv):
+            socket_path = Path(sys.argv[i + 1])
+            i += 2
+        else:
+            i += 1
+    
+    if socket_path is not None and not hasattr(socketserver, 'ThreadingUnixStreamServer'):
+        print("Error: Unix domain sockets are not supported on this platform")
+        sys.exit(1)
+    
+    server = ValidationServer(spec_file, examples_dir)
+    
+    try:
+        if socket_path is not None:
+            serve_socket(server, socket_path)
+        else:
+            serve_stdio(server)
+    except KeyboardInterrupt:
+        pass
+    except FileExistsError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Single-pass CSS tokenizer and rule index for the Paged.js validator.
+
+The stylesheet is scanned once, left to right, and every at-rule, style
+rule and declaration is recorded with its line number and enclosing rule.
+Checks then look properties and at-rules up in the index instead of
+searching the raw text, so multi-megabyte stylesheets take linear time.
+"""
+
+import re
+from collections import namedtuple
+
+
+# Comments, strings, unquoted url() values (data URIs may hold ';' and
+# braces), escapes and the characters that delimit blocks, declarations
+# and function arguments. The alternatives start with different characters
+# and cannot overlap, so matching never backtracks past the current token;
+# an unterminated comment or string runs to the end of the file or line,
+# as in a browser.
+_TOKEN = re.compile(r'''
+    /\*(?:.*?\*/|.*)
+  | "(?:[^"\\\n]|\\.)*"?
+  | '(?:[^'\\\n]|\\.)*'?
+  | [uU][rR][lL]\((?!\s*["'])[^)]*\)?
+  | \\.
+  | [{};()]
+''', re.S | re.X)
+
+_AT_RULE = re.compile(r'@([\w-]*)(.*)', re.S)
+_QUOTED = re.compile(r'"(?:[^"\\\n]|\\.)*"?|\'(?:[^\'\\\n]|\\.)*\'?', re.S)
+_IDENT = re.compile(r'-?[_a-zA-Z][\w-]*$')
+_STRING_FUNCTION = re.compile(r'\bstring\(\s*([\w-]+)')
+_IMPORT_URL = re.compile(r'''(?:url\(\s*(?:"([^"]*)"|'([^']*)'|([^)\s]*))\s*\)|"([^"]*)"|'([^']*)')''',
+                         re.I)
+
+# Keywords that are never counter, string or page names
+_KEYWORDS = {'none', 'auto', 'inherit', 'initial', 'unset', 'revert', 'revert-layer'}
+
+MARGIN_BOXES = (
+    'top-left-corner', 'top-left', 'top-center', 'top-right', 'top-right-corner',
+    'right-top', 'right-middle', 'right-bottom',
+    'bottom-right-corner', 'bottom-right', 'bottom-center', 'bottom-left',
+    'bottom-left-corner',
+    'left-bottom', 'left-middle', 'left-top',
+)
+
+Declaration = namedtuple('Declaration', 'property value line rule')
+
+
+class CSSRule:
+    """An at-rule or style rule and the declarations directly inside it."""
+
+    def __init__(self, name, prelude, line, parent):
+        self.name = name            # at-rule name without '@', None for style rules
+        self.prelude = prelude      # selector list or at-rule prelude
+        self.line = line
+        self.parent = parent
+        self.declarations = []
+
+    @property
+    def selectors(self):
+        """Selectors of a style rule."""
+        if self.name is not None:
+            return []
+        return [selector.strip() for selector in self.prelude.split(',') if selector.strip()]
+
+    def within(self, name):
+        """True if this rule is, or is nested in, an at-rule called name."""
+        rule = self
+        while rule is not None:
+            if rule.name == name:
+                return True
+            rule = rule.parent
+        return False
+
+
+class CSSIndex:
+    """
+    Index of a stylesheet's rules and declarations.
+
+    ``rules`` lists every rule in source order, ``at_rules`` maps at-rule
+    names (``page``, ``top-center``, ``import``, ...) to their rules and
+    ``declarations`` maps lowercased property names to their declarations.
+    Statement at-rules such as ``@import`` are indexed as rules without
+    declarations.
+    """
+
+    def __init__(self, css):
+        self.rules = []
+        self.at_rules = {}
+        self.declarations = {}
+        self._line = 1
+        self._line_offset = 0
+        self._scan(css)
+
+    def has_at_rule(self, *names):
+        """True if any of the named at-rules occurs."""
+        return any(name in self.at_rules for name in names)
+
+    def find(self, *properties):
+        """Declarations of the given properties."""
+        found = []
+        for prop in properties:
+            found.extend(self.declarations.get(prop, ()))
+        return found
+
+    def _line_at(self, offset):
+        """Line number of an offset; offsets are visited in increasing order."""
+        self._line += self._css.count('\n', self._line_offset, offset)
+        self._line_offset = offset
+        return self._line
+
+    def _scan(self, css):
+        """Tokenize the stylesheet and build the index in one pass."""
+        self._css = css
+        stack = []
+        pieces = []
+        start = None    # offset of the first non-blank character of pieces
+        depth = 0       # parenthesis depth; braces and semicolons inside are text
+        last = 0
+
+        for match in _TOKEN.finditer(css):
+            offset = match.start()
+            if offset > last:
+                text = css[last:offset]
+                if start is None and not text.isspace():
+                    start = last + len(text) - len(text.lstrip())
+                pieces.append(text)
+            last = match.end()
+            token = match.group()
+            char = token[0]
+
+            if char == '/':
+                # Comments separate tokens but are otherwise dropped
+                pieces.append(' ')
+                continue
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                depth = max(depth - 1, 0)
+            elif char in '{};' and (depth == 0 or char == '}'):
+                text = ''.join(pieces).strip()
+                if char == '{':
+                    stack.append(self._open(text, start, stack))
+                elif text:
+                    self._statement(text, start, stack)
+                if char == '}':
+                    depth = 0
+                    if stack:
+                        stack.pop()
+                pieces = []
+                start = None
+                continue
+            if start is None:
+                start = offset
+            pieces.append(token)
+
+        text = (''.join(pieces) + css[last:]).strip()
+        if text:
+            if start is None:
+                start = last + len(css[last:]) - len(css[last:].lstrip())
+            self._statement(text, start, stack)
+        del self._css
+
+    def _open(self, prelude, start, stack):
+        """Record the rule opened by a '{'."""
+        line = self._line_at(start) if start is not None else self._line
+        parent = stack[-1] if stack else None
+        if prelude.startswith('@'):
+            return self._at_rule(prelude, line, parent)
+        rule = CSSRule(None, prelude, line, parent)
+        self.rules.append(rule)
+        return rule
+
+    def _at_rule(self, text, line, parent):
+        """Record an at-rule such as '@page :first' or '@import url(x.css)'."""
+        name, prelude = _AT_RULE.match(text).groups()
+        rule = CSSRule(name.lower(), prelude.strip(), line, parent)
+        self.at_rules.setdefault(rule.name, []).append(rule)
+        self.rules.append(rule)
+        return rule
+
+    def _statement(self, text, start, stack):
+        """Record a declaration or statement at-rule ended by ';' or '}'."""
+        line = self._line_at(start)
+        parent = stack[-1] if stack else None
+        if text.startswith('@'):
+            self._at_rule(text, line, parent)
+            return
+        prop, colon, value = text.partition(':')
+        prop = prop.strip()
+        if parent is None or not colon or not prop:
+            return
+        if not prop.startswith('--'):
+            prop = prop.lower()
+        declaration = Declaration(prop, value.strip(), line, parent)
+        parent.declarations.append(declaration)
+        self.declarations.setdefault(prop, []).append(declaration)
+
+
+def _split_top_level(value, separator=','):
+    """Split a value on a separator outside parentheses and strings."""
+    parts = []
+    depth = 0
+    current = 0
+    masked = _QUOTED.sub(lambda match: 'x' * len(match.group()), value)
+    for i, char in enumerate(masked):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth = max(depth - 1, 0)
+        elif char == separator and depth == 0:
+            parts.append(value[current:i])
+            current = i + 1
+    parts.append(value[current:])
+    return parts
+
+
+def first_keyword(value):
+    """First word of a value, lowercased, ignoring !important."""
+    words = value.replace('!important', ' ').split()
+    return words[0].lower() if words else ''
+
+
+def string_set_names(value):
+    """Names assigned by a string-set value, e.g. 'title content(), sub attr(x)'."""
+    names = []
+    for part in _split_top_level(value):
+        words = part.split()
+        if words and _IDENT.match(words[0]) and words[0].lower() not in _KEYWORDS:
+            names.append(words[0])
+    return names
+
+
+def string_references(value):
+    """Names read by string() functions in a content value."""
+    return _STRING_FUNCTION.findall(_QUOTED.sub('', value))
+
+
+def counter_names(value):
+    """Counter names in a counter-reset, counter-set or counter-increment value."""
+    return [word for word in value.replace('!important', ' ').split()
+            if _IDENT.match(word) and word.lower() not in _KEYWORDS]
+
+
+def page_name(value):
+    """Named page of a page property value, or None for auto."""
+    keyword = value.replace('!important', ' ').strip()
+    if _IDENT.match(keyword) and keyword.lower() not in _KEYWORDS:
+        return keyword
+    return None
+
+
+def import_url(prelude):
+    """URL of an @import prelude such as 'url("base.css") print', or None."""
+    match = _IMPORT_URL.match(prelude)
+    if not match:
+        return None
+    return next(url for url in match.groups() if url is not None)
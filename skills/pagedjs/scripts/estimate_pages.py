@@ -0,0 +1,929 @@
+#!/usr/bin/env python3
+"""
+Estimate how a Paged.js document paginates, without a browser.
+
+Usage:
+    python estimate_pages.py <html_file>
+    python estimate_pages.py <html_file> --css <css_file> [--report estimate.json]
+    python estimate_pages.py <html_file> --fail-on-overflow
+
+The exit code is 0 when the estimate completes, 1 on errors, and 2 with
+--fail-on-overflow when a page will probably overflow.
+
+The document is streamed once through PagedJSValidator. Its print styles
+(inline, linked, imported and --css sheets) are applied with a simplified
+cascade: type, class and id selectors with descendant and child
+combinators. Text is laid out as lines of average-width characters at
+each block's font size, line height and width, then flowed onto the
+@page content area with forced breaks, named pages and
+break-inside: avoid. The result is an approximate page count, together
+with the places that will probably overflow a page.
+"""
+
+import re
+import sys
+import json
+import math
+from pathlib import Path
+
+from css_index import CSSIndex, first_keyword, page_name
+from validate_pagedjs import PagedJSValidator, StylesheetCache, parse_html, resolve_stylesheets
+
+
+# Average glyph width as a fraction of the font size
+CHAR_WIDTH = 0.5
+MONOSPACE_CHAR_WIDTH = 0.6
+
+# Images without usable dimensions are assumed to be this fraction of the
+# content width tall
+DEFAULT_IMAGE_ASPECT = 0.6
+
+# Paged.js defaults when no @page size or margin is given
+DEFAULT_PAGE_SIZE = 'letter'
+DEFAULT_PAGE_MARGIN = '1in'
+
+_UNITS = {'px': 1.0, 'pt': 96 / 72, 'pc': 16.0, 'in': 96.0,
+          'cm': 96 / 2.54, 'mm': 96 / 25.4, 'q': 96 / 101.6}
+_LENGTH = re.compile(r'([+-]?(?:\d+\.?\d*|\.\d+))([a-zA-Z%]*)$')
+
+# Page sizes in millimetres (width, height), portrait
+PAGE_SIZES = {
+    'a3': (297, 420), 'a4': (210, 297), 'a5': (148, 210), 'a6': (105, 148),
+    'b4': (250, 353), 'b5': (176, 250),
+    'jis-b4': (257, 364), 'jis-b5': (182, 257),
+    'letter': (215.9, 279.4), 'legal': (215.9, 355.6), 'ledger': (279.4, 431.8),
+}
+
+_FONT_SIZE_KEYWORDS = {'xx-small': 9, 'x-small': 10, 'small': 13, 'medium': 16,
+                       'large': 18, 'x-large': 24, 'xx-large': 32, 'xxx-large': 48}
+_FONT_SHORTHAND = re.compile(
+    r'(?:^|\s)((?:\d*\.)?\d+(?:px|pt|pc|in|cm|mm|q|em|rem|%)|'
+    r'xx-small|x-small|small|medium|large|x-large|xx-large|xxx-large|smaller|larger)'
+    r'(?![\w-])(?:\s*/\s*([^\s,]+))?', re.I)
+
+# Declarations the layout model reads; everything else is ignored
+_LAYOUT_PROPERTIES = {
+    'display', 'font', 'font-size', 'font-family', 'line-height', 'white-space',
+    'margin', 'margin-top', 'margin-bottom', 'margin-left', 'margin-right',
+    'padding', 'padding-top', 'padding-bottom', 'padding-left', 'padding-right',
+    'break-before', 'break-after', 'break-inside',
+    'page-break-before', 'page-break-after', 'page-break-inside',
+    'page', 'height', 'width',
+}
+
+_FORCED_BREAKS = {'page', 'always', 'left', 'right', 'recto', 'verso'}
+_INLINE_DISPLAYS = {'inline', 'inline-block', 'inline-flex', 'inline-grid',
+                    'inline-table', 'table-cell', 'contents', 'ruby'}
+_REPLACED = {'img', 'svg', 'video', 'canvas', 'iframe', 'object', 'embed'}
+_VOID = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+         'param', 'source', 'track', 'wbr'}
+_HEAD = {'html', 'head', 'title', 'meta', 'link', 'style', 'script', 'base',
+         'noscript', 'template'}
+# Start tags that implicitly close an open <p>
+_CLOSES_P = {'address', 'article', 'aside', 'blockquote', 'details', 'div', 'dl',
+             'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3',
+             'h4', 'h5', 'h6', 'header', 'hr', 'main', 'nav', 'ol', 'p', 'pre',
+             'section', 'table', 'ul', 'li', 'dd', 'dt'}
+
+# Print defaults of the user agent stylesheet that matter for layout
+USER_AGENT_CSS = """
+html, body, address, blockquote, dd, div, dl, dt, fieldset, form, h1, h2, h3,
+h4, h5, h6, ol, p, ul, hr, pre, article, aside, figcaption, figure, footer,
+header, hgroup, main, nav, section, details, summary, li, table, caption,
+thead, tbody, tfoot, tr { display: block }
+head, script, style, title, meta, link, base, template, noscript { display: none }
+p, dl, ol, ul, pre { margin: 1em 0 }
+blockquote, figure { margin: 1em 40px }
+ul, ol { padding-left: 40px }
+dd { margin-left: 40px }
+h1 { font-size: 2em; margin: 0.67em 0 }
+h2 { font-size: 1.5em; margin: 0.83em 0 }
+h3 { font-size: 1.17em; margin: 1em 0 }
+h4 { margin: 1.33em 0 }
+h5 { font-size: 0.83em; margin: 1.67em 0 }
+h6 { font-size: 0.67em; margin: 2.33em 0 }
+hr { margin: 0.5em 0 }
+pre, code, kbd, samp, tt { font-family: monospace }
+pre { white-space: pre }
+small, sub, sup { font-size: smaller }
+big { font-size: larger }
+"""
+
+_SELECTOR_SPLIT = re.compile(r'\s*([>+~])\s*|\s+')
+_COMPOUND = re.compile(r'([a-zA-Z][\w-]*|\*)?((?:[.#][\w-]+)*)$')
+_SIMPLE = re.compile(r'([.#])([\w-]+)')
+
+
+def to_px(value, font_size=16.0, root_font_size=16.0, percent_of=None):
+    """A CSS length in pixels, or None if the value is not a plain length."""
+    match = _LENGTH.match(value.strip())
+    if not match:
+        return None
+    number = float(match.group(1))
+    unit = match.group(2).lower()
+    if unit in _UNITS:
+        return number * _UNITS[unit]
+    if unit == 'em':
+        return number * font_size
+    if unit == 'rem':
+        return number * root_font_size
+    if unit in ('ex', 'ch'):
+        return number * font_size / 2
+    if unit == '%':
+        return number / 100 * percent_of if percent_of is not None else None
+    if not unit and number == 0:
+        return 0.0
+    return None
+
+
+def _attribute_px(value):
+    """Pixels of a width or height attribute, which may omit the unit."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return to_px(value or '')
+
+
+def _box_sides(value, percent_of):
+    """Top, right, bottom and left of a margin or padding shorthand, in pixels."""
+    values = [to_px(part, percent_of=percent_of) or 0.0 for part in value.split()[:4]]
+    if not values:
+        return (0.0, 0.0, 0.0, 0.0)
+    if len(values) == 1:
+        values *= 4
+    elif len(values) == 2:
+        values *= 2
+    elif len(values) == 3:
+        values.append(values[1])
+    return tuple(values)
+
+
+def _compile_selector(selector):
+    """
+    Compile a selector to (compounds, combinators, specificity).
+
+    Compounds are (tag, id, classes) from left to right. Selectors with
+    pseudo-classes, attributes or sibling combinators are not modelled
+    and return None.
+    """
+    if ':' in selector or '[' in selector:
+        return None
+    parts = _SELECTOR_SPLIT.split(selector.strip())
+    compounds = []
+    combinators = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            if part in ('+', '~'):
+                return None
+            combinators.append(part or ' ')
+            continue
+        match = _COMPOUND.match(part or '')
+        if not part or not match:
+            return None
+        tag = match.group(1)
+        element_id = None
+        classes = []
+        for kind, name in _SIMPLE.findall(match.group(2)):
+            if kind == '#':
+                element_id = name
+            else:
+                classes.append(name)
+        compounds.append(((tag or '*').lower(), element_id, frozenset(classes)))
+    specificity = (sum(1 for _, element_id, _ in compounds if element_id),
+                   sum(len(classes) for _, _, classes in compounds),
+                   sum(1 for tag, _, _ in compounds if tag != '*'))
+    return compounds, combinators, specificity
+
+
+def _compound_matches(compound, box):
+    tag, element_id, classes = compound
+    return ((tag == '*' or tag == box.tag)
+            and (element_id is None or element_id == box.element_id)
+            and classes <= box.classes)
+
+
+def _selector_matches(compounds, combinators, box):
+    """Match a compiled selector right to left against a box and its ancestors."""
+    if not _compound_matches(compounds[-1], box):
+        return False
+    for compound, combinator in zip(reversed(compounds[:-1]), reversed(combinators)):
+        box = box.parent
+        if combinator == '>':
+            if box is None or not _compound_matches(compound, box):
+                return False
+            continue
+        while box is not None and not _compound_matches(compound, box):
+            box = box.parent
+        if box is None:
+            return False
+    return True
+
+
+def _media_applies(prelude):
+    """True if an @media prelude can apply to print."""
+    prelude = prelude.lower()
+    if 'print' in prelude:
+        return 'not print' not in prelude
+    return not any(medium in prelude for medium in ('screen', 'speech'))
+
+
+class StyleResolver:
+    """Simplified print cascade over a document's stylesheets."""
+
+    def __init__(self, sheets):
+        self._by_id = {}
+        self._by_class = {}
+        self._by_tag = {}
+        self._universal = []
+        order = 0
+        for sheet in sheets:
+            for rule in sheet.index.rules:
+                if rule.name is not None or not self._rule_applies(rule):
+                    continue
+                declarations = [(declaration.property, declaration.value)
+                                for declaration in rule.declarations
+                                if declaration.property in _LAYOUT_PROPERTIES]
+                if not declarations:
+                    continue
+                for selector in rule.selectors:
+                    compiled = _compile_selector(selector)
+                    if compiled is None:
+                        continue
+                    order += 1
+                    compounds, combinators, specificity = compiled
+                    entry = (specificity, order, compounds, combinators, declarations)
+                    tag, element_id, classes = compounds[-1]
+                    if element_id:
+                        self._by_id.setdefault(element_id, []).append(entry)
+                    elif classes:
+                        self._by_class.setdefault(min(classes), []).append(entry)
+                    elif tag != '*':
+                        self._by_tag.setdefault(tag, []).append(entry)
+                    else:
+                        self._universal.append(entry)
+
+    @staticmethod
+    def _rule_applies(rule):
+        """True if a style rule is not inside an at-rule that excludes print."""
+        parent = rule.parent
+        while parent is not None:
+            if parent.name == 'media':
+                if not _media_applies(parent.prelude):
+                    return False
+            elif parent.name not in ('supports', 'layer', 'document', None):
+                return False
+            parent = parent.parent
+        return True
+
+    def declared(self, box, inline_style):
+        """Declared layout properties of a box, in cascade order."""
+        candidates = list(self._universal)
+        candidates.extend(self._by_tag.get(box.tag, ()))
+        for name in box.classes:
+            candidates.extend(self._by_class.get(name, ()))
+        if box.element_id:
+            candidates.extend(self._by_id.get(box.element_id, ()))
+        if len(candidates) > 1:
+            candidates.sort(key=lambda entry: (entry[0], entry[1]))
+
+        values = {}
+        for _, _, compounds, combinators, declarations in candidates:
+            if _selector_matches(compounds, combinators, box):
+                values.update(declarations)
+        if inline_style:
+            for declaration in CSSIndex('x{%s}' % inline_style).rules[0].declarations:
+                if declaration.property in _LAYOUT_PROPERTIES:
+                    values[declaration.property] = declaration.value
+        return values
+
+
+class PageBox:
+    """Size and content area of a page, in pixels."""
+
+    def __init__(self, declarations):
+        width, height = self._size(declarations.get('size', DEFAULT_PAGE_SIZE))
+        top, right, bottom, left = _box_sides(declarations.get('margin', DEFAULT_PAGE_MARGIN),
+                                              width)
+        sides = {'margin-top': top, 'margin-right': right,
+                 'margin-bottom': bottom, 'margin-left': left}
+        for name in sides:
+            if name in declarations:
+                percent_of = height if name in ('margin-top', 'margin-bottom') else width
+                sides[name] = to_px(declarations[name], percent_of=percent_of) or 0.0
+        self.size = declarations.get('size', DEFAULT_PAGE_SIZE)
+        self.width = width
+        self.height = height
+        self.content_width = max(width - sides['margin-left'] - sides['margin-right'], 1.0)
+        self.content_height = max(height - sides['margin-top'] - sides['margin-bottom'], 1.0)
+
+    @staticmethod
+    def _size(value):
+        """Page width and height in pixels from a size value."""
+        words = value.replace('!important', ' ').lower().split()
+        lengths = [length for length in (to_px(word) for word in words) if length]
+        name = next((word for word in words if word in PAGE_SIZES), None)
+        if lengths:
+            width = lengths[0]
+            height = lengths[1] if len(lengths) > 1 else lengths[0]
+        else:
+            width_mm, height_mm = PAGE_SIZES[name or DEFAULT_PAGE_SIZE]
+            width, height = width_mm * _UNITS['mm'], height_mm * _UNITS['mm']
+        if 'landscape' in words and width < height:
+            width, height = height, width
+        elif 'portrait' in words and width > height:
+            width, height = height, width
+        return width, height
+
+    def to_dict(self):
+        mm = _UNITS['mm']
+        return {
+            'size': self.size,
+            'width_mm': round(self.width / mm, 1),
+            'height_mm': round(self.height / mm, 1),
+            'content_width_mm': round(self.content_width / mm, 1),
+            'content_height_mm': round(self.content_height / mm, 1),
+        }
+
+
+def page_boxes(sheets):
+    """Page boxes by page name ('' for the default page) from @page rules."""
+    base = {}
+    named = {}
+    for sheet in sheets:
+        for rule in sheet.index.at_rules.get('page', ()):
+            if ':' in rule.prelude:
+                continue  # :first, :left, :right and :blank pages are not modelled
+            target = named.setdefault(rule.prelude.strip(), {}) if rule.prelude.strip() else base
+            for declaration in rule.declarations:
+                target[declaration.property] = declaration.value
+    boxes = {'': PageBox(base)}
+    for name, declarations in named.items():
+        boxes[name] = PageBox({**base, **declarations})
+    return boxes
+
+
+class Box:
+    """An element with its computed layout values and pending text."""
+
+    __slots__ = ('tag', 'element_id', 'classes', 'parent', 'line', 'label', 'hidden',
+                 'block', 'font_size', 'line_height', 'char_width', 'pre', 'width',
+                 'margin_top', 'margin_bottom', 'padding_top', 'padding_bottom', 'break_after', 'avoid', 'page_name',
+                 'text_width', 'breaks', 'newlines', 'group')
+
+    def __init__(self, tag, attrs_dict, parent, line):
+        self.tag = tag
+        self.element_id = attrs_dict.get('id')
+        self.classes = frozenset((attrs_dict.get('class') or '').split())
+        self.parent = parent
+        self.line = line
+        self.label = tag
+        self.hidden = parent is not None and parent.hidden
+        self.block = False
+        self.text_width = 0.0
+        self.breaks = 0
+        self.newlines = 0
+        self.group = False
+
+
+class PageFlow:
+    """Stacks block heights onto pages of the current page box."""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.page_box = boxes['']
+        self.page_name = ''
+        self.pages = 1
+        self.blank_pages = 0
+        self.forced_breaks = 0
+        self.used = 0.0
+        self.pending_margin = 0.0
+        self.pending_break = None
+        self.next_page_name = ''
+        self.group_depth = 0
+        self.group_height = 0.0
+        self.group_lead = 0.0
+
+    @property
+    def page_height(self):
+        return self.page_box.content_height
+
+    def add_margin(self, margin):
+        """Add vertical margin; adjoining margins collapse to the largest."""
+        self.pending_margin = max(self.pending_margin, margin)
+
+    def force_break(self, side='page', page_name=None):
+        """Request a page break before the next content."""
+        self.pending_break = side
+        if page_name is not None:
+            self.next_page_name = page_name
+
+    def _new_page(self, side=None):
+        self.pages += 1
+        self._start_page(side)
+
+    def _start_page(self, side=None):
+        """Set up the current, still empty page for a break to the given side."""
+        # Page 1 is a right (recto) page
+        if (side in ('right', 'recto') and self.pages % 2 == 0
+                or side in ('left', 'verso') and self.pages % 2 == 1):
+            self.pages += 1
+            self.blank_pages += 1
+        self.used = 0.0
+        self.pending_margin = 0.0
+        if self.next_page_name != self.page_name:
+            self.page_name = self.next_page_name
+            self.page_box = self.boxes.get(self.page_name, self.boxes[''])
+
+    def _apply_break(self):
+        side = self.pending_break
+        self.pending_break = None
+        if self.used > 0:
+            self.forced_breaks += 1
+            self._new_page(side)
+        else:
+            # Content already starts a new page; only the side and page name apply
+            if self.pages > 1:
+                self.forced_breaks += 1
+            self._start_page(side)
+
+    def place(self, height):
+        """Place content that may be split across pages."""
+        if self.group_depth:
+            self.group_height += self.pending_margin + height
+            self.pending_margin = 0.0
+            return
+        if self.pending_break:
+            self._apply_break()
+        if self.used > 0:
+            self.used += self.pending_margin
+        self.pending_margin = 0.0
+        self.used += height
+        while self.used > self.page_height:
+            overflow = self.used - self.page_height
+            self._new_page()
+            self.used = overflow
+
+    def place_unbroken(self, height):
+        """Place content that must not be split, moving it to a new page if needed."""
+        if self.group_depth:
+            self.place(height)
+            return
+        if self.pending_break:
+            self._apply_break()
+        if self.used > 0 and self.used + self.pending_margin + height > self.page_height:
+            self._new_page()
+        self.place(height)
+
+    def begin_group(self):
+        """Start collecting a break-inside: avoid block."""
+        self.group_depth += 1
+        if self.group_depth == 1:
+            self.group_height = 0.0
+            self.group_lead = self.pending_margin
+            self.pending_margin = 0.0
+
+    def end_group(self):
+        """Place the collected block as a unit and return its height."""
+        self.group_depth -= 1
+        if self.group_depth:
+            return None
+        height = self.group_height
+        trailing = self.pending_margin
+        self.pending_margin = self.group_lead
+        if height <= self.page_height:
+            self.place_unbroken(height)
+        else:
+            self.place(height)
+        self.pending_margin = max(self.pending_margin, trailing)
+        return height
+
+
+class PageEstimator(PagedJSValidator):
+    """
+    Streams a document and estimates its pagination.
+
+    Layout starts at the first element after <head>, once the document's
+    <style> and <link> elements have been seen; styles that appear later
+    in the body are not applied.
+    """
+
+    def __init__(self, html_file, css_files=(), cache=None):
+        super().__init__()
+        self.html_file = Path(html_file)
+        self.css_files = list(css_files)
+        self.cache = cache or StylesheetCache()
+        self.resolver = None
+        self.flow = None
+        self.stack = []
+        self.root_font_size = 16.0
+        self.hot_spots = []
+        self.stylesheet_warnings = []
+        self.characters = 0
+        self.blocks = 0
+
+    def handle_starttag(self, tag, attrs):
+        super().handle_starttag(tag, attrs)
+        if self.flow is None:
+            if tag in _HEAD:
+                return
+            self.start_layout()
+        self.open_element(tag, dict(attrs))
+        if tag in _VOID:
+            self.close_element()
+
+    def handle_endtag(self, tag):
+        super().handle_endtag(tag)
+        if self.flow is None or tag in _VOID:
+            return
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                while len(self.stack) > i:
+                    self.close_element()
+                return
+
+    def handle_data(self, data):
+        super().handle_data(data)
+        if self.flow is None or not self.stack:
+            return
+        box = self.stack[-1]
+        if box.hidden:
+            return
+        block = box if box.block else self._block_of(box)
+        if block.pre:
+            block.newlines += data.count('\n')
+            block.text_width += len(data) * box.char_width * box.font_size
+            self.characters += len(data)
+            return
+        words = data.split()
+        if not words:
+            return
+        characters = sum(map(len, words)) + len(words)
+        self.characters += characters
+        em = box.char_width * box.font_size
+        block.text_width += characters * em
+        # Only look for unbreakable words when the text could hold one
+        if len(data) * em > block.width:
+            longest = max(words, key=len)
+            if len(longest) * em > block.width:
+                self._hot_spot(box, 'wide_text',
+                               f"unbreakable text is wider than the line ({len(longest) * em:.0f}px "
+                               f"> {block.width:.0f}px): {longest[:40]}")
+
+    def close(self):
+        super().close()
+        if self.flow is None:
+            self.start_layout()
+        while len(self.stack) > 1:
+            self.close_element()
+        if self.stack:
+            self._flush_text(self.stack[0])
+
+    def start_layout(self):
+        """Resolve the stylesheets seen so far and open the root element."""
+        sheets, warnings = resolve_stylesheets(self.html_file, '\n'.join(self.style_content),
+                                               self.stylesheet_links, self.css_files,
+                                               self.cache)
+        self.stylesheet_warnings = warnings
+        for sheet in sheets:
+            self.add_stylesheet(sheet)
+        user_agent = self.cache.parse(USER_AGENT_CSS)
+        self.resolver = StyleResolver([user_agent] + sheets)
+        self.flow = PageFlow(page_boxes(sheets))
+        self.open_element('html', {})
+        self.root_font_size = self.stack[0].font_size
+
+    def open_element(self, tag, attrs_dict):
+        """Push an element, compute its layout values and place its start."""
+        if tag == 'html' and self.stack:
+            return
+        if tag == 'body' and any(box.tag == 'body' for box in self.stack):
+            return
+        if tag in _CLOSES_P and len(self.stack) > 1 and self.stack[-1].tag == 'p':
+            self.close_element()
+        if tag == 'li' and len(self.stack) > 1 and self.stack[-1].tag == 'li':
+            self.close_element()
+
+        parent = self.stack[-1] if self.stack else None
+        box = Box(tag, attrs_dict, parent, self.getpos()[0])
+        self.stack.append(box)
+        if box.hidden:
+            return
+        values = self.resolver.declared(box, attrs_dict.get('style'))
+        self._compute(box, values, parent)
+        if box.hidden:
+            return
+
+        flow = self.flow
+        if tag in _REPLACED:
+            # Replaced content inside a hidden-free subtree is laid out as one piece
+            box.hidden = True
+            self._place_replaced(box, attrs_dict, values)
+            return
+        if tag == 'br':
+            self._block_of(box).breaks += 1
+            return
+        if not box.block:
+            return
+
+        self.blocks += 1
+        if parent is not None:
+            self._flush_text(self._block_of(parent))
+        if box.page_name != flow.next_page_name and flow.group_depth == 0:
+            flow.force_break('page', box.page_name)
+        side = first_keyword(values.get('break-before') or values.get('page-break-before') or '')
+        if side in _FORCED_BREAKS:
+            flow.force_break(side)
+
+        flow.add_margin(box.margin_top)
+        if box.padding_top:
+            flow.place(box.padding_top)
+        if box.avoid:
+            box.group = True
+            flow.begin_group()
+
+    def close_element(self):
+        """Pop the innermost element and place what is left of it."""
+        box = self.stack.pop()
+        if box.hidden or not box.block:
+            return
+        flow = self.flow
+        self._flush_text(box)
+        if box.padding_bottom:
+            flow.place(box.padding_bottom)
+        flow.add_margin(box.margin_bottom)
+        if box.group:
+            height = flow.end_group()
+            if height is not None and height > flow.page_height:
+                self._hot_spot(box, 'avoid_too_tall',
+                               f"break-inside: avoid block is {height / flow.page_height:.1f} pages "
+                               f"tall ({height:.0f}px > {flow.page_height:.0f}px)")
+        if box.break_after in _FORCED_BREAKS:
+            flow.force_break(box.break_after)
+
+    def _compute(self, box, values, parent):
+        """Computed layout values of a box from its declarations and parent."""
+        parent_font = parent.font_size if parent else 16.0
+        parent_width = parent.width if parent else self.flow.page_box.content_width
+
+        display = first_keyword(values.get('display', 'inline'))
+        if display == 'none':
+            box.hidden = True
+            return
+        box.block = display not in _INLINE_DISPLAYS
+
+        font_size = parent_font
+        line_height = parent.line_height if parent else ('factor', 1.2)
+        font = values.get('font')
+        if font:
+            match = _FONT_SHORTHAND.search(font)
+            if match:
+                values.setdefault('font-size', match.group(1))
+                line_height = ('factor', 1.2)
+                if match.group(2):
+                    values.setdefault('line-height', match.group(2))
+        if 'font-size' in values:
+            font_size = self._font_size(values['font-size'], parent_font)
+        if 'line-height' in values:
+            line_height = self._line_height(values['line-height'], font_size, line_height)
+        box.font_size = font_size
+        box.line_height = line_height
+
+        family = values.get('font-family')
+        if family is not None:
+            family = family.lower()
+            box.char_width = (MONOSPACE_CHAR_WIDTH
+                              if 'mono' in family or 'courier' in family else CHAR_WIDTH)
+        else:
+            box.char_width = parent.char_width if parent else CHAR_WIDTH
+        white_space = first_keyword(values.get('white-space', ''))
+        if white_space:
+            box.pre = white_space in ('pre', 'pre-wrap', 'break-spaces')
+        else:
+            box.pre = parent.pre if parent else False
+
+        own_page = page_name(values.get('page', 'auto'))
+        box.page_name = own_page if own_page else (parent.page_name if parent else '')
+        if own_page and own_page in self.flow.boxes:
+            parent_width = self.flow.boxes[own_page].content_width
+
+        margins = self._sides(values, 'margin', font_size, parent_width)
+        paddings = self._sides(values, 'padding', font_size, parent_width)
+        box.margin_top = margins[0]
+        box.margin_bottom = margins[2]
+        box.padding_top = paddings[0]
+        box.padding_bottom = paddings[2]
+        if box.block:
+            box.width = max(parent_width - margins[1] - margins[3] - paddings[1] - paddings[3],
+                            font_size)
+        else:
+            box.width = parent_width
+        box.break_after = first_keyword(values.get('break-after')
+                                        or values.get('page-break-after') or '')
+        box.avoid = box.block and first_keyword(values.get('break-inside')
+                                                or values.get('page-break-inside') or '') in (
+                                                    'avoid', 'avoid-page')
+        box.label = self._label(box)
+
+    def _font_size(self, value, parent_font):
+        keyword = value.strip().lower()
+        if keyword in _FONT_SIZE_KEYWORDS:
+            return float(_FONT_SIZE_KEYWORDS[keyword])
+        if keyword == 'smaller':
+            return parent_font / 1.2
+        if keyword == 'larger':
+            return parent_font * 1.2
+        size = to_px(value, parent_font, self.root_font_size, parent_font)
+        return size if size else parent_font
+
+    @staticmethod
+    def _line_height(value, font_size, inherited):
+        """('factor', n) for unitless line heights, which inherit as factors, else ('px', n)."""
+        keyword = value.strip().lower()
+        if keyword == 'normal':
+            return ('factor', 1.2)
+        try:
+            return ('factor', float(keyword))
+        except ValueError:
+            pass
+        size = to_px(value, font_size, percent_of=font_size)
+        return ('px', size) if size else inherited
+
+    def _sides(self, values, prefix, font_size, percent_of):
+        """Top, right, bottom, left of a margin or padding."""
+        sides = [0.0, 0.0, 0.0, 0.0]
+        if prefix in values:
+            sides = [to_px(part, font_size, self.root_font_size, percent_of) or 0.0
+                     for part in values[prefix].split()[:4]] or sides
+            if len(sides) == 1:
+                sides *= 4
+            elif len(sides) == 2:
+                sides *= 2
+            elif len(sides) == 3:
+                sides.append(sides[1])
+        for i, side in enumerate(('top', 'right', 'bottom', 'left')):
+            value = values.get(f'{prefix}-{side}')
+            if value is not None:
+                sides[i] = to_px(value, font_size, self.root_font_size, percent_of) or 0.0
+        return sides
+
+    @staticmethod
+    def _label(box):
+        label = box.tag
+        if box.element_id:
+            label += f'#{box.element_id}'
+        if box.classes:
+            label += ''.join(f'.{name}' for name in sorted(box.classes))
+        return f'<{label}>'
+
+    def _block_of(self, box):
+        """Nearest block-level ancestor (or self) that text flows into."""
+        while box.parent is not None and not box.block:
+            box = box.parent
+        return box
+
+    def _line_px(self, box):
+        kind, value = box.line_height
+        return value * box.font_size if kind == 'factor' else value
+
+    def _flush_text(self, block):
+        """Place the text collected in a block so far as lines."""
+        if block.pre:
+            lines = block.newlines + (1 if block.text_width else 0)
+        else:
+            lines = math.ceil(block.text_width / block.width) if block.text_width else 0
+        lines += block.breaks
+        block.text_width = 0.0
+        block.breaks = 0
+        block.newlines = 0
+        if lines:
+            self.flow.place(lines * self._line_px(block))
+
+    def _place_replaced(self, box, attrs_dict, values):
+        """Place an image or other replaced element as one unbreakable piece."""
+        block = self._block_of(box.parent) if box.parent else box
+        self._flush_text(block)
+        width = block.width
+        height = to_px(values.get('height', ''), box.font_size, self.root_font_size)
+        if height is None:
+            attr_height = _attribute_px(attrs_dict.get('height'))
+            attr_width = _attribute_px(attrs_dict.get('width'))
+            if attr_height:
+                height = attr_height
+                if attr_width and attr_width > width:
+                    height *= width / attr_width
+            else:
+                height = width * DEFAULT_IMAGE_ASPECT
+        flow = self.flow
+        flow.place_unbroken(height)
+        if height > flow.page_height:
+            self._hot_spot(box, 'replaced_too_tall',
+                           f"{box.tag} is taller than the page area "
+                           f"({height:.0f}px > {flow.page_height:.0f}px)")
+
+    def _hot_spot(self, box, kind, message):
+        self.hot_spots.append({
+            'line': box.line,
+            'element': box.label,
+            'kind': kind,
+            'page': self.flow.pages,
+            'message': message,
+        })
+
+    def to_dict(self):
+        """Estimate as a dictionary, as written to the JSON report."""
+        flow = self.flow
+        return {
+            'html_file': str(self.html_file),
+            'estimated_pages': flow.pages if self.characters or flow.used else 0,
+            'page': flow.boxes[''].to_dict(),
+            'named_pages': {name: box.to_dict() for name, box in flow.boxes.items() if name},
+            'characters': self.characters,
+            'blocks': self.blocks,
+            'forced_breaks': flow.forced_breaks,
+            'blank_pages': flow.blank_pages,
+            'hot_spots': self.hot_spots,
+            'warnings': self.stylesheet_warnings,
+        }
+
+
+def estimate(html_file, css_files=()):
+    """Estimate the pagination of a document and return the estimator."""
+    estimator = PageEstimator(html_file, css_files)
+    return parse_html(html_file, estimator)
+
+
+def print_estimate(result, limit=20):
+    """Print an estimate produced by PageEstimator.to_dict()."""
+    page = result['page']
+    print("\n" + "="*60)
+    print("PAGED.JS PAGE ESTIMATE")
+    print("="*60)
+    print(f"\n📄 Page: {page['size']} ({page['width_mm']} x {page['height_mm']} mm), "
+          f"content area {page['content_width_mm']} x {page['content_height_mm']} mm")
+    for name, named in result['named_pages'].items():
+        print(f"   Named page '{name}': {named['size']}, content area "
+              f"{named['content_width_mm']} x {named['content_height_mm']} mm")
+    print(f"\n📚 Estimated pages: {result['estimated_pages']}")
+    print(f"   {result['characters']:,} characters in {result['blocks']:,} blocks, "
+          f"{result['forced_breaks']} forced breaks, {result['blank_pages']} blank pages")
+
+    for warning in result['warnings']:
+        print(f"\n⚠️  {warning}")
+
+    hot_spots = result['hot_spots']
+    if hot_spots:
+        print(f"\n❌ LIKELY OVERFLOW ({len(hot_spots)}):")
+        for spot in hot_spots[:limit]:
+            print(f"  Line {spot['line']} {spot['element']} (page ~{spot['page']}): {spot['message']}")
+        if len(hot_spots) > limit:
+            print(f"  ... and {len(hot_spots) - limit} more")
+    else:
+        print("\n✓ No likely overflow found")
+    print("\n" + "="*60)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    html_file = Path(sys.argv[1])
+    css_files = []
+    report_file = None
+    fail_on_overflow = False
+
+    # Parse optional arguments
+    i = 2
+    while i < len(sys.argv):
+        if sys.argv[i] == '--css' and i + 1 < len(sys.argv):
+            css_files.append(Path(sys.argv[i + 1]))
+            i += 2
+        elif sys.argv[i] == '--report' and i + 1 < len(sys.argv):
+            report_file = Path(sys.argv[i + 1])
+            i += 2
+        elif sys.argv[i] == '--fail-on-overflow':
+            fail_on_overflow = True
+            i += 1
+        else:
+            i += 1
+
+    if not html_file.exists():
+        print(f"Error: File not found: {html_file}")
+        sys.exit(1)
+
+    # External stylesheets that do not exist are skipped, as in validate_pagedjs.py
+    css_files = [css_file for css_file in css_files if css_file.exists()]
+
+    result = estimate(html_file, css_files).to_dict()
+    print_estimate(result)
+    if report_file:
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"Estimate written to: {report_file}")
+
+    # Overflow is an estimate, so it only fails the run when asked to
+    sys.exit(2 if fail_on_overflow and result['hot_spots'] else 0)
+
+
+if __name__ == '__main__':
+    main()
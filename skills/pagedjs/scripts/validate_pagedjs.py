@@ -5,13 +5,261 @@ Validate Paged.js HTML/CSS for common issues.
 Usage:
     python validate_pagedjs.py <html_file>
     python validate_pagedjs.py <html_file> --css <css_file>
+    python validate_pagedjs.py <html_file>... <directory>... --css <css_file> [--jobs N]
+
+With several HTML files or a directory, the documents are validated in batch
+mode: each distinct stylesheet is parsed once, the HTML is parsed in worker
+processes and a combined report is written to pagedjs_validation_report.json.
 """
 
+import os
 import re
 import sys
+import json
+import hashlib
+from urllib.parse import urlsplit, unquote
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from html.parser import HTMLParser
 
+from css_index import (CSSIndex, MARGIN_BOXES, first_keyword, string_set_names,
+                       string_references, counter_names, page_name, import_url)
+
+
+# Characters read from an HTML file per feed() call
+CHUNK_SIZE = 64 * 1024
+
+# Characters of a data: URI passed on to the parser; the rest is dropped
+DATA_URI_LIMIT = 256
+
+_DATA_URI = re.compile(r'data:', re.I)
+# Characters that end a data: URI; str.find is much faster than a regex
+# over megabytes of base64
+_DATA_URI_END = ('"', "'", '(', ')', '<', '>', ' ', '\t', '\n', '\r', '\f')
+
+
+class DataURIFilter:
+    """
+    Streaming filter that truncates data: URIs in HTML chunks.
+    
+    Embedded images and fonts can hold hundreds of megabytes of base64.
+    HTMLParser keeps an unfinished tag in its buffer and parses it again
+    on every feed(), so a huge attribute would be both buffered and
+    rescanned. Only the first DATA_URI_LIMIT characters of each data: URI
+    are passed on; the URI ends at the first quote, parenthesis,
+    whitespace or angle bracket, so the markup around it is untouched.
+    """
+    
+    def __init__(self):
+        self.skipped = 0
+        self._in_uri = False
+        self._kept = 0
+        self._tail = ''
+        
+    def filter(self, chunk):
+        """Return the filtered text of the next chunk."""
+        text = self._tail + chunk
+        self._tail = ''
+        out = []
+        pos = 0
+        end = len(text)
+        while pos < end:
+            if self._in_uri:
+                run = min((found for found in (text.find(char, pos) for char in _DATA_URI_END)
+                           if found >= 0), default=end)
+                keep = max(0, min(run - pos, DATA_URI_LIMIT - self._kept))
+                out.append(text[pos:pos + keep])
+                self._kept += keep
+                self.skipped += run - pos - keep
+                pos = run
+                # The URI continues into the next chunk unless it ended here
+                self._in_uri = run == end
+                continue
+                
+            match = _DATA_URI.search(text, pos)
+            if not match:
+                # Hold back a possible 'data' cut off at the end of the chunk
+                cut = max(pos, end - 4)
+                out.append(text[pos:cut])
+                self._tail = text[cut:]
+                break
+            out.append(text[pos:match.end()])
+            pos = match.end()
+            self._in_uri = True
+            self._kept = 0
+        return ''.join(out)
+        
+    def flush(self):
+        """Return any text held back at the end of the last chunk."""
+        tail, self._tail = self._tail, ''
+        return tail
+
+
+class Stylesheet:
+    """
+    A parsed stylesheet and the Paged.js names and features it declares.
+    
+    Everything the checks need is collected once here, so a stylesheet
+    shared by many documents is only tokenized and scanned once.
+    """
+    
+    def __init__(self, css_content):
+        index = CSSIndex(css_content)
+        self.index = index
+        self.string_sets = set()
+        self.string_uses = set()
+        self.counter_resets = set()
+        self.counter_increments = set()
+        self.page_names = set()
+        self.features = set()
+        self.imports = []
+        
+        # Find @import URLs, in order
+        for rule in index.at_rules.get('import', ()):
+            url = import_url(rule.prelude)
+            if url:
+                self.imports.append(url)
+                
+        # Find string-set declarations
+        for declaration in index.find('string-set'):
+            self.string_sets.update(string_set_names(declaration.value))
+            
+        # Find string() uses in content
+        for declaration in index.find('content'):
+            self.string_uses.update(string_references(declaration.value))
+            
+        # Find counter-reset
+        for declaration in index.find('counter-reset'):
+            self.counter_resets.update(counter_names(declaration.value))
+            
+        # Find counter-increment
+        for declaration in index.find('counter-increment'):
+            self.counter_increments.update(counter_names(declaration.value))
+            
+        # Find named pages
+        for declaration in index.find('page'):
+            name = page_name(declaration.value)
+            if name:
+                self.page_names.add(name)
+                
+        # Record the print features the checks look for
+        if index.has_at_rule('page'):
+            self.features.add('page_rules')
+        if any(declaration.rule.within('page') for declaration in index.find('size')):
+            self.features.add('page_size')
+        if index.find('break-before', 'break-after', 'break-inside',
+                      'page-break-before', 'page-break-after', 'page-break-inside'):
+            self.features.add('break_properties')
+        if index.find('orphans', 'widows'):
+            self.features.add('orphans_widows')
+        if index.has_at_rule(*MARGIN_BOXES):
+            self.features.add('margin_boxes')
+        positions = {first_keyword(declaration.value) for declaration in index.find('position')}
+        self.features.update(positions & {'absolute', 'fixed'})
+
+
+class StylesheetCache:
+    """
+    Parsed stylesheets memoized by the SHA-256 hash of their content.
+    
+    Stylesheet files are also remembered by path, so each file is read
+    once however many documents link or import it.
+    """
+    
+    def __init__(self):
+        self.sheets = {}
+        self.files = {}
+        self.hits = 0
+        
+    def parse(self, css_content):
+        """Return the parsed stylesheet, parsing it on first sight only."""
+        key = hashlib.sha256(css_content.encode('utf-8', 'surrogatepass')).hexdigest()
+        sheet = self.sheets.get(key)
+        if sheet is None:
+            sheet = self.sheets[key] = Stylesheet(css_content)
+        else:
+            self.hits += 1
+        return sheet
+        
+    def load(self, path):
+        """Read and parse a stylesheet file once; None if it cannot be read."""
+        if path not in self.files:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.files[path] = self.parse(f.read())
+            except (OSError, UnicodeDecodeError):
+                self.files[path] = None
+        return self.files[path]
+
+
+def local_stylesheet(url, base):
+    """Path of a stylesheet URL relative to a directory, or None if it is not local."""
+    parts = urlsplit(url)
+    if parts.scheme == 'file':
+        return Path(os.path.normpath(unquote(parts.path)))
+    # Remote and data: URLs, and root-relative paths whose web root is unknown
+    if parts.scheme or parts.netloc or not parts.path or parts.path.startswith('/'):
+        return None
+    return Path(os.path.normpath(os.path.join(base, unquote(parts.path))))
+
+
+def resolve_stylesheets(html_file, style, links, css_files, cache):
+    """
+    Collect every stylesheet a document uses.
+    
+    Starting from the document's inline <style> content, its
+    <link rel="stylesheet"> targets and the external --css files, local
+    @import rules are followed depth first; each sheet's imports come
+    before the sheet itself, and a sheet reached twice is used once.
+    
+    Args:
+        html_file: Path of the HTML document
+        style: Combined content of the document's <style> elements
+        links: href values of the document's stylesheet links
+        css_files: External stylesheets applied to every document
+        cache: Stylesheet cache shared between documents
+        
+    Returns:
+        Tuple of (stylesheets in cascade order, warnings about missing
+        sheets and import cycles)
+    """
+    base = html_file.parent
+    sheets = []
+    warnings = []
+    seen = set()
+    
+    def add(sheet, directory, chain):
+        for url in sheet.imports:
+            path = local_stylesheet(url, directory)
+            if path is not None:
+                visit(path, chain)
+        sheets.append(sheet)
+        
+    def visit(path, chain):
+        if path in chain:
+            cycle = ' -> '.join(str(step) for step in chain[chain.index(path):] + [path])
+            warnings.append(f"Warning: Stylesheet @import cycle: {cycle}")
+            return
+        if path in seen:
+            return
+        seen.add(path)
+        sheet = cache.load(path)
+        if sheet is None:
+            warnings.append(f"Warning: Stylesheet not found or unreadable: {path}")
+            return
+        add(sheet, path.parent, chain + [path])
+        
+    if style:
+        add(cache.parse(style), base, [])
+    for href in links:
+        path = local_stylesheet(href, base)
+        if path is not None:
+            visit(path, [])
+    for css_file in css_files:
+        visit(Path(os.path.normpath(css_file)), [])
+        
+    return sheets, warnings
+
 
 class PagedJSValidator(HTMLParser):
     def __init__(self):
@@ -21,11 +269,14 @@ class PagedJSValidator(HTMLParser):
         self.info = []
         self.in_style = False
         self.style_content = []
+        self.style_parts = []
+        self.stylesheet_links = []
         self.string_sets = set()
         self.string_uses = set()
         self.counter_resets = set()
         self.counter_increments = set()
         self.page_names = set()
+        self.stylesheets = []
         self.current_tag = None
         
     def handle_starttag(self, tag, attrs):
@@ -41,6 +292,11 @@ class PagedJSValidator(HTMLParser):
         if tag == 'style':
             self.in_style = True
             
+        # Collect linked stylesheets
+        if tag == 'link' and attrs_dict.get('href'):
+            if 'stylesheet' in (attrs_dict.get('rel') or '').lower().split():
+                self.stylesheet_links.append(attrs_dict['href'])
+            
         # Check for problematic absolute positioning
         if 'style' in attrs_dict:
             style = attrs_dict['style']
@@ -49,76 +305,74 @@ class PagedJSValidator(HTMLParser):
                 
     def handle_endtag(self, tag):
         if tag == 'style':
-            self.in_style = False
+            self.end_style()
             
     def handle_data(self, data):
         if self.in_style:
-            self.style_content.append(data)
+            # A <style> element may arrive in several pieces when fed in chunks
+            self.style_parts.append(data)
             
+    def end_style(self):
+        """Store the content of the <style> element just closed."""
+        if self.in_style:
+            self.style_content.append(''.join(self.style_parts))
+            self.style_parts = []
+        self.in_style = False
+        
+    def close(self):
+        super().close()
+        # An unclosed <style> runs to the end of the document; some Python
+        # versions leave its content in the parser's buffer
+        if self.in_style and self.rawdata:
+            self.style_parts.append(self.rawdata)
+            self.rawdata = ''
+        self.end_style()
+            
+    def add_stylesheet(self, sheet):
+        """Add the names declared by a parsed stylesheet."""
+        self.stylesheets.append(sheet)
+        self.string_sets |= sheet.string_sets
+        self.string_uses |= sheet.string_uses
+        self.counter_resets |= sheet.counter_resets
+        self.counter_increments |= sheet.counter_increments
+        self.page_names |= sheet.page_names
+        
     def analyze_css(self, css_content):
         """Analyze CSS for common Paged.js patterns and issues."""
+        self.add_stylesheet(Stylesheet(css_content))
+        self.check_css()
         
-        # Find string-set declarations
-        string_set_pattern = r'string-set:\s*([a-zA-Z0-9_-]+)'
-        for match in re.finditer(string_set_pattern, css_content):
-            self.string_sets.add(match.group(1))
-            
-        # Find string() uses in content
-        string_use_pattern = r'content:.*?string\(([a-zA-Z0-9_-]+)\)'
-        for match in re.finditer(string_use_pattern, css_content):
-            self.string_uses.add(match.group(1))
-            
-        # Find counter-reset
-        counter_reset_pattern = r'counter-reset:\s*([a-zA-Z0-9_-]+)'
-        for match in re.finditer(counter_reset_pattern, css_content):
-            counters = match.group(1).split()
-            for counter in counters:
-                if counter and not counter.isdigit():
-                    self.counter_resets.add(counter)
-                    
-        # Find counter-increment
-        counter_inc_pattern = r'counter-increment:\s*([a-zA-Z0-9_-]+)'
-        for match in re.finditer(counter_inc_pattern, css_content):
-            self.counter_increments.add(match.group(1))
-            
-        # Find named pages
-        page_name_pattern = r'page:\s*([a-zA-Z0-9_-]+)'
-        for match in re.finditer(page_name_pattern, css_content):
-            self.page_names.add(match.group(1))
+    def check_css(self):
+        """Check the stylesheets added so far for missing print features."""
+        features = set()
+        for sheet in self.stylesheets:
+            features |= sheet.features
             
         # Check for @page rules
-        if '@page' not in css_content:
+        if 'page_rules' not in features:
             self.warnings.append("Warning: No @page rules found - document may not be configured for print")
             
-        # Check for size declaration
-        if 'size:' not in css_content:
+        # Check for size declaration inside @page
+        if 'page_size' not in features:
             self.warnings.append("Warning: No page size specified in @page rules")
             
         # Check for break properties
-        has_break_properties = any(prop in css_content for prop in [
-            'break-before:', 'break-after:', 'break-inside:',
-            'page-break-before:', 'page-break-after:', 'page-break-inside:'
-        ])
-        if not has_break_properties:
+        if 'break_properties' not in features:
             self.info.append("Info: No page break properties found - you may want to control page breaks")
             
         # Check for common issues
-        if 'position: absolute' in css_content or 'position:absolute' in css_content:
+        if 'absolute' in features:
             self.warnings.append("Warning: Absolute positioning found - may cause layout issues with paged media")
             
-        if 'position: fixed' in css_content or 'position:fixed' in css_content:
+        if 'fixed' in features:
             self.warnings.append("Warning: Fixed positioning found - may not work as expected in paged media")
             
         # Check for orphans and widows
-        if 'orphans:' not in css_content and 'widows:' not in css_content:
+        if 'orphans_widows' not in features:
             self.info.append("Info: Consider adding orphans and widows properties for better typography")
             
         # Check for margin box content
-        has_margin_boxes = any(box in css_content for box in [
-            '@top-left', '@top-center', '@top-right',
-            '@bottom-left', '@bottom-center', '@bottom-right'
-        ])
-        if not has_margin_boxes:
+        if 'margin_boxes' not in features:
             self.info.append("Info: No margin boxes defined - consider adding headers/footers")
             
     def validate_cross_references(self):
@@ -127,19 +381,19 @@ class PagedJSValidator(HTMLParser):
         # Check for string() without corresponding string-set
         unused_strings = self.string_uses - self.string_sets
         if unused_strings:
-            for string_name in unused_strings:
+            for string_name in sorted(unused_strings):
                 self.issues.append(f"Error: string({string_name}) used but never set with string-set")
                 
         # Check for string-set without usage (warning only)
         unset_strings = self.string_sets - self.string_uses
         if unset_strings:
-            for string_name in unset_strings:
+            for string_name in sorted(unset_strings):
                 self.warnings.append(f"Warning: string-set defines '{string_name}' but it's never used")
                 
         # Check for counter-increment without reset
         unreset_counters = self.counter_increments - self.counter_resets
         if unreset_counters and 'page' not in unreset_counters:  # page is auto-reset
-            for counter in unreset_counters:
+            for counter in sorted(unreset_counters):
                 self.warnings.append(f"Warning: counter-increment on '{counter}' but no counter-reset found")
                 
     def report(self):
@@ -174,50 +428,217 @@ class PagedJSValidator(HTMLParser):
             
         print("\n" + "="*60)
         return len(self.issues) == 0
+        
+    def to_dict(self):
+        """Findings as a dictionary, as written to the batch report."""
+        return {
+            'valid': len(self.issues) == 0,
+            'errors': self.issues,
+            'warnings': self.warnings,
+            'info': self.info,
+            'string_sets': sorted(self.string_sets),
+            'counters': sorted(self.counter_resets),
+            'named_pages': sorted(self.page_names),
+        }
+
+
+def parse_html(html_file, validator=None):
+    """
+    Parse an HTML document and return the validator holding its findings.
+    
+    The file is fed to the parser in CHUNK_SIZE pieces through a
+    DataURIFilter, so memory use stays bounded by the chunk size, the
+    largest tag and the document's <style> content, whatever the size of
+    the file. A PagedJSValidator subclass instance may be passed in to
+    collect more than the validator does.
+    """
+    if validator is None:
+        validator = PagedJSValidator()
+    data_uris = DataURIFilter()
+    with open(html_file, 'r', encoding='utf-8') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), ''):
+            validator.feed(data_uris.filter(chunk))
+    validator.feed(data_uris.flush())
+    validator.close()
+    return validator
+
+
+def validate_stylesheets(validator, sheets):
+    """Run the CSS and cross-reference checks of a parsed document."""
+    for sheet in sheets:
+        validator.add_stylesheet(sheet)
+        
+    if validator.stylesheets:
+        validator.check_css()
+    else:
+        validator.warnings.append("Warning: No CSS found to analyze")
+        
+    validator.validate_cross_references()
+
+
+def _parse_in_worker(html_file):
+    """Parse one document inside a worker process; returns picklable findings."""
+    try:
+        validator = parse_html(html_file)
+    except (OSError, UnicodeDecodeError) as e:
+        return {'error': f"Error: Failed to read {html_file}: {e}"}
+    return {
+        'issues': validator.issues,
+        'warnings': validator.warnings,
+        'info': validator.info,
+        'style': '\n'.join(validator.style_content),
+        'links': validator.stylesheet_links,
+    }
+
+
+def _parse_documents(html_files, jobs):
+    """Parse documents, optionally spreading them across a process pool."""
+    if jobs <= 1 or len(html_files) <= 1:
+        for html_file in html_files:
+            yield _parse_in_worker(html_file)
+        return
+        
+    # Executor.map preserves input order, so the report stays deterministic
+    chunksize = max(1, len(html_files) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(_parse_in_worker, html_files, chunksize=chunksize)
+
+
+def validate_batch(html_files, css_files, jobs=1):
+    """
+    Validate many documents that share external stylesheets.
+    
+    The HTML is parsed in worker processes. Stylesheets, including linked
+    and imported ones, are read and parsed in this process and memoized by
+    path and content hash, so the shared sheets and any inline <style>
+    blocks repeated across documents are parsed only once.
+    
+    Args:
+        html_files: HTML documents to validate
+        css_files: External stylesheets applied to every document
+        jobs: Number of worker processes (1 parses in this process)
+        
+    Returns:
+        Combined report with a result per document and run totals
+    """
+    cache = StylesheetCache()
+    documents = []
+    for html_file, findings in zip(html_files, _parse_documents(html_files, jobs)):
+        validator = PagedJSValidator()
+        if 'error' in findings:
+            validator.issues.append(findings['error'])
+        else:
+            validator.issues.extend(findings['issues'])
+            validator.warnings.extend(findings['warnings'])
+            validator.info.extend(findings['info'])
+            sheets, warnings = resolve_stylesheets(html_file, findings['style'],
+                                                   findings['links'], css_files, cache)
+            validator.warnings.extend(warnings)
+            validate_stylesheets(validator, sheets)
+        documents.append({'html_file': str(html_file), **validator.to_dict()})
+        
+    return {
+        'documents': documents,
+        'summary': {
+            'documents': len(documents),
+            'valid': sum(1 for document in documents if document['valid']),
+            'errors': sum(len(document['errors']) for document in documents),
+            'warnings': sum(len(document['warnings']) for document in documents),
+            'stylesheets_parsed': len(cache.sheets),
+            'stylesheets_reused': cache.hits,
+        },
+    }
 
 
 def main():
     if len(sys.argv) < 2:
         print(__doc__)
+        print("Options:")
+        print("  --css FILE     External stylesheet applied to every document (repeatable)")
+        print("  --jobs N       Batch mode: parse HTML in N worker processes (default: one per CPU)")
+        print("  --report FILE  Batch mode: combined report path (default: pagedjs_validation_report.json)")
         sys.exit(1)
         
-    html_file = Path(sys.argv[1])
-    css_file = None
+    targets = []
+    css_files = []
+    jobs = 0
+    report_file = Path('pagedjs_validation_report.json')
     
-    # Check for --css argument
-    if '--css' in sys.argv:
-        css_index = sys.argv.index('--css')
-        if css_index + 1 < len(sys.argv):
-            css_file = Path(sys.argv[css_index + 1])
+    # Parse arguments
+    i = 1
+    while i < len(sys.argv):
+        if sys.argv[i] == '--css' and i + 1 < len(sys.argv):
+            css_files.append(Path(sys.argv[i + 1]))
+            i += 2
+        elif sys.argv[i] == '--jobs' and i + 1 < len(sys.argv):
+            try:
+                jobs = int(sys.argv[i + 1])
+            except ValueError:
+                print(f"Error: --jobs expects an integer, got {sys.argv[i + 1]}")
+                sys.exit(1)
+            i += 2
+        elif sys.argv[i] == '--report' and i + 1 < len(sys.argv):
+            report_file = Path(sys.argv[i + 1])
+            i += 2
+        elif sys.argv[i].startswith('--'):
+            i += 1
+        else:
+            targets.append(Path(sys.argv[i]))
+            i += 1
+            
+    # Collect HTML documents
+    html_files = []
+    for target in targets:
+        if target.is_dir():
+            html_files.extend(sorted(path for path in target.rglob('*')
+                                     if path.suffix.lower() in ('.html', '.htm')))
+        elif target.exists():
+            html_files.append(target)
+        else:
+            print(f"Error: File not found: {target}")
+            sys.exit(1)
             
-    if not html_file.exists():
-        print(f"Error: File not found: {html_file}")
+    if not html_files:
+        print("Error: No HTML files to validate")
         sys.exit(1)
         
-    # Read HTML
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
+    # External stylesheets that do not exist are skipped
+    css_files = [css_file for css_file in css_files if css_file.exists()]
+    
+    if len(html_files) > 1 or any(target.is_dir() for target in targets):
+        if jobs <= 0:
+            jobs = os.cpu_count() or 1
+        report = validate_batch(html_files, css_files, jobs)
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            
+        for document in report['documents']:
+            mark = '✓' if document['valid'] else '❌'
+            print(f"{mark} {document['html_file']}: {len(document['errors'])} errors, "
+                  f"{len(document['warnings'])} warnings")
+            for issue in document['errors']:
+                print(f"    {issue}")
+                
+        summary = report['summary']
+        print("\n" + "="*60)
+        print(f"{summary['valid']}/{summary['documents']} documents valid, "
+              f"{summary['errors']} errors, {summary['warnings']} warnings")
+        print(f"Stylesheets parsed: {summary['stylesheets_parsed']} "
+              f"(reused {summary['stylesheets_reused']} times)")
+        print(f"Combined report written to: {report_file}")
+        sys.exit(0 if summary['valid'] == summary['documents'] else 1)
         
     # Parse HTML
-    validator = PagedJSValidator()
-    validator.feed(html_content)
+    validator = parse_html(html_files[0])
     
-    # Combine CSS from style tags
-    css_content = '\n'.join(validator.style_content)
+    # Combine CSS from style tags, linked and imported sheets and external CSS
+    sheets, warnings = resolve_stylesheets(html_files[0], '\n'.join(validator.style_content),
+                                           validator.stylesheet_links, css_files,
+                                           StylesheetCache())
+    validator.warnings.extend(warnings)
     
-    # Add external CSS if provided
-    if css_file and css_file.exists():
-        with open(css_file, 'r', encoding='utf-8') as f:
-            css_content += '\n' + f.read()
-            
-    # Analyze CSS
-    if css_content:
-        validator.analyze_css(css_content)
-    else:
-        validator.warnings.append("Warning: No CSS found to analyze")
-        
-    # Check cross-references
-    validator.validate_cross_references()
+    # Analyze CSS and check cross-references
+    validate_stylesheets(validator, sheets)
     
     # Print report
     success = validator.report()